@@ -1,8 +1,11 @@
 import os
 import time
-import csv
 import random
 import sys
+import json
+import argparse
+import io
+import contextlib
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -10,16 +13,54 @@ from selenium.webdriver.edge.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from app.services.task_bank_service import TaskBankService, parse_hours, exact_selection, hours_to_units
+from app.services.daemon_auth_service import load_daemon_authkey
 
 # ================== CONFIG ==================
 DRIVER_PATH = os.path.join(os.path.dirname(__file__), "msedgedriver.exe")
 CSV_PATH = os.path.join(os.path.dirname(__file__), "Banco_Tarefas.csv")
+BANCO = TaskBankService(CSV_PATH)  # relido apenas quando o CSV muda (daemon reaproveita entre jobs)
 LAST_REQ_FILE = "last_request.txt"
 BASE_URL = "https://suporte.ms.gov.br/WorkOrder.do?woMode=viewWO&woID={woid}#tasks"
 PROFILE_PATH = r"C:\Users\wfrancischini\AppData\Local\Microsoft\Edge\User Data"
 
 DEBUG_HL = True
 LAST_HOURS_FILE = "last_hours.txt"
+# Recibos por execução (tarefas salvas), usados pelo app para localizar as tarefas no SQL
+RUNS_DIR = os.path.join(os.path.dirname(__file__), "data", "runs")
+
+# Daemon (--daemon): navegador aquecido recebendo jobs do app por IPC local
+DAEMON_PORT = int(os.getenv("AUTOMATION_DAEMON_PORT", "6001"))
+DAEMON_MAX_JOBS = 25  # recicla o navegador após N jobs
+
+# Esperas: condições do DOM em vez de pausas fixas. Com AUTOMATION_FAST_MODE=0 (ou --no-fast)
+# as pausas antigas voltam a ser aplicadas depois de cada condição (ritmo conservador)
+FAST_MODE = os.getenv("AUTOMATION_FAST_MODE", "1") != "0"
+DOM_QUIET_MS = 150  # DOM sem mutações por este tempo = tela estável
+POLL_SECONDS = 0.05  # frequência de checagem das condições (WebDriverWait usa 0,5s por padrão)
+
+TASK_IFRAME_ID = "taskmodule_popup-frame"
+ADD_TASK_LOCATORS = [
+    "//a[contains(text(),'Criar nova tarefa')]",
+    "//button[contains(@aria-label,'Adicionar tarefa') or contains(@title,'Adicionar tarefa')]",
+    "//*[@id='addNewtask']",
+    "//*[@id='addNewtask']/span[1]",
+    "//span[contains(@class,'common-add-icon4')]/ancestor::*[self::a or self::button][1]"
+]
+
+# Resolve quando o DOM fica DOM_QUIET_MS sem mutações (true) ou no limite (false)
+JS_ESPERA_DOM_ESTAVEL = """
+var quieto = arguments[0], limite = arguments[1], pronto = arguments[arguments.length - 1];
+var obs, timer, fim;
+function concluir(ok) { obs.disconnect(); clearTimeout(timer); clearTimeout(fim); pronto(ok); }
+obs = new MutationObserver(function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () { concluir(true); }, quieto);
+});
+obs.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setTimeout(function () { concluir(true); }, quieto);
+fim = setTimeout(function () { concluir(false); }, limite);
+"""
 
 # ================== UTILS ==================
 def highlight(driver, element, color='red', width=3):
@@ -68,16 +109,44 @@ def ler_last_req():
             return content.split("|")[0]
         return content
 
-def ler_exec_tag():
-    """Lê EXEC_TAG do arquivo last_request.txt se disponível"""
-    if not os.path.exists(LAST_REQ_FILE):
-        return ""
-    with open(LAST_REQ_FILE, encoding="utf-8") as f:
-        content = f.read().strip()
-        # Se contém "|", extrair o exec_tag (segunda parte)
-        if "|" in content and len(content.split("|")) >= 2:
-            return content.split("|")[1]
-        return ""
+def parse_args(argv=None):
+    """Parâmetros da execução (o app passa tudo por aqui; last_*.txt é só para uso manual)"""
+    parser = argparse.ArgumentParser(description="Cria tarefas no chamado via Selenium")
+    parser.add_argument("--workorder", help="ID do chamado")
+    parser.add_argument("--hours", help="Horas alvo (ex.: 8 ou 7,5)")
+    parser.add_argument("--exec-tag", default="", help="Tag da execução (recibo em data/runs)")
+    parser.add_argument("--manifest", help="JSON da execução: tasks (plano do período) e exclude_titles")
+    parser.add_argument("--seed", type=int, help="Semente da seleção de tarefas (reprodutível)")
+    parser.add_argument("--daemon", action="store_true", help="Mantém o navegador aberto atendendo jobs do app")
+    parser.add_argument("--fast", action=argparse.BooleanOptionalAction, default=None,
+                        help="Apenas esperas por condição (padrão: AUTOMATION_FAST_MODE)")
+    return parser.parse_args(argv)
+
+def pausa(segundos):
+    """Pausa fixa do ritmo antigo: aplicada só fora do modo rápido"""
+    if not FAST_MODE:
+        time.sleep(segundos)
+
+def espera(driver, timeout):
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS)
+
+def esperar_dom_estavel(driver, timeout=5):
+    """Aguarda o DOM do contexto atual ficar sem mutações por DOM_QUIET_MS (MutationObserver)"""
+    try:
+        return bool(driver.execute_async_script(JS_ESPERA_DOM_ESTAVEL, DOM_QUIET_MS, int(timeout * 1000)))
+    except Exception:
+        return False
+
+def esperar_pagina_pronta(driver, timeout=20):
+    espera(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+    esperar_dom_estavel(driver)
+
+def esperar_popup_fechado(driver, timeout=10):
+    """No contexto principal: aguarda o iframe da tarefa sumir (modal fechado)"""
+    try:
+        espera(driver, timeout).until(EC.invisibility_of_element_located((By.ID, TASK_IFRAME_ID)))
+    except TimeoutException:
+        print("[aviso] Modal da tarefa ainda visível após o salvamento")
 
 def espera_xpath(driver, xpath, timeout=1):
     elem = WebDriverWait(driver, timeout).until(
@@ -102,15 +171,13 @@ def clica_xpath(driver, xpath, timeout=1):
     elem.click()
     return elem
 
-def switch_to_task_iframe(driver):
+def switch_to_task_iframe(driver, timeout=15):
     driver.switch_to.default_content()
-    frames = driver.find_elements(By.TAG_NAME, "iframe")
-    for frm in frames:
-        if frm.get_attribute("id") == "taskmodule_popup-frame":
-            driver.switch_to.frame(frm)
-            print("Trocou para o iframe taskmodule_popup-frame")
-            return
-    raise Exception("iframe taskmodule_popup-frame não encontrado!")
+    try:
+        espera(driver, timeout).until(EC.frame_to_be_available_and_switch_to_it((By.ID, TASK_IFRAME_ID)))
+    except TimeoutException:
+        raise Exception(f"iframe {TASK_IFRAME_ID} não encontrado!")
+    print(f"Trocou para o iframe {TASK_IFRAME_ID}")
 # ================== SELECT2 helpers ==================
 def _find_select2_container_by_label(driver, label_text, timeout=1):
     container = WebDriverWait(driver, timeout).until(
@@ -153,54 +220,48 @@ def _click_result_option(driver, value_to_select, timeout=1):
             opts = driver.find_elements(By.XPATH, "//div[contains(@id,'select2-drop')]//li[contains(@class,'select2-result')]")
         return opts
 
-    end = time.time() + timeout
-    last_exc = None
-    while time.time() < end:
-        try:
-            opts = coleta_opcoes()
-            if not opts:
-                time.sleep(0.2)
-                continue
-            for o in opts:
-                txt = o.text.strip()
-                if txt.lower() == alvo:
-                    highlight(driver, o, color='green')
-                    o.click()
-                    break
-            else:
-                picked = next((o for o in opts if alvo in o.text.strip().lower()), None)
-                if picked:
-                    highlight(driver, picked, color='green')
-                    picked.click()
-                else:
-                    time.sleep(0.2)
-                    continue
-            break
-        except StaleElementReferenceException as e:
-            last_exc = e
-            time.sleep(0.25)
-        except Exception as e:
-            last_exc = e
-            time.sleep(0.25)
-    else:
-        raise TimeoutException(f"Opção '{value_to_select}' não encontrada no Select2. Última exceção: {last_exc}")
+    def opcao_clicada(_):
+        # Condição da espera: exata primeiro, depois parcial; lista re-renderizada = nova tentativa
+        opts = coleta_opcoes()
+        textos = [o.text.strip().lower() for o in opts]
+        picked = next((o for o, t in zip(opts, textos) if t == alvo), None)
+        if picked is None:
+            picked = next((o for o, t in zip(opts, textos) if alvo in t), None)
+        if picked is None:
+            return False
+        highlight(driver, picked, color='green')
+        picked.click()
+        return True
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_SECONDS,
+                      ignored_exceptions=(StaleElementReferenceException,)).until(opcao_clicada)
+    except TimeoutException:
+        raise TimeoutException(f"Opção '{value_to_select}' não encontrada no Select2 em {timeout}s")
 
-    WebDriverWait(driver, 10).until(
+    espera(driver, 10).until(
         lambda d: len(d.find_elements(By.CSS_SELECTOR, ".select2-container--open")) == 0 and
                   len(d.find_elements(By.XPATH, "//div[contains(@id,'select2-drop') and contains(@style,'display: block')]")) == 0
     )
 
+def _select2_fechado(driver):
+    aberto_v4 = driver.find_elements(By.CSS_SELECTOR, ".select2-container--open")
+    aberto_v3 = driver.find_elements(By.XPATH, "//div[contains(@id,'select2-drop') and contains(@style,'display: block')]")
+    return not aberto_v4 and not aberto_v3
+
 def close_any_open_select2(driver, timeout=1):
     for _ in range(timeout * 2):
-        aberto_v4 = driver.find_elements(By.CSS_SELECTOR, ".select2-container--open")
-        aberto_v3 = driver.find_elements(By.XPATH, "//div[contains(@id,'select2-drop') and contains(@style,'display: block')]")
-        if not aberto_v4 and not aberto_v3:
+        if _select2_fechado(driver):
             return
         try:
             driver.switch_to.active_element.send_keys(Keys.ESCAPE)
         except Exception:
             pass
-        time.sleep(0.25)
+        try:
+            espera(driver, 0.25).until(_select2_fechado)
+            return
+        except TimeoutException:
+            pass
 
 def _assert_value_rendered(driver, container, value_to_select):
     rendered = None
@@ -241,18 +302,22 @@ def select2_fallback_by_open_search_id(driver, search_xpath, value_to_select, ti
     close_any_open_select2(driver, 5)
 
 # ================== Botão "Adicionar tarefa" ==================
+def esperar_botao_adicionar(driver, timeout=10):
+    """Aguarda qualquer um dos botões de adicionar tarefa ficar visível"""
+    def visivel(d):
+        return any(e.is_displayed() for e in d.find_elements(By.XPATH, " | ".join(ADD_TASK_LOCATORS)))
+    espera(driver, timeout).until(visivel)
+
 def click_add_task(driver, timeout=1):
-    locators = [
-        "//a[contains(text(),'Criar nova tarefa')]",
-        "//button[contains(@aria-label,'Adicionar tarefa') or contains(@title,'Adicionar tarefa')]",
-        "//*[@id='addNewtask']",
-        "//*[@id='addNewtask']/span[1]",
-        "//span[contains(@class,'common-add-icon4')]/ancestor::*[self::a or self::button][1]"
-    ]
+    # Uma espera para o conjunto; depois cada locator só confirma se está clicável
+    try:
+        esperar_botao_adicionar(driver, max(timeout, 10))
+    except TimeoutException:
+        pass
     last_exc = None
-    for xpath in locators:
+    for xpath in ADD_TASK_LOCATORS:
         try:
-            elem = WebDriverWait(driver, 2).until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            elem = espera(driver, 0.5).until(EC.element_to_be_clickable((By.XPATH, xpath)))
             driver.execute_script("arguments[0].scrollIntoView({block:'center'});", elem)
             highlight(driver, elem, color='green')
             if elem.tag_name.lower() == "span":
@@ -267,79 +332,78 @@ def click_add_task(driver, timeout=1):
             continue
     raise TimeoutException(f"Não encontrei/consigo clicar no botão de adicionar tarefa. Último erro: {last_exc}")
 # ================== CSV & lógica de 8 horas ==================
-def parse_hours(val):
-    if val is None:
-        return 0.0
-    s = str(val).strip()
-    if not s:
-        return 0.0
-    if ":" in s:
-        hh, mm = s.split(":", 1)
-        try:
-            h = int(hh)
-            m = int(mm)
-            return h + (m / 60.0)
-        except:
-            pass
-    s = s.replace(",", ".")
-    try:
-        return float(s)
-    except:
-        return 0.0
-
 def hours_to_form_input(val):
     s = f"{val:.2f}".rstrip("0").rstrip(".")
     return s.replace(".", ",")
 
+def ajustar_horas(tarefa, horas):
+    """Cópia da tarefa com horas ajustadas (overlay da execução; o banco não é alterado)"""
+    ajustada = dict(tarefa)
+    ajustada["_tempo_gasto_h"] = horas
+    ajustada["tempo_gasto"] = hours_to_form_input(horas)
+    ajustada["tempo_estimado"] = hours_to_form_input(horas)
+    return ajustada
+
 def ler_todas_tarefas_csv():
-    out = []
-    with open(CSV_PATH, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            row = dict(row)
-            row["_tempo_gasto_h"] = parse_hours(row.get("tempo_gasto", "0"))
-            row["_tempo_estimado_h"] = parse_hours(row.get("tempo_estimado", "0"))
-            out.append(row)
-    return out
+    # Cópias: a seleção não altera o banco em memória
+    return [r.to_row() for r in BANCO.get_records()]
+
+def escolher_tarefas_exatas(rows, alvo, rng):
+    """
+    Seleção exata por programação dinâmica (subset-sum) em passos de 0,1h.
+
+    No máximo uma tarefa por título. Títulos e opções são embaralhados por rng, então
+    seeds diferentes geram combinações diferentes. Retorna None somente se nenhuma
+    combinação soma exatamente o alvo.
+    """
+    alvo_u = hours_to_units(alvo)
+    if not alvo_u or alvo_u <= 0:
+        return None
 
-def escolher_tarefas_para_8h(rows, alvo=8.0, tentativas=2000):
+    # título -> unidades -> tarefas (horas fora da resolução não entram na soma exata)
+    grupos = {}
+    for r in rows:
+        u = hours_to_units(r["_tempo_gasto_h"])
+        if u and 0 < u <= alvo_u:
+            grupos.setdefault(r.get("titulo", ""), {}).setdefault(u, []).append(r)
+
+    titulos = list(grupos)
+    rng.shuffle(titulos)
+    ordenados = []
+    for titulo in titulos:
+        opcoes = list(grupos[titulo].items())
+        rng.shuffle(opcoes)
+        ordenados.append((titulo, dict(opcoes)))
+
+    escolhidas = exact_selection(ordenados, alvo_u, rng)
+    if escolhidas is not None:
+        rng.shuffle(escolhidas)
+    return escolhidas
+
+def escolher_tarefas_para_8h(rows, alvo=8.0, seed=None):
     rows = [r for r in rows if r["_tempo_gasto_h"] > 0]
     if not rows:
         return None
+    rng = random.Random(seed)
     
     # NOVA LÓGICA: Se alvo <= 2h, usar apenas 1 tarefa
     if alvo <= 2.0:
+        exatas = [r for r in rows if abs(r["_tempo_gasto_h"] - alvo) < 1e-9]
+        if exatas:
+            return [rng.choice(exatas)]
+
         # Procurar uma tarefa que possa ser ajustada para o alvo
         for r in rows:
             if r["_tempo_gasto_h"] <= alvo * 1.5:  # Máximo 50% acima do alvo
-                # Criar cópia da tarefa ajustada
-                tarefa_ajustada = r.copy()
-                tarefa_ajustada["_tempo_gasto_h"] = alvo
-                tarefa_ajustada["tempo_gasto"] = str(alvo).replace(".", ",")
-                tarefa_ajustada["tempo_estimado"] = str(alvo).replace(".", ",")
-                return [tarefa_ajustada]
+                # Cópia da tarefa ajustada
+                return [ajustar_horas(r, alvo)]
         
         # Se não encontrou, usar a menor tarefa e ajustar
         tarefa_min = min(rows, key=lambda r: r["_tempo_gasto_h"])
-        tarefa_ajustada = tarefa_min.copy()
-        tarefa_ajustada["_tempo_gasto_h"] = alvo
-        tarefa_ajustada["tempo_gasto"] = str(alvo).replace(".", ",")
-        tarefa_ajustada["tempo_estimado"] = str(alvo).replace(".", ",")
-        return [tarefa_ajustada]
+        return [ajustar_horas(tarefa_min, alvo)]
     
-    # LÓGICA ORIGINAL: Para > 2h, usar múltiplas tarefas
-    for _ in range(tentativas):
-        random.shuffle(rows)
-        soma = 0.0
-        escolhidas = []
-        for r in rows:
-            h = r["_tempo_gasto_h"]
-            if soma + h <= alvo + 1e-9:
-                escolhidas.append(r)
-                soma += h
-                if abs(soma - alvo) < 1e-9:
-                    return escolhidas
-    return None
+    # Para > 2h, combinação exata de múltiplas tarefas
+    return escolher_tarefas_exatas(rows, alvo, rng)
 
 # ================== MAIN ==================
 def limpa_dec(val):
@@ -350,6 +414,58 @@ def salvar_last_hours(hours):
     with open(LAST_HOURS_FILE, "w", encoding="utf-8") as f:
         f.write(str(hours))
 
+def registrar_tarefa_salva(exec_tag, recibo, tarefa):
+    """Acrescenta a tarefa salva ao recibo da execução (gravação atômica a cada tarefa)"""
+    if not exec_tag:
+        return
+    recibo.append({
+        "titulo": tarefa.get("titulo", ""),
+        "tempo_gasto": tarefa["_tempo_gasto_h"],
+        "saved_at_ms": int(time.time() * 1000)
+    })
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    caminho = os.path.join(RUNS_DIR, f"{exec_tag}.json")
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"exec_tag": exec_tag, "tasks": recibo}, f, ensure_ascii=False)
+    os.replace(tmp, caminho)
+
+class PerfilEtapas:
+    """
+    Tempo de cada etapa da execução em JSON lines (data/runs/<EXEC_TAG>.timings.jsonl):
+    {"step", "task", "field", "ms", "ok"}. O app agrega o arquivo no resultado da execução.
+    """
+
+    def __init__(self, exec_tag):
+        self.tarefa = None  # índice da tarefa em andamento (None fora do laço)
+        self._arquivo = None
+        if exec_tag:
+            try:
+                os.makedirs(RUNS_DIR, exist_ok=True)
+                self._arquivo = open(os.path.join(RUNS_DIR, f"{exec_tag}.timings.jsonl"), "a", encoding="utf-8")
+            except OSError as e:
+                print(f"[aviso] Perfil de tempos desativado: {e}")
+
+    @contextlib.contextmanager
+    def etapa(self, nome, campo=None):
+        inicio = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            registro = {"step": nome, "task": self.tarefa, "ms": round((time.perf_counter() - inicio) * 1000, 1), "ok": ok}
+            if campo:
+                registro["field"] = campo
+            if self._arquivo:
+                self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo:
+            self._arquivo.close()
+            self._arquivo = None
+
 def ler_last_hours():
     if not os.path.exists(LAST_HOURS_FILE):
         return "8"
@@ -366,57 +482,15 @@ def click_tasks_tab(driver, timeout=10):
         highlight(driver, tasks_tab, color='green')
         tasks_tab.click()
         print("Clicou na aba Tarefas")
-        time.sleep(1)  # Aguarda a aba carregar
+        esperar_botao_adicionar(driver, timeout)  # aba carregada
+        pausa(1)
         return True
     except Exception as e:
         print(f"Erro ao clicar na aba Tarefas: {e}")
         return False
 
-def main():
-    # Modo sem prompt quando chamado pelo Flask
-    NO_PROMPT = os.getenv("NO_PROMPT", "0") == "1"
-    
-    # EXEC_TAG para identificação das tarefas criadas
-    EXEC_TAG = os.getenv("EXEC_TAG", "")
-    # Se não definido via env, tentar ler do arquivo
-    if not EXEC_TAG:
-        EXEC_TAG = ler_exec_tag()
-    
-    if EXEC_TAG:
-        print(f"[exec] Usando EXEC_TAG: {EXEC_TAG}")
-
-    # --- CHAMADO ---
-    ultimo = ler_last_req().strip()
-    if NO_PROMPT:
-        chamado = ultimo  # usa o que o app já gravou no last_request.txt
-        if not chamado:
-            print("ID do chamado não informado e last_request.txt está vazio. Abortando.")
-            return
-        print(f"[web] Usando chamado: {chamado}")
-    else:
-        chamado = input(f"ID do chamado (Enter para usar o último: {ultimo}): ").strip() or ultimo
-        if not chamado:
-            print("ID do chamado não informado!")
-            return
-        salvar_last_req(chamado)
-
-    # --- HORAS ALVO ---
-    last_hours = ler_last_hours().strip() or "8"
-    if NO_PROMPT:
-        horas_str = last_hours  # usa o que o app já gravou no last_hours.txt (ou default 8)
-        print(f"[web] Usando horas alvo: {horas_str}")
-    else:
-        horas_str = input(f"Quantas horas deseja gerar? (Enter para usar o último: {last_hours}): ").strip() or last_hours
-        salvar_last_hours(horas_str)
-
-    try:
-        horas_alvo = float(horas_str.replace(",", "."))
-    except Exception:
-        print(f"Valor de horas inválido: '{horas_str}'")
-        return
-    salvar_last_hours(horas_alvo)
-
-    # --- WebDriver / Navegação ---
+def iniciar_driver():
+    """Inicia o Edge com o perfil do usuário (com fallbacks sem perfil)"""
     options = webdriver.EdgeOptions()
     options.add_experimental_option("detach", False)  # Permitir fechamento automático
     
@@ -460,23 +534,50 @@ def main():
             options_minimal.add_argument('--disable-dev-shm-usage')
             
             driver = webdriver.Edge(service=Service(DRIVER_PATH), options=options_minimal)
-    driver.get(BASE_URL.format(woid=chamado))
-
-    time.sleep(2)
-    if not click_tasks_tab(driver):
-        print("ERRO: Nao foi possivel acessar a aba Tarefas")
-        return
+    return driver
+
+def preparar_tarefas_planejadas(tarefas, excluir=None):
+    """
+    Tarefas vindas do plano do período, no formato de ler_todas_tarefas_csv.
+    None se a fatia tem título em excluir (a seleção volta a ser feita pelo banco).
+    """
+    bloqueados = set(excluir or []) & {row.get("titulo") for row in tarefas or []}
+    if bloqueados:
+        print(f"[plano] Fatia do plano ignorada: {len(bloqueados)} títulos recentes/similares")
+        return None
+    out = []
+    for row in tarefas or []:
+        row = dict(row)
+        row["_tempo_gasto_h"] = parse_hours(row.get("tempo_gasto", "0"))
+        row["_tempo_estimado_h"] = parse_hours(row.get("tempo_estimado", "0"))
+        out.append(row)
+    return out
 
-    # --- Seleção de tarefas ---
+def selecionar_tarefas(horas_alvo, seed=None, excluir=None):
+    """
+    Seleciona as tarefas do banco que somam horas_alvo (None se não for possível).
+    Títulos em excluir (recentes ou quase iguais, vindos do app) são evitados enquanto
+    houver combinação exata sem eles.
+    """
     todas = ler_todas_tarefas_csv()
-    selecao = escolher_tarefas_para_8h(todas, alvo=horas_alvo, tentativas=3000)
+    selecao = None
+    if excluir:
+        bloqueados = set(excluir)
+        permitidas = [r for r in todas if r.get("titulo") not in bloqueados]
+        selecao = escolher_tarefas_para_8h(permitidas, alvo=horas_alvo, seed=seed)
+        if selecao:
+            print(f"[dedup] {len(bloqueados)} títulos recentes/similares evitados na seleção")
+        else:
+            print("[dedup] Sem combinação exata sem os títulos recentes; usando o banco completo")
+    if not selecao:
+        selecao = escolher_tarefas_para_8h(todas, alvo=horas_alvo, seed=seed)
 
     if not selecao:
         # Tenta pegar a combinação mais próxima sem ultrapassar
         todas_validas = [r for r in todas if r["_tempo_gasto_h"] > 0]
         if not todas_validas:
             print("ERRO: Não há nenhuma tarefa válida no CSV (campo tempo_gasto deve ser maior que zero). Adicione ou corrija as tarefas no arquivo Banco_Tarefas.csv e tente novamente.")
-            return
+            return None
         todas_validas.sort(key=lambda r: -r["_tempo_gasto_h"])
         soma = 0.0
         escolhidas = []
@@ -485,201 +586,411 @@ def main():
                 escolhidas.append(r)
                 soma += r["_tempo_gasto_h"]
         if escolhidas and soma < horas_alvo:
-            # Ajusta o tempo_gasto e tempo_estimado da última tarefa para bater o alvo
+            # Ajusta o tempo_gasto e tempo_estimado da última tarefa para bater o alvo (só nesta execução)
             delta = horas_alvo - soma
-            nova_hora = escolhidas[-1]["_tempo_gasto_h"] + delta
-            escolhidas[-1]["_tempo_gasto_h"] = nova_hora
-            escolhidas[-1]["tempo_gasto"] = str(nova_hora).replace(".", ",")
-            escolhidas[-1]["tempo_estimado"] = str(nova_hora).replace(".", ",")
-            # Atualiza o CSV
-            with open(CSV_PATH, "w", encoding="utf-8-sig", newline='') as f:
-                fieldnames = todas[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
-                writer.writeheader()
-                for row in todas:
-                    if row["titulo"] == escolhidas[-1]["titulo"]:
-                        row["tempo_gasto"] = escolhidas[-1]["tempo_gasto"]
-                        row["tempo_estimado"] = escolhidas[-1]["tempo_estimado"]
-                    writer.writerow(row)
+            escolhidas[-1] = ajustar_horas(escolhidas[-1], escolhidas[-1]["_tempo_gasto_h"] + delta)
             selecao = escolhidas
-            print(f"AVISO: Ajustei o tempo_gasto e tempo_estimado da última tarefa para totalizar {horas_alvo}h.")
+            print(f"AVISO: Ajustei o tempo_gasto e tempo_estimado da última tarefa para totalizar {horas_alvo}h "
+                  f"(somente nesta execução; Banco_Tarefas.csv não foi alterado).")
         elif not escolhidas:
-            # Se não conseguiu nenhuma combinação, ajusta a tarefa com menor tempo_gasto
+            # Se não conseguiu nenhuma combinação, ajusta a tarefa com menor tempo_gasto (só nesta execução)
             tarefa_min = min(todas_validas, key=lambda r: r["_tempo_gasto_h"])
-            tarefa_min["_tempo_gasto_h"] = horas_alvo
-            tarefa_min["tempo_gasto"] = str(horas_alvo).replace(".", ",")
-            tarefa_min["tempo_estimado"] = str(horas_alvo).replace(".", ",")
-            # Atualiza o CSV
-            with open(CSV_PATH, "w", encoding="utf-8-sig", newline='') as f:
-                fieldnames = todas[0].keys()
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
-                writer.writeheader()
-                for row in todas:
-                    if row["titulo"] == tarefa_min["titulo"]:
-                        row["tempo_gasto"] = tarefa_min["tempo_gasto"]
-                        row["tempo_estimado"] = tarefa_min["tempo_estimado"]
-                    writer.writerow(row)
-            selecao = [tarefa_min]
-            print(f"AVISO: Não foi possível formar uma combinação. Ajustei a tarefa '{tarefa_min['titulo']}' para {horas_alvo}h.")
+            selecao = [ajustar_horas(tarefa_min, horas_alvo)]
+            print(f"AVISO: Não foi possível formar uma combinação. Ajustei a tarefa '{tarefa_min['titulo']}' para {horas_alvo}h "
+                  f"(somente nesta execução; Banco_Tarefas.csv não foi alterado).")
         else:
             print(f"AVISO: Nao foi possivel formar exatamente {horas_alvo}h com as tarefas unicas do CSV.")
             print("Ajuste os valores de 'tempo_gasto' no CSV (ex.: 2, 1.5, 0.5, etc.) para permitir combinacoes.")
-            return
+            return None
+    return selecao
+
+def criar_tarefas(driver, chamado, horas_alvo, EXEC_TAG, selecao, exibir_resultado=True, prazo=None):
+    """
+    Abre o chamado e cria as tarefas selecionadas (True se chegou ao fim).
+    Com prazo (epoch), nenhuma tarefa nova é iniciada depois dele.
+    """
+    perfil = PerfilEtapas(EXEC_TAG)
+    try:
+        return _criar_tarefas(driver, chamado, horas_alvo, EXEC_TAG, selecao, exibir_resultado, perfil, prazo)
+    finally:
+        perfil.fechar()
+
+def _criar_tarefas(driver, chamado, horas_alvo, EXEC_TAG, selecao, exibir_resultado, perfil, prazo=None):
+    with perfil.etapa("page_load"):
+        driver.get(BASE_URL.format(woid=chamado))
+        esperar_pagina_pronta(driver)
+        pausa(2)
+    with perfil.etapa("tab_click"):
+        aba_ok = click_tasks_tab(driver)
+    if not aba_ok:
+        print("ERRO: Nao foi possivel acessar a aba Tarefas")
+        return False
 
     print(f"Selecionadas {len(selecao)} tarefas aleatórias (sem repetição) totalizando {horas_alvo}h.")
 
-    time.sleep(1.2)
-    click_add_task(driver, timeout=1)
-    time.sleep(0.8)
+    with perfil.etapa("add_task"):
+        pausa(1.2)
+        click_add_task(driver, timeout=1)
+        pausa(0.8)
 
-    switch_to_task_iframe(driver)
-    espera_visivel(driver, "//*[@id='task-container']")
+    with perfil.etapa("iframe_switch"):
+        switch_to_task_iframe(driver)
+        espera_visivel(driver, "//*[@id='task-container']")
     
+    recibo = []
     for idx, tarefa in enumerate(selecao):
+        if prazo is not None and time.time() > prazo:
+            print(f"ERRO: Prazo do job esgotado; {len(selecao) - idx} tarefas não foram iniciadas")
+            return False
+        perfil.tarefa = idx
         print(f"Preenchendo: {tarefa.get('titulo','(sem título)')}  [{tarefa['_tempo_gasto_h']}h]")
 
         # TÍTULO (sem EXEC_TAG - título limpo)
-        campo_titulo = espera_visivel(driver, "//*[@id='for_title']", 25)
-        driver.execute_script("arguments[0].focus();", campo_titulo)
-        campo_titulo.clear()
-        campo_titulo.send_keys(tarefa.get("titulo", ""))
+        with perfil.etapa("fill_title"):
+            campo_titulo = espera_visivel(driver, "//*[@id='for_title']", 25)
+            driver.execute_script("arguments[0].focus();", campo_titulo)
+            campo_titulo.clear()
+            campo_titulo.send_keys(tarefa.get("titulo", ""))
 
         # DESCRIÇÃO
-        inner_iframes = driver.find_elements(By.TAG_NAME, "iframe")
-        if inner_iframes:
-            driver.switch_to.frame(inner_iframes[0])
-        desc_body = espera_visivel(driver, "//body[contains(@class,'ze_body') or @class='ze_body' or contains(@class,'editable')]", 15)
-        desc_body.click()
-        
-        # Descrição com EXEC_TAG discreto oculto no final (apenas para busca SQL)
-        descricao_original = tarefa.get("descricao", "")
-        if EXEC_TAG:
-            # Extrair apenas os últimos 4 dígitos + seta para ser mais discreto
-            tag_discreto = EXEC_TAG[-4:] + " -->"
-            descricao_com_tag = f"{descricao_original}{tag_discreto}"
-        else:
-            descricao_com_tag = descricao_original
+        with perfil.etapa("fill_description"):
+            inner_iframes = driver.find_elements(By.TAG_NAME, "iframe")
+            if inner_iframes:
+                driver.switch_to.frame(inner_iframes[0])
+            desc_body = espera_visivel(driver, "//body[contains(@class,'ze_body') or @class='ze_body' or contains(@class,'editable')]", 15)
+            desc_body.click()
             
-        desc_body.send_keys(descricao_com_tag)
-        driver.switch_to.parent_frame()
+            # Descrição com EXEC_TAG discreto oculto no final (apenas para busca SQL)
+            descricao_original = tarefa.get("descricao", "")
+            if EXEC_TAG:
+                # Extrair apenas os últimos 4 dígitos + seta para ser mais discreto
+                tag_discreto = EXEC_TAG[-4:] + " -->"
+                descricao_com_tag = f"{descricao_original}{tag_discreto}"
+            else:
+                descricao_com_tag = descricao_original
+                
+            desc_body.send_keys(descricao_com_tag)
+            driver.switch_to.parent_frame()
 
         # Volta para o iframe do modal de tarefa
-        switch_to_task_iframe(driver)
+        with perfil.etapa("iframe_switch"):
+            switch_to_task_iframe(driver)
 
         # GRUPO
-        start = time.time()
-        select2_by_label(driver, "Grupo", "CSI EAST")
-        elapsed = time.time() - start
-        print(f"[Teste 1] Tempo para preencher o campo 'Grupo': {elapsed:.2f} segundos")
+        with perfil.etapa("select2", campo="Grupo"):
+            select2_by_label(driver, "Grupo", "CSI EAST")
 
         # PROPRIETÁRIO
-        select2_by_label(driver, "Proprietário", "Willian Alvaro Francischini")
+        with perfil.etapa("select2", campo="Proprietário"):
+            select2_by_label(driver, "Proprietário", "Willian Alvaro Francischini")
 
         # Fecha overlays do select2 antes dos tempos
-        close_any_open_select2(driver, 3)
-
-        # TEMPO ESTIMADO
-        est = espera_visivel(driver, "//*[@id='for_udf_fields_sline_tempo_estimado']", 25)
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", est)
-        est.clear()
-        est_val = tarefa.get("tempo_estimado")
-        if not est_val or not est_val.strip():
-            est_val = hours_to_form_input(tarefa["_tempo_gasto_h"])
-        est.send_keys(limpa_dec(est_val))
-
-        # TEMPO GASTO
-        gst = espera_visivel(driver, "//*[@id='for_udf_fields_sline_tempo_gasto']", 25)
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", gst)
-        gst.clear()
-        gst.send_keys(hours_to_form_input(tarefa["_tempo_gasto_h"]))
+        with perfil.etapa("close_select2"):
+            close_any_open_select2(driver, 3)
+
+        with perfil.etapa("fill_hours"):
+            # TEMPO ESTIMADO
+            est = espera_visivel(driver, "//*[@id='for_udf_fields_sline_tempo_estimado']", 25)
+            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", est)
+            est.clear()
+            est_val = tarefa.get("tempo_estimado")
+            if not est_val or not est_val.strip():
+                est_val = hours_to_form_input(tarefa["_tempo_gasto_h"])
+            est.send_keys(limpa_dec(est_val))
+
+            # TEMPO GASTO
+            gst = espera_visivel(driver, "//*[@id='for_udf_fields_sline_tempo_gasto']", 25)
+            driver.execute_script("arguments[0].scrollIntoView({block:'center'});", gst)
+            gst.clear()
+            gst.send_keys(hours_to_form_input(tarefa["_tempo_gasto_h"]))
 
         # COMPLEXIDADE
-        try:
-            select2_by_label(driver, "Complexidade", tarefa.get("complexidade", "Baixa"))
-        except Exception as e1:
-            print(f"[aviso] Select2 por label falhou, tentando fallback direto: {e1}")
+        with perfil.etapa("select2", campo="Complexidade"):
             try:
-                container = _find_select2_container_by_label(driver, "Complexidade", 10)
+                select2_by_label(driver, "Complexidade", tarefa.get("complexidade", "Baixa"))
+            except Exception as e1:
+                print(f"[aviso] Select2 por label falhou, tentando fallback direto: {e1}")
                 try:
-                    trigger = container.find_element(By.CSS_SELECTOR, ".select2-selection")
+                    container = _find_select2_container_by_label(driver, "Complexidade", 10)
+                    try:
+                        trigger = container.find_element(By.CSS_SELECTOR, ".select2-selection")
+                    except Exception:
+                        trigger = container.find_element(By.CSS_SELECTOR, ".select2-choice")
+                    trigger.click()
                 except Exception:
-                    trigger = container.find_element(By.CSS_SELECTOR, ".select2-choice")
-                trigger.click()
-            except Exception:
-                pass
-            select2_fallback_by_open_search_id(driver, "//*[@id='s2id_autogen14_search']", tarefa.get("complexidade", "Baixa"), 10)
+                    pass
+                select2_fallback_by_open_search_id(driver, "//*[@id='s2id_autogen14_search']", tarefa.get("complexidade", "Baixa"), 10)
 
         # STATUS: Fechado
+        with perfil.etapa("select2", campo="Status"):
+            try:
+                select2_by_label(driver, "Status", "Fechado")
+            except Exception as e:
+                print(f"[aviso] Falha ao selecionar 'Fechado' no campo Status: {e}")
+
+        with perfil.etapa("save"):
+            # Formulário parado (select2 e campos já aplicados) antes de salvar
+            esperar_dom_estavel(driver, 3)
+            pausa(0.5)
+            clica_xpath(driver, "//*[@id='task-container']//button[contains(text(),'Salvar')]", 15)
+
+        with perfil.etapa("save_wait"):
+            WebDriverWait(driver, 20).until_not(
+                EC.presence_of_element_located((By.XPATH, "//*[@id='task-container']//button[contains(text(),'Salvar')]"))
+            )
+            driver.switch_to.default_content()
+        # A tag identifica a linha quando várias execuções escrevem no mesmo log
+        print(f"==>> Tarefa criada! [{EXEC_TAG}]" if EXEC_TAG else "==>> Tarefa criada!")
         try:
-            select2_by_label(driver, "Status", "Fechado")
+            registrar_tarefa_salva(EXEC_TAG, recibo, tarefa)
         except Exception as e:
-            print(f"[aviso] Falha ao selecionar 'Fechado' no campo Status: {e}")
-
-        time.sleep(0.5)
-        clica_xpath(driver, "//*[@id='task-container']//button[contains(text(),'Salvar')]", 15)
-
-        WebDriverWait(driver, 20).until_not(
-            EC.presence_of_element_located((By.XPATH, "//*[@id='task-container']//button[contains(text(),'Salvar')]"))
-        )
-        driver.switch_to.default_content()
-        print("==>> Tarefa criada!")
+            print(f"[aviso] Falha ao gravar recibo da tarefa: {e}")
 
         # Só prepara nova tarefa se NÃO for a última (usando índice)
         is_last_task = (idx == len(selecao) - 1)
         
         if not is_last_task:
-            time.sleep(0.8)
-            click_add_task(driver, timeout=1)
-            time.sleep(0.8)
-            switch_to_task_iframe(driver)
+            with perfil.etapa("add_task"):
+                esperar_popup_fechado(driver)
+                pausa(0.8)
+                click_add_task(driver, timeout=1)
+                pausa(0.8)
+            with perfil.etapa("iframe_switch"):
+                switch_to_task_iframe(driver)
         else:
             # É a última tarefa - garantir que estamos no contexto principal limpo
             print("INFO: Última tarefa concluída - preparando finalização...")
-            driver.switch_to.default_content()
-            time.sleep(2)  # Aguardar estabilização
+            with perfil.etapa("last_task_wait"):
+                driver.switch_to.default_content()
+                esperar_popup_fechado(driver)
+                esperar_dom_estavel(driver)
+                pausa(2)
 
+    perfil.tarefa = None
     print(f"SUCESSO: Todas as tarefas do dia foram criadas somando exatamente {horas_alvo}h.")
     
     # Finalizar na aba Tarefas para mostrar o resultado visual
     try:
         print("INFO: Finalizando na aba Tarefas para visualização do resultado...")
         
-        # Garantir contexto limpo
-        driver.switch_to.default_content()
-        time.sleep(1)
-        
-        # PRIMEIRO: Remover TODOS os highlights deixados durante a execução
-        remove_all_highlights(driver)
-        time.sleep(1)
-        
-        # Clicar na aba "Tarefas" para mostrar as tarefas criadas
-        tarefas_tab = driver.find_element(By.XPATH, "//a[contains(@class, 'tab') and contains(text(), 'Tarefas')]")
-        tarefas_tab.click()
-        time.sleep(2)
-        
-        # SEGUNDO: Remover highlights novamente após mudança de aba
-        remove_all_highlights(driver)
+        with perfil.etapa("finalize"):
+            # Garantir contexto limpo
+            driver.switch_to.default_content()
+            pausa(1)
+            
+            # PRIMEIRO: Remover TODOS os highlights deixados durante a execução
+            remove_all_highlights(driver)
+            pausa(1)
+            
+            # Clicar na aba "Tarefas" para mostrar as tarefas criadas
+            tarefas_tab = espera(driver, 10).until(EC.element_to_be_clickable(
+                (By.XPATH, "//a[contains(@class, 'tab') and contains(text(), 'Tarefas')]")))
+            tarefas_tab.click()
+            esperar_dom_estavel(driver)
+            pausa(2)
+            
+            # SEGUNDO: Remover highlights novamente após mudança de aba
+            remove_all_highlights(driver)
         
         print("INFO: ✅ Finalizado na aba Tarefas - você pode visualizar as tarefas criadas!")
         print("INFO: As tarefas foram criadas com sucesso e estão visíveis na tela.")
         
-        # Aguardar 5 segundos para o usuário ver o resultado
-        print("INFO: Aguardando 5 segundos para visualização das tarefas...")
-        time.sleep(5)
+        # Aguardar 5 segundos para o usuário ver o resultado (o daemon e o modo rápido seguem direto)
+        if exibir_resultado and not FAST_MODE:
+            print("INFO: Aguardando 5 segundos para visualização das tarefas...")
+            time.sleep(5)
         
     except Exception as e:
         print(f"AVISO: Não foi possível navegar para a aba Tarefas: {e}")
         print("INFO: As tarefas foram criadas com sucesso, mas navegue manualmente para a aba Tarefas.")
+    return True
+
+def main():
+    args = parse_args()
+
+    # Modo sem prompt quando chamado pelo Flask
+    NO_PROMPT = os.getenv("NO_PROMPT", "0") == "1"
     
-    # Fechar o navegador automaticamente
+    # EXEC_TAG para identificação das tarefas criadas
+    EXEC_TAG = args.exec_tag or os.getenv("EXEC_TAG", "")
+    
+    if EXEC_TAG:
+        print(f"[exec] Usando EXEC_TAG: {EXEC_TAG}")
+
+    # --- CHAMADO ---
+    if args.workorder:
+        chamado = args.workorder.strip()
+        print(f"[web] Usando chamado: {chamado}")
+    elif NO_PROMPT:
+        print("ID do chamado não informado (--workorder). Abortando.")
+        return
+    else:
+        ultimo = ler_last_req().strip()
+        chamado = input(f"ID do chamado (Enter para usar o último: {ultimo}): ").strip() or ultimo
+        if not chamado:
+            print("ID do chamado não informado!")
+            return
+        salvar_last_req(chamado)
+
+    # --- HORAS ALVO ---
+    if args.hours:
+        horas_str = args.hours
+        print(f"[web] Usando horas alvo: {horas_str}")
+    elif NO_PROMPT:
+        horas_str = "8"
+        print(f"[web] Horas alvo não informadas (--hours), usando {horas_str}")
+    else:
+        last_hours = ler_last_hours().strip() or "8"
+        horas_str = input(f"Quantas horas deseja gerar? (Enter para usar o último: {last_hours}): ").strip() or last_hours
+
+    try:
+        horas_alvo = float(horas_str.replace(",", "."))
+    except Exception:
+        print(f"Valor de horas inválido: '{horas_str}'")
+        return
+    if not NO_PROMPT and not args.hours:
+        salvar_last_hours(horas_alvo)
+
+    manifesto = {}
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as f:
+            manifesto = json.load(f)
+
+    selecao = None
+    if manifesto.get("tasks"):
+        selecao = preparar_tarefas_planejadas(manifesto["tasks"], excluir=manifesto.get("exclude_titles"))
+        if selecao:
+            print(f"[plano] {len(selecao)} tarefas do plano do período")
+    if not selecao:
+        selecao = selecionar_tarefas(horas_alvo, seed=args.seed, excluir=manifesto.get("exclude_titles"))
+    if not selecao:
+        return
+
+    driver = iniciar_driver()
+    try:
+        criar_tarefas(driver, chamado, horas_alvo, EXEC_TAG, selecao)
+    finally:
+        # Fechar o navegador automaticamente
+        try:
+            print("INFO: Fechando o navegador automaticamente...")
+            driver.quit()
+            print("INFO: ✅ Navegador fechado com sucesso!")
+        except Exception as e:
+            print(f"AVISO: Erro ao fechar navegador: {e}")
+
+    print("INFO: Script finalizado com sucesso!")
+
+# ================== DAEMON ==================
+def driver_saudavel(driver):
+    """Verifica se a sessão do WebDriver ainda responde"""
+    try:
+        driver.current_window_handle
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+def encerrar_driver(driver):
+    if driver is None:
+        return
     try:
-        print("INFO: Fechando o navegador automaticamente...")
         driver.quit()
-        print("INFO: ✅ Navegador fechado com sucesso!")
     except Exception as e:
         print(f"AVISO: Erro ao fechar navegador: {e}")
-    
-    print("INFO: Script finalizado com sucesso!")
+
+def servir_daemon():
+    """
+    Atende jobs {"workorder", "hours", "exec_tag"} em 127.0.0.1:DAEMON_PORT com o
+    navegador aquecido. A sessão é verificada antes de cada job e reciclada após
+    falhas ou DAEMON_MAX_JOBS execuções. Comandos: {"cmd": "ping"} e {"cmd": "shutdown"}.
+    Jobs com "deadline" (epoch) vencido são recusados e param entre tarefas ao vencer.
+    Sem AUTOMATION_DAEMON_KEY nem data/daemon.key utilizável, o daemon não sobe.
+    """
+    from multiprocessing.connection import Listener
+
+    try:
+        authkey = load_daemon_authkey()
+    except RuntimeError as e:
+        print(f"ERRO: {e}")
+        sys.exit(1)
+
+    listener = Listener(("127.0.0.1", DAEMON_PORT), authkey=authkey)
+    print(f"[daemon] Aguardando jobs em 127.0.0.1:{DAEMON_PORT}")
+    driver = None
+    jobs = 0
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"[daemon] Conexão recusada: {e}")
+                continue
+
+            with conn:
+                try:
+                    job = conn.recv()
+                except EOFError:
+                    continue
+
+                cmd = job.get("cmd", "run")
+                if cmd == "ping":
+                    conn.send({"ok": True, "driver_alive": driver is not None and driver_saudavel(driver), "jobs": jobs})
+                    continue
+                if cmd == "shutdown":
+                    conn.send({"ok": True})
+                    break
+
+                prazo = job.get("deadline")
+                if prazo is not None and time.time() > prazo:
+                    print(f"[daemon] Job chamado {job.get('workorder')} descartado: prazo esgotado antes do início")
+                    try:
+                        conn.send({"ok": False, "error": "Prazo do job esgotado antes do início", "output": ""})
+                    except Exception:
+                        pass
+                    continue
+
+                saida = io.StringIO()
+                ok, erro = False, None
+                inicio = time.time()
+                with contextlib.redirect_stdout(saida):
+                    try:
+                        print(f"[exec] Usando EXEC_TAG: {job.get('exec_tag', '')}")
+                        horas_alvo = float(str(job["hours"]).replace(",", "."))
+                        selecao = None
+                        if job.get("tasks"):
+                            selecao = preparar_tarefas_planejadas(job["tasks"], excluir=job.get("exclude_titles"))
+                        if not selecao:
+                            selecao = selecionar_tarefas(horas_alvo, seed=job.get("seed"),
+                                                         excluir=job.get("exclude_titles"))
+                        if selecao:
+                            if driver is None or jobs >= DAEMON_MAX_JOBS or not driver_saudavel(driver):
+                                encerrar_driver(driver)
+                                driver = iniciar_driver()
+                                jobs = 0
+                            jobs += 1
+                            ok = criar_tarefas(driver, str(job["workorder"]), horas_alvo, job.get("exec_tag", ""),
+                                               selecao, exibir_resultado=False, prazo=prazo)
+                    except Exception as e:
+                        erro = str(e)
+                        print(f"ERRO: {e}")
+                        # Sessão em estado desconhecido: recicla no próximo job
+                        encerrar_driver(driver)
+                        driver = None
+
+                print(f"[daemon] Job chamado {job.get('workorder')} finalizado em {time.time() - inicio:.1f}s (ok={ok})")
+                try:
+                    conn.send({"ok": ok, "error": erro, "output": saida.getvalue()})
+                except Exception as e:
+                    print(f"[daemon] Cliente desconectou antes da resposta: {e}")
+    finally:
+        encerrar_driver(driver)
+        listener.close()
+        print("[daemon] Encerrado")
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.fast is not None:
+        FAST_MODE = args.fast
+    if args.daemon:
+        servir_daemon()
+    else:
+        main()
@@ -1,5 +1,5 @@
-# Versão 2.2 — Gerador de tarefas VMware com ordenação e atividades fixas
-import os, csv, random
+# Versão 2.3 — Gerador de tarefas VMware com amostragem sem reposição e gravação em streaming
+import os, csv, random, math, heapq, argparse, tempfile, time
 from datetime import datetime
 
 def fmt_num(v):
@@ -15,21 +15,34 @@ RESOURCE_POOLS = [
 
 STORAGES = ["Storage A", "Storage B", "Storage C", "Storage D"]
 
-# 🔁 LINHAS 25–60: MODELOS dinâmicos + atividades fixas
+# Hosts sorteados para os modelos com requires_host (S0001.MS .. S1499.MS)
+HOST_RANGE = 1499
+
+# Espaços até este tamanho são enumerados e embaralhados; acima, sorteio com rejeição
+ENUM_LIMIT = 200_000
+
+# Linhas ordenadas em memória por bloco antes do merge final
+CHUNK_SIZE = 20_000
+
+# 🔁 MODELOS declarativos: "params" lista as opções de cada campo do texto,
+# o que torna o espaço de combinações enumerável (sem repetir título+descrição)
 MODELOS = [
     {
-        "titulo": lambda: f"Redistribuir VMs entre {random.choice(STORAGES)} e {random.choice(STORAGES)}",
-        "descricao": lambda: f"Realizar DRS manual movendo VMs dos datastores de {random.choice(STORAGES)} para {random.choice(STORAGES)} visando balanceamento de carga.",
+        "titulo": "Redistribuir VMs entre {t1} e {t2}",
+        "descricao": "Realizar DRS manual movendo VMs dos datastores de {d1} para {d2} visando balanceamento de carga.",
+        "params": {"t1": STORAGES, "t2": STORAGES, "d1": STORAGES, "d2": STORAGES},
         "requires_host": False
     },
     {
-        "titulo": lambda: f"Realocar VMs para {random.choice(RESOURCE_POOLS)}",
-        "descricao": lambda: f"Mover VMs de criticidade alta para o resource pool {random.choice(RESOURCE_POOLS)} conforme política de desempenho.",
+        "titulo": "Realocar VMs para {t1}",
+        "descricao": "Mover VMs de criticidade alta para o resource pool {d1} conforme política de desempenho.",
+        "params": {"t1": RESOURCE_POOLS, "d1": RESOURCE_POOLS},
         "requires_host": False
     },
     {
-        "titulo": lambda: "Migrar VMs entre datastores",
-        "descricao": lambda: f"Executar Storage vMotion para mover VMs da {random.choice(STORAGES)} para a {random.choice([s for s in STORAGES if s != STORAGES[0]])}, otimizando uso de espaço e desempenho.",
+        "titulo": "Migrar VMs entre datastores",
+        "descricao": "Executar Storage vMotion para mover VMs da {d1} para a {d2}, otimizando uso de espaço e desempenho.",
+        "params": {"d1": STORAGES, "d2": [s for s in STORAGES if s != STORAGES[0]]},
         "requires_host": False
     }
 ]
@@ -37,111 +50,206 @@ MODELOS = [
 # 🔁 Adicionando atividades fixas — versão 2.2
 MODELOS += [
     {"titulo": "Verificar saúde de hosts com vCenter",
-     "descricao": lambda hosts: f"Checar status de CPU, rede, memória e alarmes nos hosts: {hosts}.",
+     "descricao": "Checar status de CPU, rede, memória e alarmes nos hosts: {hosts}.",
      "requires_host": True},
     {"titulo": "Executar análise de logs ESXi/vRealize",
-     "descricao": lambda hosts: f"Extrair e revisar logs críticos de ESXi e vCenter nos hosts: {hosts}.",
+     "descricao": "Extrair e revisar logs críticos de ESXi e vCenter nos hosts: {hosts}.",
      "requires_host": True},
     {"titulo": "Aplicar patch de segurança ESXi",
-     "descricao": lambda hosts: f"Aplicar patch via vCenter e validar reinicialização segura nos hosts: {hosts}.",
+     "descricao": "Aplicar patch via vCenter e validar reinicialização segura nos hosts: {hosts}.",
      "requires_host": True},
     {"titulo": "Migrar VMs via Storage vMotion",
-     "descricao": lambda hosts: f"Mover VMs entre datastores para balanceamento de carga nos hosts: {hosts}.",
+     "descricao": "Mover VMs entre datastores para balanceamento de carga nos hosts: {hosts}.",
      "requires_host": True},
     {"titulo": "Verificar compliance de Host Profile",
-     "descricao": lambda hosts: f"Ajustar compliance de Host Profiles nos hosts: {hosts}.",
+     "descricao": "Ajustar compliance de Host Profiles nos hosts: {hosts}.",
      "requires_host": True},
     {"titulo": "Coletar dados com vRealize Log Insight",
-     "descricao": lambda: "Usar vRLI para coletar métricas e analisar tendências de performance.",
+     "descricao": "Usar vRLI para coletar métricas e analisar tendências de performance.",
      "requires_host": False},
     {"titulo": "Atualizar planilha Linha de crescimento Storage",
-     "descricao": lambda: "Atualizar planilha com os campos 'Espaço Utilizado' das storages; calcular média se houver múltiplos pools.",
+     "descricao": "Atualizar planilha com os campos 'Espaço Utilizado' das storages; calcular média se houver múltiplos pools.",
      "requires_host": False},
     {"titulo": "Reunião com COTIN sobre virtualização",
-     "descricao": lambda: "Discutir com Uglaybe problemas da infraestrutura virtual.",
+     "descricao": "Discutir com Uglaybe problemas da infraestrutura virtual.",
      "requires_host": False},
     {"titulo": "Gerar relatório de servidores da DPGE",
-     "descricao": lambda: "Listar VMs alocadas na DPGE.",
+     "descricao": "Listar VMs alocadas na DPGE.",
      "requires_host": False},
     {"titulo": "Estudar viabilidade da plataforma Nutanix",
-     "descricao": lambda: "Avaliar viabilidade técnica de uso de ambiente Nutanix.",
+     "descricao": "Avaliar viabilidade técnica de uso de ambiente Nutanix.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do vRealize Log Insight",
-     "descricao": lambda: "Analisar viabilidade de uso do vRLI na infraestrutura atual.",
+     "descricao": "Analisar viabilidade de uso do vRLI na infraestrutura atual.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do Veeam Backup",
-     "descricao": lambda: "Analisar se Veeam Backup & Replication atende à proteção das VMs.",
+     "descricao": "Analisar se Veeam Backup & Replication atende à proteção das VMs.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do NetBackup IBM",
-     "descricao": lambda: "Avaliar se NetBackup IBM se integra bem com VMware.",
+     "descricao": "Avaliar se NetBackup IBM se integra bem com VMware.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do VxRail",
-     "descricao": lambda: "Analisar uso do Dell VxRail como plataforma HCI.",
+     "descricao": "Analisar uso do Dell VxRail como plataforma HCI.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do VMware vSAN",
-     "descricao": lambda: "Analisar possibilidade de uso do VMware vSAN.",
+     "descricao": "Analisar possibilidade de uso do VMware vSAN.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do Harvester",
-     "descricao": lambda: "Analisar Harvester como solução de virtualização Kubernetes.",
+     "descricao": "Analisar Harvester como solução de virtualização Kubernetes.",
      "requires_host": False},
     {"titulo": "Avaliar viabilidade do OpenShift Virtualization",
-     "descricao": lambda: "Analisar OpenShift Virtualization como camada de VM em K8s.",
+     "descricao": "Analisar OpenShift Virtualization como camada de VM em K8s.",
      "requires_host": False}
 ]
 
-def gerar_hosts(max_hosts=5, usados_hosts=set()):
-    while True:
-        hosts = random.sample(range(1, 1500), k=random.randint(1, max_hosts))
-        host_str = ", ".join(f"S{h:04d}.MS" for h in hosts)
-        if host_str not in usados_hosts:
-            usados_hosts.add(host_str)
-            return host_str
-
-def gerar_banco(total=100, max_hosts=5):
-    banco = []
-    usados_tarefas = set()
-    usados_hosts = set()
-
-    while len(banco) < total:
-        modelo = random.choice(MODELOS)
-        titulo = modelo["titulo"]() if callable(modelo["titulo"]) else modelo["titulo"]
-        if modelo["requires_host"]:
-            hosts = gerar_hosts(max_hosts, usados_hosts)
-            descricao = modelo["descricao"](hosts)
+def tamanho_espaco(modelo, max_hosts):
+    """Quantidade de pares (título, descrição) distintos que o modelo gera"""
+    if modelo["requires_host"]:
+        return sum(math.comb(HOST_RANGE, k) for k in range(1, max_hosts + 1))
+    return math.prod(len(opcoes) for opcoes in modelo.get("params", {}).values())
+
+def montar_texto(modelo, valores):
+    return modelo["titulo"].format(**valores), modelo["descricao"].format(**valores)
+
+def desenumerar(modelo, indice):
+    """Índice (base mista) -> valores dos parâmetros do modelo"""
+    valores = {}
+    for nome, opcoes in reversed(list(modelo.get("params", {}).items())):
+        indice, pos = divmod(indice, len(opcoes))
+        valores[nome] = opcoes[pos]
+    return valores
+
+class AmostradorModelo:
+    """Sorteia combinações de um modelo sem reposição e sabe quando o espaço acabou"""
+
+    def __init__(self, modelo, max_hosts, rng):
+        self.modelo = modelo
+        self.max_hosts = max_hosts
+        self.rng = rng
+        self.tamanho = tamanho_espaco(modelo, max_hosts)
+        self.usados = 0
+        self._ordem = None     # permutação de índices (espaços pequenos)
+        self._vistos = set()   # chaves sorteadas (espaços grandes)
+
+    @property
+    def esgotado(self):
+        return self.usados >= self.tamanho
+
+    def proximo(self):
+        if self.tamanho <= ENUM_LIMIT:
+            if self._ordem is None:
+                self._ordem = self.rng.sample(range(self.tamanho), self.tamanho)
+            valores = desenumerar(self.modelo, self._ordem[self.usados])
         else:
-            descricao = modelo["descricao"]() if callable(modelo["descricao"]) else modelo["descricao"]
-
-        if (titulo, descricao) in usados_tarefas:
-            continue
-        usados_tarefas.add((titulo, descricao))
-
-        est = round(random.uniform(0.7, 2.5), 1)
-        gst = round(est * random.uniform(0.85, 0.95), 1)
+            # Espaço muito maior que o pedido: colisões são raras e apenas descartadas
+            while True:
+                if self.modelo["requires_host"]:
+                    hosts = tuple(sorted(self.rng.sample(range(1, HOST_RANGE + 1), k=self.rng.randint(1, self.max_hosts))))
+                    chave = hosts
+                    valores = {"hosts": ", ".join(f"S{h:04d}.MS" for h in hosts)}
+                else:
+                    chave = self.rng.randrange(self.tamanho)
+                    valores = desenumerar(self.modelo, chave)
+                if chave not in self._vistos:
+                    self._vistos.add(chave)
+                    break
+        self.usados += 1
+        return montar_texto(self.modelo, valores)
+
+def gerar_banco(total=100, max_hosts=5, seed=None):
+    """
+    Gera até total tarefas distintas (título, descrição), uma por vez.
+
+    O modelo é sorteado entre os que ainda têm combinações livres. Retorna um
+    gerador; quando todos os modelos esgotam, a geração para antes de total.
+    """
+    rng = random.Random(seed)
+    amostradores = [AmostradorModelo(m, max_hosts, rng) for m in MODELOS]
+    gerados = 0
+    while gerados < total:
+        ativos = [a for a in amostradores if not a.esgotado]
+        if not ativos:
+            return
+        titulo, descricao = rng.choice(ativos).proximo()
+
+        est = round(rng.uniform(0.7, 2.5), 1)
+        gst = round(est * rng.uniform(0.85, 0.95), 1)
         comp = "Baixa" if est <= 1 else ("Alta" if est >= 2 else "Média")
 
-        banco.append({
+        gerados += 1
+        yield {
             "titulo": titulo,
             "descricao": descricao,
             "tempo_estimado": fmt_num(est),
             "tempo_gasto": fmt_num(gst),
             "complexidade": comp
-        })
+        }
+
+def espaco_total(max_hosts=5):
+    return sum(tamanho_espaco(m, max_hosts) for m in MODELOS)
 
-    return banco
+CAMPOS = ["titulo", "descricao", "tempo_estimado", "tempo_gasto", "complexidade"]
 
-# 🔁 LINHAS 100–110: salvar_csv com ordenação por título
-def salvar_csv(banco):
-    banco_ordenado = sorted(banco, key=lambda x: x["titulo"].lower())
+def _chave_ordem(linha):
+    return linha[0].lower()
+
+# 🔁 salvar_csv com ordenação por título em blocos (merge externo) e gravação atômica
+def salvar_csv(banco, chunk_size=CHUNK_SIZE):
     fname = f"tarefas_vmware_v2_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
     path = os.path.join(SCRIPT_DIR, fname)
-    with open(path, "w", encoding="utf-8-sig", newline="") as f:
-        w = csv.writer(f, delimiter=";")
-        w.writerow(["titulo", "descricao", "tempo_estimado", "tempo_gasto", "complexidade"])
-        for t in banco_ordenado:
-            w.writerow([t["titulo"], t["descricao"], t["tempo_estimado"], t["tempo_gasto"], t["complexidade"]])
-    print("✅ CSV salvo:", path, "|", len(banco_ordenado), "tarefas")
+
+    blocos = []
+    total = 0
+    try:
+        bloco = []
+        for t in banco:
+            bloco.append([t[c] for c in CAMPOS])
+            if len(bloco) >= chunk_size:
+                blocos.append(_gravar_bloco(bloco))
+                total += len(bloco)
+                bloco = []
+        if bloco or not blocos:
+            blocos.append(_gravar_bloco(bloco))
+            total += len(bloco)
+
+        leitores = [open(b, encoding="utf-8", newline="") for b in blocos]
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=".tarefas_", suffix=".csv", dir=SCRIPT_DIR)
+            with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+                w = csv.writer(f, delimiter=";")
+                w.writerow(CAMPOS)
+                w.writerows(heapq.merge(*(csv.reader(r, delimiter=";") for r in leitores), key=_chave_ordem))
+            os.chmod(tmp, 0o644)  # mkstemp cria 0600
+            os.replace(tmp, path)
+        finally:
+            for r in leitores:
+                r.close()
+    finally:
+        for b in blocos:
+            os.remove(b)
+
+    print("✅ CSV salvo:", path, "|", total, "tarefas")
+    return path, total
+
+def _gravar_bloco(bloco):
+    """Ordena o bloco por título e grava em arquivo temporário"""
+    bloco.sort(key=_chave_ordem)
+    fd, caminho = tempfile.mkstemp(prefix=".bloco_", suffix=".csv", dir=SCRIPT_DIR)
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, delimiter=";").writerows(bloco)
+    return caminho
 
 
 if __name__ == "__main__":
-    banco = gerar_banco(100)
-    salvar_csv(banco)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gera banco de tarefas VMware em CSV")
+    parser.add_argument("--total", type=int, default=100, help="Quantidade de tarefas (padrão 100)")
+    parser.add_argument("--max-hosts", type=int, default=5, help="Máximo de hosts por tarefa (padrão 5)")
+    parser.add_argument("--seed", type=int, help="Semente para reproduzir o banco")
+    args = parser.parse_args()
+
+    inicio = time.time()
+    _, gerado = salvar_csv(gerar_banco(args.total, args.max_hosts, args.seed))
+    print(f"Tempo: {time.time() - inicio:.1f}s")
+    if gerado < args.total:
+        print(f"⚠️ Espaço de combinações esgotado: apenas {gerado} tarefas distintas possíveis "
+              f"(pedido: {args.total}, espaço: {espaco_total(args.max_hosts)}).")
@@ -5,11 +5,17 @@ Fase 1: Foundation & Core Logic
 """
 
 import os
+import gzip
 import logging
 from datetime import datetime
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 from werkzeug.exceptions import HTTPException
 
+try:
+    import brotli  # Opcional: compressão br quando instalado
+except ImportError:
+    brotli = None
+
 # Configuração de caminhos e diretórios
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
@@ -35,7 +41,8 @@ app.config.update({
     'OWNER_ID': 2007,
     'CACHE_TTL_MINUTES': 15,
     'SELENIUM_TIMEOUT_MINUTES': 5,
-    'TIMEZONE': "America/Campo_Grande"
+    'TIMEZONE': "America/Campo_Grande",
+    'COMPRESS_MIN_BYTES': 1024  # Respostas JSON menores não são comprimidas
 })
 
 # Importar routes
@@ -56,6 +63,33 @@ app.register_blueprint(exclusions_bp)  # sem prefixo para rotas diretas
 app.register_blueprint(status_page_bp)  # página de status detalhado
 app.register_blueprint(calendar_bp)  # rotas do calendário
 
+@app.after_request
+def compress_json_response(response):
+    """Comprime respostas JSON com brotli/gzip conforme Accept-Encoding do cliente"""
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_BYTES']:
+        return response
+    
+    accept_encoding = request.headers.get('Accept-Encoding', '').lower()
+    if brotli is not None and 'br' in accept_encoding:
+        response.set_data(brotli.compress(data, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accept_encoding:
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/')
 def index():
     """Página inicial da aplicação"""
@@ -124,6 +124,28 @@ class CacheManager:
             logger.error(f"Erro ao invalidar cache {key}: {str(e)}")
             return False
     
+    def invalidate_prefix(self, prefix: str) -> int:
+        """
+        Remove todas as entradas cujas chaves começam com o prefixo
+        
+        Args:
+            prefix: Prefixo das chaves
+            
+        Returns:
+            Número de entradas removidas
+        """
+        removed = 0
+        try:
+            for cache_file in self.cache_dir.glob(f"{prefix}*.json"):
+                if cache_file.name.endswith("_persistent.json"):
+                    continue
+                cache_file.unlink()
+                removed += 1
+            logger.debug(f"Cache invalidado para prefixo: {prefix} ({removed} entradas)")
+        except Exception as e:
+            logger.error(f"Erro ao invalidar cache com prefixo {prefix}: {str(e)}")
+        return removed
+    
     def clear_all(self) -> bool:
         """
         Limpa todo o cache
@@ -227,6 +249,58 @@ class PersistentCache(CacheManager):
         except Exception as e:
             logger.error(f"Erro ao salvar cache persistente {key}: {str(e)}")
             return False
+    
+    def set_persistent_many(self, items: Dict[str, Any]) -> bool:
+        """Armazena várias chaves persistentes com uma única escrita em disco"""
+        if not items:
+            return True
+        try:
+            persistent_data = {}
+            if self.persistent_file.exists():
+                with open(self.persistent_file, 'r', encoding='utf-8') as f:
+                    persistent_data = json.load(f)
+            
+            now = datetime.now().isoformat()
+            for key, data in items.items():
+                persistent_data[key] = {
+                    "data": data,
+                    "last_updated": now
+                }
+            
+            with open(self.persistent_file, 'w', encoding='utf-8') as f:
+                json.dump(persistent_data, f, indent=2, ensure_ascii=False, cls=DecimalEncoder)
+            
+            logger.debug(f"Cache persistente atualizado em lote: {len(items)} chaves")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache persistente em lote: {str(e)}")
+            return False
+    
+    def expire_persistent(self, key: str) -> bool:
+        """
+        Marca a chave persistente como expirada (próxima leitura com refresh busca de novo)
+        
+        Os dados ficam no arquivo e ainda servem de fallback se o refresh falhar.
+        """
+        try:
+            if not self.persistent_file.exists():
+                return False
+            with open(self.persistent_file, 'r', encoding='utf-8') as f:
+                persistent_data = json.load(f)
+            if key not in persistent_data:
+                return False
+            
+            persistent_data[key]["last_updated"] = datetime.min.isoformat()
+            with open(self.persistent_file, 'w', encoding='utf-8') as f:
+                json.dump(persistent_data, f, indent=2, ensure_ascii=False, cls=DecimalEncoder)
+            
+            logger.debug(f"Cache persistente expirado: {key}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro ao expirar cache persistente {key}: {str(e)}")
+            return False
 
 
 class AutoRefreshCache(PersistentCache):
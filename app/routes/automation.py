@@ -8,8 +8,10 @@ from flask import Blueprint, jsonify, request, render_template
 from app.services.workorder_service import WorkOrderService
 from app.services.cache_service import CacheService
 from app.services.selenium_service import selenium_service
+from app.services.automation_queue_service import parse_priority
 from app.services.execution_cache_service import execution_cache_service
 from app.services.task_deduplication_service import task_deduplication_service
+from app.services.task_similarity_service import task_similarity_service
 
 automation_bp = Blueprint('automation', __name__)
 
@@ -28,16 +30,25 @@ def run_automation():
     Request JSON:
         {
             "hours_target": 8.0,
-            "workorder_id": 540030  // opcional
+            "workorder_id": 540030,  // opcional
+            "priority": "normal"     // opcional: high, normal, low
         }
     
     Returns:
         202 JSON com execution_id para polling
+        429 quando a fila de automação está cheia (header Retry-After)
     """
     try:
         data = request.get_json() or {}
         hours_target = data.get('hours_target', 8.0)
         workorder_id_override = data.get('workorder_id')
+        try:
+            priority = parse_priority(data.get('priority'))
+        except (ValueError, TypeError):
+            return jsonify({
+                "error": "Prioridade inválida. Use high, normal ou low.",
+                "priority": data.get('priority')
+            }), 400
         
         # Validar horas alvo
         try:
@@ -91,8 +102,13 @@ def run_automation():
             "title": workorder.title
         })
         
-        # Iniciar automação com verificação SQL
-        result = selenium_service.start_automation(workorder.workorder_id, hours_target)
+        # Enfileirar automação com verificação SQL
+        result = selenium_service.start_automation(workorder.workorder_id, hours_target, priority)
+        
+        if result.get("status") == "rejected":
+            response = jsonify(result)
+            response.headers['Retry-After'] = str(result.get("retry_after", 60))
+            return response, 429
         
         if result.get("error"):
             # Registrar falha
@@ -128,7 +144,7 @@ def get_automation_result(execution_id: str):
         
     Returns:
         JSON com status e resultados da execução
-        Possíveis status: started, running, success, no_tasks_detected, error, timeout, aborted
+        Possíveis status: queued, started, running, success, no_tasks_detected, error, timeout, aborted, rejected
     """
     try:
         result = selenium_service.get_execution_result(execution_id)
@@ -138,7 +154,7 @@ def get_automation_result(execution_id: str):
         
         # Determinar código HTTP baseado no status
         status_code = 200
-        if result.get("status") in ["started", "running"]:
+        if result.get("status") in ["queued", "started", "running"]:
             status_code = 202  # Still processing
         elif result.get("status") == "error":
             status_code = 500
@@ -263,6 +279,11 @@ def run_automation_sync():
         # Iniciar automação
         start_result = selenium_service.start_automation(workorder.workorder_id, hours_target)
         
+        if start_result.get("status") == "rejected":
+            response = jsonify(start_result)
+            response.headers['Retry-After'] = str(start_result.get("retry_after", 60))
+            return response, 429
+        
         if start_result.get("error"):
             return jsonify(start_result), 500
         
@@ -276,7 +297,7 @@ def run_automation_sync():
         while time.time() - start_time < timeout_seconds:
             result = selenium_service.get_execution_result(execution_id)
             
-            if result.get("status") not in ["started", "running"]:
+            if result.get("status") not in ["queued", "started", "running"]:
                 # Automação completou
                 if result.get("status") == "success":
                     task_count = len(result.get("created_task_ids", []))
@@ -386,6 +407,33 @@ def get_last_execution():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@automation_bp.route('/queue', methods=['GET'])
+def get_automation_queue():
+    """Retorna métricas da fila de automação (profundidade, em execução, tempos médios)"""
+    try:
+        return jsonify({
+            "success": True,
+            "queue": selenium_service.queue.get_metrics(),
+            "daemon": selenium_service.get_daemon_status()
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@automation_bp.route('/executions/<int:workorder_id>', methods=['GET'])
+def list_workorder_executions(workorder_id: int):
+    """Retorna as execuções registradas para um chamado (registro persistente)"""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        executions = selenium_service.list_executions(workorder_id, limit)
+        return jsonify({
+            "success": True,
+            "workorder_id": workorder_id,
+            "executions": executions,
+            "count": len(executions)
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @automation_bp.route('/system/info', methods=['GET'])
 def get_system_info():
     """Retorna informações gerais do sistema"""
@@ -420,6 +468,7 @@ def analyze_task_duplicates():
             "hours_target": hours_target,
             "deduplication_report": analysis_report,
             "selection_analysis": selenium_analysis,
+            "bank_near_duplicates": task_similarity_service.get_bank_clusters(),
             "timestamp": datetime.now().isoformat()
         })
         
@@ -4,12 +4,53 @@ Rotas para funcionalidades do calendário de produtividade.
 from flask import Blueprint, jsonify, request
 from datetime import datetime, date
 import logging
-from app.services.calendar_service import CalendarService
+from app.services.calendar_service import CalendarService, compact_calendar_payload, MAX_OWNERS_PER_QUERY
 from app.services.calendar_cache_service import calendar_cache_service
+from app.services.calendar_rollup_service import calendar_rollup_service
+from app.services.http_cache_service import http_cache_service
+from app.services.owner_index_service import owner_index_service
 
 logger = logging.getLogger(__name__)
 
 calendar_bp = Blueprint('calendar', __name__, url_prefix='/calendar')
+calendar_bp.after_request(http_cache_service.apply_conditional_get)
+
+def _shape_calendar_data(data):
+    """Aplica ?format=compact e ?fields= ao payload do calendário"""
+    if request.args.get('format', '').lower() != 'compact':
+        return data
+    fields_param = request.args.get('fields', '')
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+    return compact_calendar_payload(data, fields or None)
+
+def _parse_owner_ids(owner_ids_param):
+    """Converte ?owner_ids=2007,2010 em lista de inteiros (sem repetição)"""
+    owner_ids = []
+    for part in owner_ids_param.split(','):
+        part = part.strip()
+        if part and int(part) not in owner_ids:
+            owner_ids.append(int(part))
+    if not owner_ids or len(owner_ids) > MAX_OWNERS_PER_QUERY:
+        raise ValueError(f"Informe de 1 a {MAX_OWNERS_PER_QUERY} OWNERIDs")
+    return owner_ids
+
+def _get_owners_calendar_data(owner_ids, reference_date):
+    """Resposta de /calendar/data para vários técnicos (uma consulta SQL)"""
+    if reference_date:
+        owners_data = CalendarService().get_calendar_data_for_owners(owner_ids, reference_date)
+    else:
+        force_refresh = request.args.get('force_refresh', '').lower() == 'true'
+        owners_data = calendar_cache_service.get_calendar_data_for_owners(owner_ids, force_refresh=force_refresh)
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'owners': {str(owner_id): _shape_calendar_data(data) for owner_id, data in owners_data.items()}
+        },
+        'owner_ids': owner_ids,
+        'cached': not reference_date,
+        'using_reference_date': bool(reference_date)
+    })
 
 @calendar_bp.route('/data', methods=['GET'])
 def get_calendar_data():
@@ -19,6 +60,9 @@ def get_calendar_data():
     Query params opcionais:
     - reference_date: Data de referência no formato YYYY-MM-DD
     - force_refresh: Força atualização dos dados (true/false)
+    - format: 'compact' para semanas referenciando dias por chave e sem lista de tarefas
+    - fields: Campos diários a manter no formato compacto (ex.: hours_worked,calendar_color,tasks)
+    - owner_ids: Lista de OWNERIDs separados por vírgula (calendário da equipe em uma consulta)
     """
     try:
         # Parse da data de referência se fornecida
@@ -33,6 +77,17 @@ def get_calendar_data():
                     'error': 'Formato de data inválido. Use YYYY-MM-DD.'
                 }), 400
 
+        owner_ids_param = request.args.get('owner_ids')
+        if owner_ids_param:
+            try:
+                owner_ids = _parse_owner_ids(owner_ids_param)
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': f'owner_ids inválido. Use até {MAX_OWNERS_PER_QUERY} inteiros separados por vírgula.'
+                }), 400
+            return _get_owners_calendar_data(owner_ids, reference_date)
+
         # Se uma data de referência específica foi fornecida, usar CalendarService diretamente
         # para evitar problemas com cache que só funciona para o período atual
         if reference_date:
@@ -42,7 +97,7 @@ def get_calendar_data():
             
             return jsonify({
                 'success': True,
-                'data': data,
+                'data': _shape_calendar_data(data),
                 'cached': False,
                 'using_reference_date': True
             })
@@ -53,10 +108,17 @@ def get_calendar_data():
         try:
             # Tenta obter dados do cache
             data = calendar_cache_service.get_calendar_data(force_refresh=force_refresh)
-            
+            if data.get('last_updated'):
+                # Versão = last_updated do cache: 304 antes de montar/serializar o payload
+                not_modified = http_cache_service.check_version(
+                    data['last_updated'], last_modified=datetime.fromisoformat(data['last_updated'])
+                )
+                if not_modified is not None:
+                    return not_modified
+
             return jsonify({
                 'success': True,
-                'data': data,
+                'data': _shape_calendar_data(data),
                 'cached': not force_refresh,
                 'cache_status': calendar_cache_service.get_cache_status()
             })
@@ -73,7 +135,7 @@ def get_calendar_data():
 
             return jsonify({
                 'success': True,
-                'data': data,
+                'data': _shape_calendar_data(data),
                 'cached': False,
                 'fallback': True
             })
@@ -85,6 +147,71 @@ def get_calendar_data():
             'error': 'Erro interno do servidor'
         }), 500
 
+@calendar_bp.route('/range', methods=['GET'])
+def get_calendar_range():
+    """
+    Retorna agregações por dia, semana, período 26->25 e ano para vários períodos
+    com uma única consulta SQL. Períodos fechados são servidos de rollups persistentes.
+    
+    Query params opcionais:
+    - year: Ano (YYYY) - todos os períodos que terminam no ano (26/12 a 25/12)
+    - start_date / end_date: Intervalo no formato YYYY-MM-DD (alternativa a year)
+    - include_days: Inclui agregação diária de cada período (true/false)
+    - owner_id: OWNERID do técnico (padrão: usuário da aplicação)
+    """
+    try:
+        year_str = request.args.get('year')
+        start_str = request.args.get('start_date')
+        end_str = request.args.get('end_date')
+        
+        try:
+            if start_str or end_str:
+                start_date = datetime.strptime(start_str or end_str, '%Y-%m-%d').date()
+                end_date = datetime.strptime(end_str or start_str, '%Y-%m-%d').date()
+            else:
+                year = int(year_str) if year_str else date.today().year
+                start_date = date(year, 1, 1)
+                end_date = date(year, 12, 25)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetros inválidos. Use year=YYYY ou start_date/end_date no formato YYYY-MM-DD.'
+            }), 400
+        
+        include_days = request.args.get('include_days', '').lower() == 'true'
+        owner_id = request.args.get('owner_id', type=int)
+        if request.args.get('owner_id') and owner_id is None:
+            return jsonify({
+                'success': False,
+                'error': 'owner_id inválido. Use um inteiro.'
+            }), 400
+        
+        try:
+            data = calendar_rollup_service.get_range_data(start_date, end_date, owner_id=owner_id,
+                                                          include_days=include_days)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except RuntimeError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro na rota de intervalo do calendário: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erro interno do servidor'
+        }), 500
+
 @calendar_bp.route('/day/<date_str>', methods=['GET'])
 def get_day_details(date_str):
     """
@@ -122,7 +249,8 @@ def get_cache_status():
         status = calendar_cache_service.get_cache_status()
         return jsonify({
             'success': True,
-            'cache_status': status
+            'cache_status': status,
+            'owner_index': owner_index_service.get_status()
         })
     except Exception as e:
         logger.error(f"Erro ao obter status do cache: {e}")
@@ -136,6 +264,7 @@ def invalidate_cache():
     """Invalida cache do calendário"""
     try:
         calendar_cache_service.invalidate_calendar_cache()
+        owner_index_service.invalidate()
         return jsonify({
             'success': True,
             'message': 'Cache invalidado com sucesso'
@@ -1,8 +1,14 @@
+import os
 from flask import Blueprint, jsonify, request
-from datetime import datetime, date
+from datetime import datetime, date, time
 from app.services.period_service import compute_capacity_for_current_period
+from app.services.http_cache_service import http_cache_service
+from app.services.period_plan_service import period_plan_service
 
 capacity_bp = Blueprint('capacity', __name__)
+capacity_bp.after_request(http_cache_service.apply_conditional_get)
+
+EXCLUSIONS_FILE = os.path.join("data", "exclusions.json")
 
 @capacity_bp.route('/api', methods=['GET'])
 def capacity_api():
@@ -22,11 +28,51 @@ def capacity_api():
                 "example": "/capacity/api?reference=2025-08-22"
             }), 400
 
+    # Capacidade muda com a data (período vigente) e com o arquivo de exclusões:
+    # a versão é conhecida antes do cálculo, então o 304 dispensa o recálculo
+    last_modified = datetime.combine(date.today(), time.min)
+    exclusions_mtime = None
+    if os.path.exists(EXCLUSIONS_FILE):
+        exclusions_mtime = os.path.getmtime(EXCLUSIONS_FILE)
+        last_modified = max(last_modified, datetime.fromtimestamp(exclusions_mtime))
+    not_modified = http_cache_service.check_version(date.today().isoformat(), exclusions_mtime,
+                                                    last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
     data = compute_capacity_for_current_period(ref_date)
+
     # Formatação amigável adicional
     data["period_display"] = f"{datetime.fromisoformat(data['period_start']).strftime('%d/%m/%Y')} - {datetime.fromisoformat(data['period_end']).strftime('%d/%m/%Y')}"
     return jsonify(data)
 
+@capacity_bp.route('/plan', methods=['GET'])
+def capacity_plan():
+    """
+    API: plano de tarefas dos dias úteis restantes do período vigente.
+    Parâmetros opcionais: ?refresh=1 para remontar, ?reference=YYYY-MM-DD e ?seed=N.
+    """
+    ref_param = request.args.get('reference')
+    ref_date: date | None = None
+    if ref_param:
+        try:
+            ref_date = datetime.strptime(ref_param, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                "error": "Parâmetro 'reference' inválido. Use YYYY-MM-DD.",
+                "example": "/capacity/plan?reference=2025-08-22"
+            }), 400
+
+    seed = request.args.get('seed', type=int)
+    if seed is not None:
+        plan = period_plan_service.build_plan(ref_date, seed=seed)
+    else:
+        plan = period_plan_service.get_plan(ref_date, force_refresh=request.args.get('refresh') == '1')
+
+    if plan.get("error"):
+        return jsonify(plan), 500
+    return jsonify(plan)
+
 # Mantém a rota /demo para compatibilidade com a homepage atual
 @capacity_bp.route('/demo', methods=['GET'])
 def capacity_demo():
@@ -1,15 +1,23 @@
 """
 Rota para página de status detalhado do sistema.
 """
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
 import logging
+import threading
 import time
 import pyodbc
 from datetime import datetime
+from app.services.http_cache_service import http_cache_service
 
 logger = logging.getLogger(__name__)
 
 status_page_bp = Blueprint('status_page', __name__)
+status_page_bp.after_request(http_cache_service.apply_conditional_get)
+
+# Validade do último teste de conexão SQL (o dashboard consulta a cada 30s)
+SQL_TEST_TTL_SECONDS = 60
+_sql_test_cache = {'result': None, 'checked_at': None}
+_sql_test_lock = threading.Lock()
 
 @status_page_bp.route('/status-page')
 def status_page():
@@ -23,7 +31,34 @@ def status_page():
 
 @status_page_bp.route('/status/sql-test')
 def test_sql_connection():
-    """Testa a conexão SQL detalhadamente"""
+    """
+    Testa a conexão SQL detalhadamente
+    
+    O resultado fica em memória por SQL_TEST_TTL_SECONDS para que o auto-refresh
+    do dashboard não abra uma conexão a cada poll (e receba 304 enquanto não mudar).
+    Use ?refresh=true para forçar um novo teste.
+    """
+    force_refresh = request.args.get('refresh', 'false').lower() == 'true'
+    
+    # Polls simultâneos esperam o teste em andamento em vez de abrir outra conexão
+    with _sql_test_lock:
+        cached = _sql_test_cache.get('result')
+        if (cached is None or force_refresh
+                or (datetime.now() - _sql_test_cache['checked_at']).total_seconds() > SQL_TEST_TTL_SECONDS):
+            cached = _run_sql_test()
+            _sql_test_cache['result'] = cached
+            _sql_test_cache['checked_at'] = datetime.now()
+        checked_at = _sql_test_cache['checked_at']
+    
+    payload, status_code = cached
+    if status_code == 200:
+        not_modified = http_cache_service.check_version(checked_at.isoformat(), last_modified=checked_at)
+        if not_modified is not None:
+            return not_modified
+    return jsonify(payload), status_code
+
+def _run_sql_test():
+    """Executa o teste de conexão SQL e retorna (payload, status_code)"""
     try:
         start_time = time.time()
         
@@ -46,33 +81,33 @@ def test_sql_connection():
                 
                 driver_name = "ODBC Driver 17" if i == 0 else "ODBC Driver 18"
                 
-                return jsonify({
+                return {
                     'status': 'success',
                     'driver': f'{driver_name} for SQL Server',
                     'server': 'S0680.ms',
                     'database': 'Servicedesk_2022',
                     'latency_ms': latency_ms,
                     'timestamp': datetime.now().isoformat()
-                })
+                }, 200
                 
             except Exception as driver_error:
                 logger.debug(f"Driver {i+1} falhou: {driver_error}")
                 continue
         
         # Se chegou aqui, nenhum driver funcionou
-        return jsonify({
+        return {
             'status': 'error',
             'error': 'Nenhum driver ODBC funcionou',
             'timestamp': datetime.now().isoformat()
-        }), 500
+        }, 500
         
     except Exception as e:
         logger.error(f"Erro na conexão SQL: {e}")
-        return jsonify({
+        return {
             'status': 'error',
             'error': str(e),
             'timestamp': datetime.now().isoformat()
-        }), 500
+        }, 500
 
 @status_page_bp.route('/api/system-status')
 def system_status_api():
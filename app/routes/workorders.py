@@ -7,8 +7,10 @@ from flask import Blueprint, jsonify, request
 from app.services.workorder_service import WorkOrderService
 from app.services.cache_service import CacheService
 from app.services.user_tasks_cache_service import user_tasks_cache_service
+from app.services.http_cache_service import http_cache_service
 
 workorders_bp = Blueprint('workorders', __name__)
+workorders_bp.after_request(http_cache_service.apply_conditional_get)
 
 @workorders_bp.route('/current', methods=['GET'])
 def get_current_workorder():
@@ -41,6 +43,13 @@ def get_current_workorder():
                     "workorder_id": None
                 }), 404
         
+        if workorder.updated_at:
+            not_modified = http_cache_service.check_version(
+                workorder.workorder_id, workorder.updated_at.isoformat(), workorder.source,
+                last_modified=workorder.updated_at
+            )
+            if not_modified is not None:
+                return not_modified
         return jsonify(workorder.to_dict()), 200
         
     except Exception as e:
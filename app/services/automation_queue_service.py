@@ -0,0 +1,196 @@
+"""
+Automation Queue Service
+Fila de execuções da automação com pool de workers.
+
+- Número de workers configurável (AUTOMATION_WORKERS, padrão 1: um navegador por vez)
+- Execuções do mesmo chamado nunca rodam em paralelo
+- Prioridades (menor valor = mais urgente; FIFO dentro da mesma prioridade)
+- Back-pressure: submit recusa novos jobs quando a fila está cheia (AUTOMATION_QUEUE_MAX)
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.getenv("AUTOMATION_WORKERS", "1"))
+DEFAULT_MAX_QUEUE = int(os.getenv("AUTOMATION_QUEUE_MAX", "10"))
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_NAMES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+
+class QueueFullError(Exception):
+    """Fila de automação cheia (o cliente deve tentar novamente depois)"""
+
+    def __init__(self, depth: int, retry_after_seconds: int):
+        super().__init__(f"Fila de automação cheia ({depth} execuções aguardando)")
+        self.depth = depth
+        self.retry_after_seconds = retry_after_seconds
+
+
+def parse_priority(value: Any) -> int:
+    """Converte 'high'/'normal'/'low' ou inteiro em prioridade (padrão: normal)"""
+    if value is None:
+        return PRIORITY_NORMAL
+    if isinstance(value, str):
+        if value.strip().lower() in PRIORITY_NAMES:
+            return PRIORITY_NAMES[value.strip().lower()]
+        value = int(value)
+    return max(PRIORITY_HIGH, min(PRIORITY_LOW, int(value)))
+
+
+class AutomationQueueService:
+    """Fila com prioridade e pool de workers para execuções da automação"""
+
+    def __init__(self, handler: Callable[[str], None], workers: int = DEFAULT_WORKERS,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        """
+        Args:
+            handler: Função executada por job (recebe o execution_id; retorna False
+                quando a execução falhou, o que conta em "failed")
+            workers: Número de workers
+            max_queue: Máximo de jobs aguardando
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running: Dict[str, Dict[str, Any]] = {}  # execution_id -> job
+        self._running_workorders: Set[int] = set()
+        self._threads: List[threading.Thread] = []
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "total_wait_seconds": 0.0,
+            "total_run_seconds": 0.0
+        }
+
+    def _ensure_workers(self):
+        """Inicia os workers na primeira submissão (chamado com o lock)"""
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker_loop, name=f"automation-worker-{len(self._threads) + 1}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _estimate_retry_after(self) -> int:
+        """Estimativa de espera para o cliente (Retry-After)"""
+        finished = self._metrics["completed"] + self._metrics["failed"]
+        avg_run = self._metrics["total_run_seconds"] / finished if finished else 120
+        return int(max(5, avg_run * (len(self._heap) + 1) / self.workers))
+
+    def submit(self, execution_id: str, workorder_id: int, priority: int = PRIORITY_NORMAL) -> int:
+        """
+        Enfileira uma execução
+
+        Returns:
+            Posição na fila (1 = próxima)
+
+        Raises:
+            QueueFullError: Se a fila atingiu o limite
+        """
+        with self._cond:
+            if len(self._heap) >= self.max_queue:
+                self._metrics["rejected"] += 1
+                raise QueueFullError(len(self._heap), self._estimate_retry_after())
+
+            job = {
+                "execution_id": execution_id,
+                "workorder_id": workorder_id,
+                "priority": priority,
+                "enqueued_at": time.monotonic()
+            }
+            seq = next(self._seq)
+            heapq.heappush(self._heap, (priority, seq, job))
+            self._metrics["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify_all()
+
+            position = sum(1 for entry in self._heap if entry[:2] <= (priority, seq))
+            logger.info(f"Execução {execution_id} enfileirada (chamado {workorder_id}, prioridade {priority}, "
+                        f"posição {position})")
+            return position
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        """Retira o job mais prioritário cujo chamado não está em execução (chamado com o lock)"""
+        for entry in sorted(self._heap):
+            job = entry[2]
+            if job["workorder_id"] not in self._running_workorders:
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running[job["execution_id"]] = job
+                self._running_workorders.add(job["workorder_id"])
+                started = time.monotonic()
+                self._metrics["total_wait_seconds"] += started - job["enqueued_at"]
+
+            success = False
+            try:
+                success = self.handler(job["execution_id"]) is not False
+            except Exception as e:
+                success = False
+                logger.error(f"Erro no worker da automação ({job['execution_id']}): {str(e)}", exc_info=True)
+            finally:
+                with self._cond:
+                    self._running.pop(job["execution_id"], None)
+                    self._running_workorders.discard(job["workorder_id"])
+                    self._metrics["total_run_seconds"] += time.monotonic() - started
+                    self._metrics["completed" if success else "failed"] += 1
+                    # Libera jobs do mesmo chamado que estavam aguardando
+                    self._cond.notify_all()
+
+    def get_position(self, execution_id: str) -> Optional[int]:
+        """Posição de uma execução na fila (None se não está aguardando)"""
+        with self._cond:
+            for position, entry in enumerate(sorted(self._heap), start=1):
+                if entry[2]["execution_id"] == execution_id:
+                    return position
+        return None
+
+    def is_known(self, execution_id: str) -> bool:
+        """Indica se a execução está aguardando ou em andamento nesta fila"""
+        with self._cond:
+            return execution_id in self._running or any(
+                entry[2]["execution_id"] == execution_id for entry in self._heap
+            )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Profundidade da fila, execuções em andamento e contadores"""
+        with self._cond:
+            finished = self._metrics["completed"] + self._metrics["failed"]
+            started = finished + len(self._running)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": len(self._heap),
+                "running": len(self._running),
+                "running_workorders": sorted(self._running_workorders),
+                "submitted": self._metrics["submitted"],
+                "completed": self._metrics["completed"],
+                "failed": self._metrics["failed"],
+                "rejected": self._metrics["rejected"],
+                "avg_wait_seconds": round(self._metrics["total_wait_seconds"] / started, 2) if started else None,
+                "avg_run_seconds": round(self._metrics["total_run_seconds"] / finished, 2) if finished else None
+            }
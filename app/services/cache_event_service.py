@@ -0,0 +1,91 @@
+"""
+Cache Event Service
+Barramento de eventos em processo para invalidação de caches.
+
+Quem altera dados publica um evento (ex.: tarefas criadas, exclusão alterada) e
+cada serviço de cache assina os eventos que o afetam, invalidando apenas as
+chaves atingidas. Assim quem publica não precisa conhecer os caches.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Eventos publicados
+# tasks_created(workorder_id: int, dates: List[date], owner_id: int, tasks: List[Dict])
+TASKS_CREATED = "tasks_created"
+# exclusion_changed(dates: List[date])
+EXCLUSION_CHANGED = "exclusion_changed"
+
+
+class CacheEventService:
+    """Barramento síncrono de eventos de invalidação"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[..., Any]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event: str, handler: Callable[..., Any]):
+        """
+        Registra um handler para o evento
+
+        Args:
+            event: Nome do evento (TASKS_CREATED, EXCLUSION_CHANGED)
+            handler: Função chamada com os argumentos nomeados do evento
+        """
+        with self._lock:
+            if handler not in self._handlers[event]:
+                self._handlers[event].append(handler)
+
+    def publish(self, event: str, **payload) -> int:
+        """
+        Publica um evento para os handlers registrados
+
+        Falhas em um handler são registradas em log e não impedem os demais.
+
+        Returns:
+            Número de handlers executados com sucesso
+        """
+        with self._lock:
+            handlers = list(self._handlers.get(event, []))
+
+        handled = 0
+        for handler in handlers:
+            try:
+                handler(**payload)
+                handled += 1
+            except Exception as e:
+                logger.warning(f"Erro no handler {getattr(handler, '__qualname__', handler)} "
+                               f"do evento {event}: {str(e)}")
+
+        logger.info(f"Evento {event} publicado: {handled}/{len(handlers)} handlers")
+        return handled
+
+    def get_subscriptions(self) -> Dict[str, List[str]]:
+        """Retorna os handlers registrados por evento (para diagnóstico)"""
+        with self._lock:
+            return {
+                event: [getattr(h, '__qualname__', repr(h)) for h in handlers]
+                for event, handlers in self._handlers.items()
+            }
+
+
+def normalize_dates(dates) -> List[date]:
+    """Converte datas (date ou 'YYYY-MM-DD') em lista ordenada sem repetição"""
+    result = set()
+    for value in dates or []:
+        if isinstance(value, datetime):
+            result.add(value.date())
+        elif isinstance(value, date):
+            result.add(value)
+        elif value:
+            result.add(date.fromisoformat(str(value)[:10]))
+    return sorted(result)
+
+
+# Instância global do serviço
+cache_event_service = CacheEventService()
@@ -4,12 +4,17 @@ Serviço de cache para dados do calendário
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Any, Optional
 from app.models.cache import AutoRefreshCache
+from app.services.cache_event_service import cache_event_service, normalize_dates, TASKS_CREATED, EXCLUSION_CHANGED
+from app.services.period_service import get_current_26_25_period
 
 logger = logging.getLogger(__name__)
 
+# Validade do calendário em cache (TTL de calendar_data e do índice em memória)
+CALENDAR_TTL_MINUTES = 5
+
 
 class CalendarCacheService:
     """Serviço de cache para dados do calendário"""
@@ -20,6 +25,23 @@ class CalendarCacheService:
             refresh_callback=self._fetch_calendar_data,
             auto_refresh_minutes=999  # Desabilitar auto-refresh temporariamente - 999 minutos
         )
+        # Índice em memória do período em cache (evita reler o JSON a cada clique em um dia)
+        self._period_index: Optional[Dict[str, Any]] = None
+        self._period_index_updated: Optional[datetime] = None
+    
+    def _set_period_index(self, calendar_data: Optional[Dict[str, Any]]):
+        """Atualiza o índice em memória com os dados do período (idade = last_updated dos dados)"""
+        if calendar_data and calendar_data.get('daily_data'):
+            self._period_index = calendar_data
+            try:
+                self._period_index_updated = datetime.fromisoformat(calendar_data['last_updated'])
+            except (KeyError, TypeError, ValueError):
+                self._period_index_updated = datetime.now()
+    
+    def _period_index_fresh(self) -> bool:
+        """Índice carregado e com dados mais novos que CALENDAR_TTL_MINUTES"""
+        return (self._period_index is not None and self._period_index_updated is not None
+                and datetime.now() - self._period_index_updated <= timedelta(minutes=CALENDAR_TTL_MINUTES))
     
     def _fetch_calendar_data(self) -> Optional[Dict[str, Any]]:
         """Busca dados do calendário usando o serviço original"""
@@ -68,12 +90,14 @@ class CalendarCacheService:
             if fresh_data:
                 self.cache.set("calendar_data", fresh_data)
                 self.cache.set_persistent("calendar_data", fresh_data)
+                self._set_period_index(fresh_data)
                 return fresh_data
         
         # Tenta obter do cache com auto-refresh
-        cached_data = self.cache.get_with_auto_refresh("calendar_data", ttl_minutes=5)
+        cached_data = self.cache.get_with_auto_refresh("calendar_data", ttl_minutes=CALENDAR_TTL_MINUTES)
         
         if cached_data:
+            self._set_period_index(cached_data)
             return cached_data
         
         # Fallback: tentar serviço original diretamente
@@ -103,16 +127,168 @@ class CalendarCacheService:
             "error": "Dados não disponíveis"
         }
     
+    def get_calendar_data_for_owners(self, owner_ids: List[int], force_refresh: bool = False) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtém calendários de vários técnicos (cache por técnico)
+        
+        Os técnicos sem cache válido são buscados juntos numa única consulta SQL.
+        
+        Args:
+            owner_ids: OWNERIDs dos técnicos
+            force_refresh: Ignorar cache
+            
+        Returns:
+            Dict owner_id -> dados do calendário
+        """
+        result: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+        
+        for owner_id in owner_ids:
+            cached_data = None if force_refresh else self.cache.get(f"calendar_data_{owner_id}", ttl_minutes=CALENDAR_TTL_MINUTES)
+            if cached_data:
+                result[owner_id] = cached_data
+            else:
+                missing.append(owner_id)
+        
+        if missing:
+            from app.services.calendar_service import CalendarService
+            
+            fetched = CalendarService().get_calendar_data_for_owners(missing)
+            now = datetime.now().isoformat()
+            for owner_id, calendar_data in fetched.items():
+                calendar_data["last_updated"] = now
+                calendar_data["cached"] = True
+                self.cache.set(f"calendar_data_{owner_id}", calendar_data)
+                result[owner_id] = calendar_data
+            logger.info(f"Calendário multi-owner: {len(owner_ids) - len(missing)} do cache, "
+                        f"{len(missing)} buscados em uma consulta")
+        
+        return {owner_id: result[owner_id] for owner_id in owner_ids if owner_id in result}
+    
+    def set_calendar_data(self, calendar_data: Dict[str, Any]):
+        """Armazena dados do calendário no cache (TTL, persistente e índice em memória)"""
+        self.cache.set("calendar_data", calendar_data)
+        self.cache.set_persistent("calendar_data", calendar_data)
+        self._set_period_index(calendar_data)
+    
+    def get_cached_day(self, target_date: date) -> Optional[Dict[str, Any]]:
+        """
+        Obtém dados de um dia a partir do período em cache, sem consultar o SQL
+        
+        O índice vale por CALENDAR_TTL_MINUTES (mesmo TTL de calendar_data), contado
+        a partir do last_updated dos dados: cópias antigas do disco não são usadas.
+        
+        Args:
+            target_date: Data do dia
+            
+        Returns:
+            Dados do dia (mesma estrutura de daily_data) ou None se o dia não está em cache válido
+        """
+        if not self._period_index_fresh():
+            # Índice vazio ou vencido (ex.: após restart ou alterado por outro processo)
+            self._period_index = None
+            self._set_period_index(self.cache.get("calendar_data", ttl_minutes=CALENDAR_TTL_MINUTES))
+            if not self._period_index_fresh():
+                return None
+        
+        return self._period_index['daily_data'].get(target_date.isoformat())
+    
     def invalidate_calendar_cache(self):
         """Invalida cache do calendário"""
         self.cache.invalidate("calendar_data")
+        self.cache.expire_persistent("calendar_data")
+        self.cache.invalidate_prefix("calendar_data_")
+        self._period_index = None
         logger.info("Cache do calendário invalidado")
     
+    def invalidate_dates(self, dates: List[date], owner_id: Optional[int] = None):
+        """
+        Invalida apenas os calendários em cache que contêm alguma das datas
+        
+        O cache guarda somente o período vigente, então datas de outros períodos
+        não invalidam nada aqui.
+        
+        Args:
+            dates: Datas alteradas
+            owner_id: Técnico afetado (None = usuário da aplicação)
+        """
+        from app.services.calendar_service import DEFAULT_OWNER_ID
+        
+        period_start, period_end = get_current_26_25_period()
+        if not any(period_start <= d <= period_end for d in dates):
+            return
+        
+        owner_id = owner_id or DEFAULT_OWNER_ID
+        self.cache.invalidate(f"calendar_data_{owner_id}")
+        if owner_id == DEFAULT_OWNER_ID:
+            # Sem expirar o persistente, get_with_auto_refresh voltaria a servir a cópia antiga
+            self.cache.invalidate("calendar_data")
+            self.cache.expire_persistent("calendar_data")
+            self._period_index = None
+        logger.info(f"Cache do calendário invalidado para owner {owner_id}: {[d.isoformat() for d in dates]}")
+    
+    def _get_served_calendar_data(self) -> Optional[Dict[str, Any]]:
+        """
+        Entrada que get_calendar_data serviria agora, sem disparar refresh:
+        TTL ou, se expirada, a cópia persistente ainda dentro do auto-refresh
+        """
+        calendar_data = self.cache.get("calendar_data", ttl_minutes=CALENDAR_TTL_MINUTES)
+        if calendar_data is not None:
+            return calendar_data
+        persistent_data = self.cache.get_persistent("calendar_data")
+        if persistent_data is None:
+            return None
+        last_updated = datetime.fromisoformat(persistent_data['last_updated'])
+        if datetime.now() - last_updated > timedelta(minutes=self.cache.auto_refresh_minutes):
+            return None
+        return persistent_data['data']
+    
+    def apply_created_tasks(self, created_tasks: List[Dict[str, Any]], workorder_id: Optional[int] = None) -> bool:
+        """
+        Aplica tarefas verificadas pela automação ao calendário em cache (delta in place)
+        
+        Returns:
+            True se o cache foi atualizado; False se não havia período em cache para atualizar
+        """
+        from app.services.calendar_service import CalendarService
+        
+        calendar_data = self._get_served_calendar_data()
+        if not calendar_data or not calendar_data.get('daily_data'):
+            return False
+        
+        applied = CalendarService().apply_tasks_delta(calendar_data, created_tasks, workorder_id)
+        if applied == 0:
+            return False
+        
+        calendar_data["last_updated"] = datetime.now().isoformat()
+        # Regrava TTL e persistente: a próxima leitura serve o calendário já com as tarefas
+        self.set_calendar_data(calendar_data)
+        logger.info(f"Calendário em cache atualizado com {applied} tarefas da automação (sem SQL)")
+        return True
+    
+    def on_tasks_created(self, dates=None, owner_id: Optional[int] = None, tasks=None, workorder_id=None, **_):
+        """Handler do evento tasks_created: aplica o delta ou, se não for possível, invalida"""
+        from app.services.calendar_service import DEFAULT_OWNER_ID
+        
+        if tasks and (owner_id or DEFAULT_OWNER_ID) == DEFAULT_OWNER_ID:
+            try:
+                if self.apply_created_tasks(tasks, workorder_id):
+                    self.cache.invalidate(f"calendar_data_{DEFAULT_OWNER_ID}")
+                    return
+            except Exception as e:
+                logger.warning(f"Falha ao aplicar delta no calendário, invalidando: {str(e)}")
+        
+        self.invalidate_dates(normalize_dates(dates), owner_id)
+    
+    def on_exclusion_changed(self, dates=None, **_):
+        """Handler do evento exclusion_changed (exclusões são do usuário da aplicação)"""
+        self.invalidate_dates(normalize_dates(dates))
+    
     def get_cache_status(self) -> Dict[str, Any]:
         """Retorna status do cache do calendário"""
         try:
             # Verifica cache TTL
-            ttl_data = self.cache.get("calendar_data", ttl_minutes=5)
+            ttl_data = self.cache.get("calendar_data", ttl_minutes=CALENDAR_TTL_MINUTES)
             
             # Verifica cache persistente
             persistent_data = self.cache.get_persistent("calendar_data")
@@ -133,3 +309,7 @@ class CalendarCacheService:
 
 # Instância global do serviço
 calendar_cache_service = CalendarCacheService()
+
+# Invalidação por eventos
+cache_event_service.subscribe(TASKS_CREATED, calendar_cache_service.on_tasks_created)
+cache_event_service.subscribe(EXCLUSION_CHANGED, calendar_cache_service.on_exclusion_changed)
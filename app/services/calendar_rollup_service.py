@@ -0,0 +1,310 @@
+"""
+Calendar Rollup Service
+Agregações do calendário para vários períodos 26->25 (dia, semana, período e ano).
+Períodos fechados são calculados uma única vez e armazenados em cache persistente.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from app.models.cache import PersistentCache
+from app.services.cache_event_service import cache_event_service, normalize_dates, TASKS_CREATED, EXCLUSION_CHANGED
+from app.services.period_service import get_current_26_25_period, iter_26_25_periods
+
+logger = logging.getLogger(__name__)
+
+# Limite de períodos por requisição (3 anos)
+MAX_PERIODS_PER_RANGE = 36
+
+
+def _week_start(day: date) -> date:
+    """Retorna o domingo que inicia a semana do dia (mesma convenção do calendário)"""
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "tasks_count": 0,
+        "hours_worked": 0.0,
+        "hours_excluded": 0.0
+    }
+
+
+class CalendarRollupService:
+    """Serviço de agregação multi-período com rollups persistentes"""
+
+    def __init__(self):
+        self.cache = PersistentCache("calendar_rollups")
+
+    def _rollup_key(self, owner_id: int, period_start: date) -> str:
+        """Chave do rollup de um período no cache persistente"""
+        return f"{owner_id}_{period_start.isoformat()}"
+
+    def _empty_period_rollup(self, period_start: date, period_end: date) -> Dict[str, Any]:
+        """Cria estrutura vazia de rollup com todos os dias do período"""
+        days = {}
+        current = period_start
+        while current <= period_end:
+            days[current.isoformat()] = {
+                "date": current.isoformat(),
+                "is_weekend": current.weekday() >= 5,
+                **_empty_totals()
+            }
+            current += timedelta(days=1)
+
+        return {
+            "period_start": period_start.isoformat(),
+            "period_end": period_end.isoformat(),
+            "days": days,
+            "weeks": {},
+            "totals": {
+                **_empty_totals(),
+                "business_days": sum(1 for d in days.values() if not d["is_weekend"]),
+                "days_with_tasks": 0,
+                "days_with_exclusions": 0
+            }
+        }
+
+    def _aggregate(self, periods: List[Tuple[date, date]], tasks_data: List[Dict],
+                   exclusions_data: List[Dict]) -> Dict[str, Dict[str, Any]]:
+        """
+        Agrega tarefas e exclusões em dia, semana e período numa única passada.
+
+        Returns:
+            Dict period_start -> rollup do período
+        """
+        rollups = {start.isoformat(): self._empty_period_rollup(start, end) for start, end in periods}
+
+        def _bucket(day_str: str) -> Optional[Tuple[Dict, Dict, Dict]]:
+            day = date.fromisoformat(day_str)
+            period_start, _ = get_current_26_25_period(day)
+            rollup = rollups.get(period_start.isoformat())
+            if rollup is None or day_str not in rollup["days"]:
+                return None
+            week_key = _week_start(day).isoformat()
+            week = rollup["weeks"].setdefault(week_key, {"week_start": week_key, **_empty_totals()})
+            return rollup["days"][day_str], week, rollup["totals"]
+
+        for task in tasks_data:
+            day_str = task.get("DataCriacao")
+            buckets = _bucket(day_str) if day_str else None
+            if not buckets:
+                continue
+            hours = float(task.get("TempoGasto") or 0)
+            for bucket in buckets:
+                bucket["tasks_count"] += 1
+                bucket["hours_worked"] += hours
+
+        for exclusion in exclusions_data:
+            buckets = _bucket(exclusion["date"])
+            if not buckets:
+                continue
+            hours = float(exclusion.get("hours", 0))
+            for bucket in buckets:
+                bucket["hours_excluded"] += hours
+
+        for rollup in rollups.values():
+            totals = rollup["totals"]
+            totals["days_with_tasks"] = sum(1 for d in rollup["days"].values() if d["tasks_count"] > 0)
+            totals["days_with_exclusions"] = sum(1 for d in rollup["days"].values() if d["hours_excluded"] > 0)
+            totals["average_hours_per_business_day"] = (
+                totals["hours_worked"] / totals["business_days"] if totals["business_days"] > 0 else 0
+            )
+            rollup["computed_at"] = datetime.now().isoformat()
+
+        return rollups
+
+    def _compute_periods(self, periods: List[Tuple[date, date]], owner_id: int) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Calcula rollups de períodos consecutivos com uma única query SQL cobrindo o intervalo
+
+        Returns:
+            Dict period_start -> rollup, ou None se a consulta ao SQL falhou
+        """
+        from app.services.calendar_service import CalendarService, DEFAULT_OWNER_ID
+        from app.services.exclusion_service import ExclusionService
+
+        range_start = periods[0][0]
+        range_end = periods[-1][1]
+
+        tasks_data = CalendarService(owner_id)._get_tasks_data(range_start, range_end)
+        if tasks_data is None:
+            logger.error(f"Falha ao buscar tarefas de {range_start} a {range_end}; rollups não calculados")
+            return None
+        # Exclusões são do usuário da aplicação
+        exclusions_data = []
+        if owner_id == DEFAULT_OWNER_ID:
+            exclusions_data = ExclusionService().get_exclusions_for_range(range_start, range_end)
+
+        logger.info(f"Rollup calculado para {len(periods)} períodos ({range_start} a {range_end}): "
+                    f"{len(tasks_data)} tarefas, {len(exclusions_data)} exclusões")
+
+        return self._aggregate(periods, tasks_data, exclusions_data)
+
+    def get_range_data(self, start_date: date, end_date: date, owner_id: Optional[int] = None,
+                       include_days: bool = False) -> Dict[str, Any]:
+        """
+        Obtém agregações por dia, semana, período e ano para o intervalo.
+
+        Args:
+            start_date: Data inicial (o período 26->25 que a contém é incluído inteiro)
+            end_date: Data final (idem)
+            owner_id: OWNERID do técnico (padrão: DEFAULT_OWNER_ID)
+            include_days: Incluir agregação diária na resposta
+
+        Returns:
+            Dict com períodos, semanas, anos e totais do intervalo
+
+        Raises:
+            ValueError: Se o intervalo for inválido ou grande demais
+            RuntimeError: Se a consulta ao SQL falhou (nada é gravado nos rollups)
+        """
+        from app.services.calendar_service import DEFAULT_OWNER_ID
+        owner_id = owner_id or DEFAULT_OWNER_ID
+
+        periods = iter_26_25_periods(start_date, end_date)
+        if not periods:
+            raise ValueError("Data final deve ser maior ou igual à data inicial")
+        if len(periods) > MAX_PERIODS_PER_RANGE:
+            raise ValueError(f"Intervalo muito grande: máximo de {MAX_PERIODS_PER_RANGE} períodos")
+
+        today = date.today()
+        rollups: Dict[str, Dict[str, Any]] = {}
+        sources: Dict[str, str] = {}
+        # Sequências de períodos ausentes consecutivos (sem período em cache no meio)
+        missing_runs: List[List[Tuple[date, date]]] = []
+        previous_missing = False
+
+        # Períodos fechados vêm do rollup persistente; os demais precisam de SQL
+        for period_start, period_end in periods:
+            stored = None
+            if period_end < today:
+                stored = self.cache.get_persistent(self._rollup_key(owner_id, period_start))
+            if stored and stored.get("data"):
+                rollups[period_start.isoformat()] = stored["data"]
+                sources[period_start.isoformat()] = "rollup"
+                previous_missing = False
+            else:
+                if not previous_missing:
+                    missing_runs.append([])
+                missing_runs[-1].append((period_start, period_end))
+                previous_missing = True
+
+        to_store = {}
+        failed = []
+        for run in missing_runs:
+            # Uma query por sequência: não relê períodos já em cache entre elas
+            computed = self._compute_periods(run, owner_id)
+            if computed is None:
+                failed.extend(start.isoformat() for start, _ in run)
+                continue
+            for period_start, period_end in run:
+                key = period_start.isoformat()
+                rollups[key] = computed[key]
+                sources[key] = "sql"
+                if period_end < today:
+                    to_store[self._rollup_key(owner_id, period_start)] = computed[key]
+        # Grava só o que foi calculado com sucesso (falha no SQL não vira rollup zerado)
+        self.cache.set_persistent_many(to_store)
+        if failed:
+            raise RuntimeError(f"Falha ao consultar tarefas no SQL para os períodos {failed}")
+
+        return self._build_response(periods, rollups, sources, owner_id, include_days)
+
+    def _build_response(self, periods: List[Tuple[date, date]], rollups: Dict[str, Dict[str, Any]],
+                        sources: Dict[str, str], owner_id: int, include_days: bool) -> Dict[str, Any]:
+        """Monta resposta combinando semanas e anos a partir dos rollups de período"""
+        today = date.today()
+        periods_out = []
+        weeks: Dict[str, Dict[str, Any]] = {}
+        years: Dict[str, Dict[str, Any]] = {}
+        range_totals = {**_empty_totals(), "business_days": 0}
+
+        for period_start, period_end in periods:
+            key = period_start.isoformat()
+            rollup = rollups[key]
+            totals = rollup["totals"]
+
+            # Semanas que cruzam dois períodos são somadas
+            for week_key, week in rollup["weeks"].items():
+                merged = weeks.setdefault(week_key, {"week_start": week_key, **_empty_totals()})
+                for field in ("tasks_count", "hours_worked", "hours_excluded"):
+                    merged[field] += week[field]
+
+            # Ano do período = ano em que ele termina (26/12/2024-25/01/2025 -> 2025)
+            year_key = str(period_end.year)
+            year = years.setdefault(year_key, {"year": period_end.year, "periods": 0,
+                                               "business_days": 0, **_empty_totals()})
+            year["periods"] += 1
+            for field in ("tasks_count", "hours_worked", "hours_excluded", "business_days"):
+                year[field] += totals[field]
+                range_totals[field] += totals[field]
+
+            period_out = {
+                "period_start": rollup["period_start"],
+                "period_end": rollup["period_end"],
+                "closed": period_end < today,
+                "source": sources[key],
+                "totals": totals,
+                "weeks": sorted(rollup["weeks"].values(), key=lambda w: w["week_start"])
+            }
+            if include_days:
+                period_out["days"] = rollup["days"]
+            periods_out.append(period_out)
+
+        return {
+            "owner_id": owner_id,
+            "range_start": periods[0][0].isoformat(),
+            "range_end": periods[-1][1].isoformat(),
+            "periods": periods_out,
+            "weeks": [weeks[k] for k in sorted(weeks)],
+            "years": [years[k] for k in sorted(years)],
+            "totals": range_totals,
+            "generated_at": datetime.now().isoformat()
+        }
+
+    def invalidate_period(self, owner_id: int, period_start: date) -> bool:
+        """Remove o rollup armazenado de um período (ex.: exclusão alterada em período fechado)"""
+        return self.cache.set_persistent_many({self._rollup_key(owner_id, period_start): None})
+
+    def invalidate_dates(self, dates: List[date], owner_id: int):
+        """Remove os rollups dos períodos fechados que contêm alguma das datas"""
+        today = date.today()
+        stale = {}
+        for day in dates:
+            period_start, period_end = get_current_26_25_period(day)
+            if period_end < today:
+                stale[self._rollup_key(owner_id, period_start)] = None
+        if stale:
+            self.cache.set_persistent_many(stale)
+            logger.info(f"Rollups invalidados: {sorted(stale)}")
+
+    def on_tasks_created(self, dates=None, owner_id: Optional[int] = None, **_):
+        """Handler do evento tasks_created"""
+        from app.services.calendar_service import DEFAULT_OWNER_ID
+        self.invalidate_dates(normalize_dates(dates), owner_id or DEFAULT_OWNER_ID)
+
+    def on_exclusion_changed(self, dates=None, **_):
+        """Handler do evento exclusion_changed (exclusões são do usuário da aplicação)"""
+        from app.services.calendar_service import DEFAULT_OWNER_ID
+        self.invalidate_dates(normalize_dates(dates), DEFAULT_OWNER_ID)
+
+    def get_cache_status(self) -> Dict[str, Any]:
+        """Retorna status dos rollups armazenados"""
+        try:
+            return {
+                "cache_name": "calendar_rollups",
+                "persistent_file": str(self.cache.persistent_file),
+                "persistent_file_exists": self.cache.persistent_file.exists()
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter status dos rollups: {str(e)}")
+            return {"error": str(e)}
+
+
+# Instância global do serviço
+calendar_rollup_service = CalendarRollupService()
+
+# Invalidação por eventos
+cache_event_service.subscribe(TASKS_CREATED, calendar_rollup_service.on_tasks_created)
+cache_event_service.subscribe(EXCLUSION_CHANGED, calendar_rollup_service.on_exclusion_changed)
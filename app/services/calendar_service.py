@@ -13,12 +13,67 @@ import logging
 from app.services.period_service import get_current_26_25_period
 from app.models.database import db
 import pyodbc
+from app.services.owner_index_service import owner_index_service, MAX_WORKORDERS_PER_QUERY
+
+try:
+    import numpy as np  # Opcional: agregação diária vetorizada
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
+# Campos diários omitidos no formato compacto quando ?fields= não é informado
+# (tarefas são carregadas sob demanda via /calendar/day/<data>)
+COMPACT_EXCLUDED_DAY_FIELDS = {'tasks'}
+
+
+def compact_calendar_payload(calendar_data: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Converte o payload do calendário para o formato compacto.
+    
+    - weeks_data (que repete os objetos de daily_data) vira `weeks`: lista de semanas
+      com as chaves (YYYY-MM-DD) dos dias; chaves fora de daily_data estão fora do período
+    - daily_data mantém apenas os campos pedidos em `fields` (sempre inclui 'date');
+      sem `fields`, mantém todos exceto os de COMPACT_EXCLUDED_DAY_FIELDS
+    """
+    daily_data = calendar_data.get('daily_data', {})
+    
+    if fields:
+        keep = set(fields) | {'date'}
+        compact_days = {
+            key: {k: v for k, v in day.items() if k in keep}
+            for key, day in daily_data.items()
+        }
+    else:
+        compact_days = {
+            key: {k: v for k, v in day.items() if k not in COMPACT_EXCLUDED_DAY_FIELDS}
+            for key, day in daily_data.items()
+        }
+    
+    weeks = [
+        [day.get('date') for day in week]
+        for week in calendar_data.get('weeks_data', [])
+    ]
+    
+    payload = {k: v for k, v in calendar_data.items() if k not in ('daily_data', 'weeks_data')}
+    payload.update({
+        'format': 'compact',
+        'daily_data': compact_days,
+        'weeks': weeks
+    })
+    return payload
+
+
+# OWNERID do usuário da aplicação (dono do arquivo de exclusões)
+DEFAULT_OWNER_ID = 2007
+
+# Limite de técnicos por consulta multi-owner
+MAX_OWNERS_PER_QUERY = 50
+
+
 class CalendarService:
-    def __init__(self):
-        self.owner_id = 2007
+    def __init__(self, owner_id: int = DEFAULT_OWNER_ID):
+        self.owner_id = owner_id
         self.workorder_title = "CSI EAST - Datacenter - Execução de Tarefas"
     
     def get_calendar_data(self, reference_date: Optional[date] = None) -> Dict[str, Any]:
@@ -29,43 +84,112 @@ class CalendarService:
             reference_date: Data de referência para o período (opcional)
         """
         try:
-            if reference_date:
-                ref_date = reference_date
-                logger.info(f"Calculando período para reference_date: {ref_date}")
-            else:
-                ref_date = date.today()
-                logger.info(f"Nenhuma data de referência fornecida. Usando data atual: {ref_date}")
-
-            start_date, end_date = get_current_26_25_period(ref_date)
-            logger.info(f"Período calculado: {start_date} a {end_date}")
+            ref_date, start_date, end_date = self._resolve_period(reference_date)
 
             # Obter dados de tarefas do banco
-            tasks_data = self._get_tasks_data(start_date, end_date)
+            tasks_data = self._get_tasks_data(start_date, end_date) or []
             
             # Obter dados de exclusões
             exclusions_data = self._get_exclusions_data(start_date, end_date)
             
-            # Processar dados diários
-            daily_data = self._process_daily_data(start_date, end_date, tasks_data, exclusions_data)
+            return self._build_calendar_payload(ref_date, start_date, end_date, tasks_data, exclusions_data)
+        except Exception as e:
+            logger.error(f"Erro ao obter dados do calendário: {e}")
+            raise
+    
+    def get_calendar_data_for_owners(self, owner_ids: List[int],
+                                     reference_date: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtém o calendário de vários técnicos com uma única consulta SQL
+        
+        Args:
+            owner_ids: OWNERIDs dos técnicos
+            reference_date: Data de referência para o período (opcional)
             
-            # Organizar em semanas para exibição
-            weeks_data = self._organize_weeks(start_date, end_date, daily_data)
+        Returns:
+            Dict owner_id -> dados do calendário (mesma estrutura de get_calendar_data)
+        """
+        try:
+            ref_date, start_date, end_date = self._resolve_period(reference_date)
             
-            return {
-                "period_start": start_date.isoformat(),
-                "period_end": end_date.isoformat(),
-                "reference_date": ref_date.isoformat(),
-                "daily_data": daily_data,
-                "weeks_data": weeks_data,
-                "summary": self._calculate_summary(daily_data)
-            }
+            tasks_by_owner = self._get_tasks_data_by_owner(owner_ids, start_date, end_date)
+            
+            # Exclusões são do usuário da aplicação: aplicadas só ao calendário dele
+            exclusions_data = []
+            if self.owner_id in owner_ids:
+                exclusions_data = self._get_exclusions_data(start_date, end_date)
+            
+            result = {}
+            for owner_id in owner_ids:
+                payload = self._build_calendar_payload(
+                    ref_date, start_date, end_date,
+                    tasks_by_owner.get(owner_id, []),
+                    exclusions_data if owner_id == self.owner_id else []
+                )
+                payload["owner_id"] = owner_id
+                result[owner_id] = payload
+            
+            return result
         except Exception as e:
-            logger.error(f"Erro ao obter dados do calendário: {e}")
+            logger.error(f"Erro ao obter dados do calendário para owners {owner_ids}: {e}")
             raise
     
-    def _get_tasks_data(self, start_date: date, end_date: date) -> List[Dict]:
+    def _resolve_period(self, reference_date: Optional[date]):
+        """Retorna (data de referência, início, fim) do período 26->25"""
+        if reference_date:
+            ref_date = reference_date
+            logger.info(f"Calculando período para reference_date: {ref_date}")
+        else:
+            ref_date = date.today()
+            logger.info(f"Nenhuma data de referência fornecida. Usando data atual: {ref_date}")
+
+        start_date, end_date = get_current_26_25_period(ref_date)
+        logger.info(f"Período calculado: {start_date} a {end_date}")
+        return ref_date, start_date, end_date
+    
+    def _build_calendar_payload(self, ref_date: date, start_date: date, end_date: date,
+                                tasks_data: List[Dict], exclusions_data: List[Dict]) -> Dict[str, Any]:
+        """Monta daily_data, weeks_data e summary de um período"""
+        # Agregação colunar (NumPy) reaproveitada por daily_data e summary
+        columns = None
+        if np is not None:
+            columns = self._aggregate_day_columns(start_date, end_date, tasks_data, exclusions_data)
+        
+        # Processar dados diários
+        daily_data = self._process_daily_data(start_date, end_date, tasks_data, exclusions_data, columns)
+        
+        # Organizar em semanas para exibição
+        weeks_data = self._organize_weeks(start_date, end_date, daily_data)
+        
+        return {
+            "period_start": start_date.isoformat(),
+            "period_end": end_date.isoformat(),
+            "reference_date": ref_date.isoformat(),
+            "daily_data": daily_data,
+            "weeks_data": weeks_data,
+            "summary": self._calculate_summary(daily_data, columns)
+        }
+    
+    def _get_tasks_data_by_owner(self, owner_ids: List[int], start_date: date, end_date: date) -> Dict[int, List[Dict]]:
+        """
+        Busca tarefas de vários técnicos numa única consulta e particiona por OWNERID.
+        """
+        tasks_by_owner = {owner_id: [] for owner_id in owner_ids}
+        for task in self._get_tasks_data(start_date, end_date, owner_ids) or []:
+            tasks_by_owner.setdefault(task.get('OWNERID'), []).append(task)
+        return tasks_by_owner
+    
+    def _get_tasks_data(self, start_date: date, end_date: date, owner_ids: Optional[List[int]] = None) -> Optional[List[Dict]]:
         """
         Busca dados de tarefas do banco para o período especificado.
+        
+        Args:
+            start_date: Data inicial
+            end_date: Data final
+            owner_ids: OWNERIDs a consultar (padrão: self.owner_id)
+            
+        Returns:
+            Lista de tarefas ou None se a consulta falhou (não confundir com período sem tarefas)
         """
         try:
             # Converter datas para timestamps (milissegundos)
@@ -74,18 +198,41 @@ class CalendarService:
             start_timestamp = int(start_dt.timestamp() * 1000)
             end_timestamp = int(end_dt.timestamp() * 1000)
             
-            query = """
-            DECLARE @OwnerId   bigint = ?;
-            DECLARE @CutoffMs  bigint = ?;
-            DECLARE @EndMs     bigint = ?;
-
-            ;WITH CurrentState AS (
+            owner_ids = list(owner_ids or [self.owner_id])
+            
+            # Chamados dos técnicos vêm do índice local de responsáveis; o CTE com
+            # ROW_NUMBER sobre toda a WorkOrderStates fica só como fallback
+            workorder_owners = owner_index_service.get_workorders_for_owners(
+                self.workorder_title, owner_ids, created_before_ms=end_timestamp
+            )
+            if workorder_owners is not None and len(workorder_owners) <= MAX_WORKORDERS_PER_QUERY:
+                if not workorder_owners:
+                    return []
+                workorder_ids = list(workorder_owners)
+                current_state_cte = ""
+                owner_column = "CAST(NULL AS bigint) AS OWNERID"  # preenchido pelo índice
+                owner_join = ""
+                owner_filter = f"w.WORKORDERID IN ({', '.join('?' for _ in workorder_ids)})"
+                filter_params = workorder_ids
+            else:
+                workorder_owners = None
+                current_state_cte = """;WITH CurrentState AS (
               SELECT
                 ws.WORKORDERID,
                 ws.OWNERID,
                 ROW_NUMBER() OVER (PARTITION BY ws.WORKORDERID ORDER BY ws.ASSIGNEDTIME DESC) AS rn
               FROM dbo.WorkOrderStates ws
-            )
+            )"""
+                owner_column = "cs.OWNERID"
+                owner_join = "JOIN CurrentState AS cs ON cs.WORKORDERID = w.WORKORDERID AND cs.rn = 1"
+                owner_filter = f"cs.OWNERID IN ({', '.join('?' for _ in owner_ids)})"
+                filter_params = owner_ids
+            
+            query = f"""
+            DECLARE @CutoffMs  bigint = ?;
+            DECLARE @EndMs     bigint = ?;
+
+            {current_state_cte}
             SELECT
               td.TASKID,
               td.TITLE AS TaskTitle,
@@ -102,9 +249,10 @@ class CalendarService:
                 ELSE CONVERT(date, DATEADD(SECOND, td.CREATEDDATE / 1000, '1970-01-01'))
               END AS DataFechamento,
               td.CREATEDDATE,
-              td.ACTUALENDTIME
+              td.ACTUALENDTIME,
+              {owner_column}
             FROM dbo.WorkOrder AS w
-            JOIN CurrentState AS cs ON cs.WORKORDERID = w.WORKORDERID AND cs.rn = 1
+            {owner_join}
             LEFT JOIN dbo.WorkOrderToTaskDetails AS wttd ON wttd.WORKORDERID = w.WORKORDERID
             LEFT JOIN dbo.TaskDetails AS td ON td.TASKID = wttd.TASKID
             LEFT JOIN dbo.Task_Fields AS tf ON tf.TASKID = td.TASKID
@@ -113,7 +261,7 @@ class CalendarService:
                   AND upv.TABLENAME = 'Task_Fields'
                   AND upv.COLUMNNAME = 'UDF_PICK1'
             WHERE w.TITLE = ?
-              AND cs.OWNERID = @OwnerId
+              AND {owner_filter}
               AND td.CREATEDDATE >= @CutoffMs
               AND td.CREATEDDATE <= @EndMs
             ORDER BY td.CREATEDDATE DESC
@@ -122,11 +270,11 @@ class CalendarService:
             # Estabelecer conexão
             if not db.connect():
                 logger.error("Não foi possível conectar ao banco de dados")
-                return []
+                return None
             
             conn = db._connection
             cursor = conn.cursor()
-            cursor.execute(query, [self.owner_id, start_timestamp, end_timestamp, self.workorder_title])
+            cursor.execute(query, [start_timestamp, end_timestamp, self.workorder_title, *filter_params])
             
             columns = [column[0] for column in cursor.description]
             results = []
@@ -138,6 +286,8 @@ class CalendarService:
                     row_dict['DataCriacao'] = row_dict['DataCriacao'].isoformat()
                 if row_dict.get('DataFechamento'):
                     row_dict['DataFechamento'] = row_dict['DataFechamento'].isoformat()
+                if workorder_owners is not None:
+                    row_dict['OWNERID'] = workorder_owners.get(row_dict['WORKORDERID'])
                 results.append(row_dict)
             
             cursor.close()
@@ -148,7 +298,7 @@ class CalendarService:
             
         except Exception as e:
             logger.error(f"Erro ao buscar dados de tarefas: {e}")
-            return []
+            return None
     
     def _get_exclusions_data(self, start_date: date, end_date: date) -> List[Dict]:
         """
@@ -180,9 +330,97 @@ class CalendarService:
             logger.error(f"Erro ao buscar dados de exclusões: {e}")
             return []
     
-    def _process_daily_data(self, start_date: date, end_date: date, tasks_data: List[Dict], exclusions_data: List[Dict]) -> Dict[str, Dict]:
+    def _process_daily_data(self, start_date: date, end_date: date, tasks_data: List[Dict], exclusions_data: List[Dict],
+                            columns: Optional[Dict[str, Any]] = None) -> Dict[str, Dict]:
         """
         Processa dados diários combinando tarefas e exclusões.
+        Usa a agregação colunar (NumPy) quando disponível.
+        """
+        if np is None:
+            return self._process_daily_data_python(start_date, end_date, tasks_data, exclusions_data)
+        
+        if columns is None:
+            columns = self._aggregate_day_columns(start_date, end_date, tasks_data, exclusions_data)
+        
+        tasks_by_date = columns['tasks_by_date']
+        exclusions_by_date = columns['exclusions_by_date']
+        
+        start_ordinal = start_date.toordinal()
+        hours_worked = columns['hours_worked'].tolist()
+        hours_excluded = columns['hours_excluded'].tolist()
+        
+        # Só as somas são vetorizadas; tipo de exclusão e cor seguem as regras de _day_entry
+        daily_data = {}
+        for offset in range(len(hours_worked)):
+            current_date = date.fromordinal(start_ordinal + offset)
+            date_str = current_date.isoformat()
+            daily_data[date_str] = self._day_entry(
+                current_date, tasks_by_date.get(date_str, []), exclusions_by_date.get(date_str, []),
+                hours_worked[offset], hours_excluded[offset]
+            )
+        
+        return daily_data
+    
+    def _aggregate_day_columns(self, start_date: date, end_date: date, tasks_data: List[Dict],
+                               exclusions_data: List[Dict]) -> Dict[str, Any]:
+        """
+        Agregação colunar por dia: arrays NumPy indexados pelo offset do dia em
+        relação a start_date, calculados em poucas passadas vetorizadas.
+        
+        Returns:
+            Dict com arrays weekday, is_weekend, tasks_count, hours_worked e
+            hours_excluded, além das linhas agrupadas por data (tasks_by_date,
+            exclusions_by_date). Regras de exclusão e cor ficam só em _day_entry.
+        """
+        n_days = (end_date - start_date).days + 1
+        start_ordinal = start_date.toordinal()
+        day_index = {date.fromordinal(start_ordinal + i).isoformat(): i for i in range(n_days)}
+        
+        tasks_by_date = self._group_by_day(tasks_data, 'DataCriacao', day_index)
+        exclusions_by_date = self._group_by_day(exclusions_data, 'date', day_index)
+        
+        tasks_count, hours_worked = self._sum_groups(tasks_by_date, 'TempoGasto', day_index, n_days)
+        hours_worked = np.round(hours_worked, 2)
+        _, hours_excluded = self._sum_groups(exclusions_by_date, 'hours', day_index, n_days)
+        
+        # date.weekday(): 0=segunda ... 6=domingo; ordinal 1 (01/01/0001) é segunda
+        weekday = (np.arange(start_ordinal, start_ordinal + n_days) - 1) % 7
+        
+        return {
+            'weekday': weekday,
+            'is_weekend': weekday >= 5,
+            'tasks_count': tasks_count,
+            'hours_worked': hours_worked,
+            'hours_excluded': hours_excluded,
+            'tasks_by_date': tasks_by_date,
+            'exclusions_by_date': exclusions_by_date
+        }
+    
+    @staticmethod
+    def _group_by_day(rows: List[Dict], date_field: str, day_index: Dict[str, int]) -> Dict[str, List[Dict]]:
+        """Agrupa linhas pela data (apenas datas do intervalo em day_index)"""
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row.get(date_field), []).append(row)
+        return {key: group for key, group in grouped.items() if key in day_index}
+    
+    @staticmethod
+    def _sum_groups(grouped: Dict[str, List[Dict]], value_field: str, day_index: Dict[str, int], n_days: int):
+        """Retorna arrays (contagem, soma de value_field) por offset de dia"""
+        offsets = np.fromiter((day_index[key] for key in grouped), dtype=np.int64, count=len(grouped))
+        sizes = np.fromiter((len(group) for group in grouped.values()), dtype=np.int64, count=len(grouped))
+        values = np.fromiter(
+            (row.get(value_field) or 0 for group in grouped.values() for row in group),
+            dtype=np.float64, count=int(sizes.sum())
+        )
+        counts = np.zeros(n_days, dtype=np.int64)
+        counts[offsets] = sizes
+        sums = np.bincount(np.repeat(offsets, sizes), weights=values, minlength=n_days)
+        return counts, sums
+    
+    def _process_daily_data_python(self, start_date: date, end_date: date, tasks_data: List[Dict], exclusions_data: List[Dict]) -> Dict[str, Dict]:
+        """
+        Processa dados diários combinando tarefas e exclusões (implementação sem NumPy).
         """
         daily_data = {}
         current_date = start_date
@@ -207,44 +445,115 @@ class CalendarService:
         # Processar cada dia do período
         while current_date <= end_date:
             date_str = current_date.isoformat()
-            day_tasks = tasks_by_date.get(date_str, [])
-            day_exclusions = exclusions_by_date.get(date_str, [])
-            
-            # Calcular total de horas trabalhadas
-            hours_worked = sum(task.get('TempoGasto', 0) or 0 for task in day_tasks)
-            
-            # Calcular total de horas excluídas
-            hours_excluded = sum(exc.get('hours', 0) for exc in day_exclusions)
-            
-            # Determinar tipo de exclusão
-            exclusion_type = None
-            if hours_excluded >= 8:
-                exclusion_type = 'total'
-            elif hours_excluded > 0:
-                exclusion_type = 'partial'
-            
-            # Determinar cor do calendário baseada na produtividade
-            calendar_color = self._get_calendar_color(
-                current_date, hours_worked, hours_excluded, exclusion_type
+            daily_data[date_str] = self._build_day_entry(
+                current_date, tasks_by_date.get(date_str, []), exclusions_by_date.get(date_str, [])
             )
-            
-            daily_data[date_str] = {
-                'date': date_str,
-                'day_of_week': current_date.weekday(),  # 0=segunda, 6=domingo
-                'is_weekend': current_date.weekday() >= 5,
-                'tasks_count': len(day_tasks),
-                'hours_worked': hours_worked,
-                'hours_excluded': hours_excluded,
-                'exclusion_type': exclusion_type,
-                'calendar_color': calendar_color,
-                'tasks': day_tasks,
-                'exclusions': day_exclusions
-            }
-            
             current_date += timedelta(days=1)
         
         return daily_data
     
+    def _build_day_entry(self, current_date: date, day_tasks: List[Dict], day_exclusions: List[Dict]) -> Dict[str, Any]:
+        """Calcula a entrada de um dia em daily_data a partir das suas tarefas e exclusões"""
+        # Calcular total de horas trabalhadas
+        hours_worked = sum(task.get('TempoGasto', 0) or 0 for task in day_tasks)
+        
+        # Calcular total de horas excluídas
+        hours_excluded = sum(exc.get('hours', 0) for exc in day_exclusions)
+        
+        return self._day_entry(current_date, day_tasks, day_exclusions, hours_worked, hours_excluded)
+    
+    def _day_entry(self, current_date: date, day_tasks: List[Dict], day_exclusions: List[Dict],
+                   hours_worked: float, hours_excluded: float) -> Dict[str, Any]:
+        """
+        Entrada de um dia em daily_data a partir dos totais já somados (regras únicas de
+        tipo de exclusão e cor, usadas pelos caminhos Python e NumPy e por apply_tasks_delta)
+        """
+        date_str = current_date.isoformat()
+        
+        # Determinar tipo de exclusão
+        exclusion_type = None
+        if hours_excluded >= 8:
+            exclusion_type = 'total'
+        elif hours_excluded > 0:
+            exclusion_type = 'partial'
+        
+        # Determinar cor do calendário baseada na produtividade
+        calendar_color = self._get_calendar_color(
+            current_date, hours_worked, hours_excluded, exclusion_type
+        )
+        
+        return {
+            'date': date_str,
+            'day_of_week': current_date.weekday(),  # 0=segunda, 6=domingo
+            'is_weekend': current_date.weekday() >= 5,
+            'tasks_count': len(day_tasks),
+            'hours_worked': hours_worked,
+            'hours_excluded': hours_excluded,
+            'exclusion_type': exclusion_type,
+            'calendar_color': calendar_color,
+            'tasks': day_tasks,
+            'exclusions': day_exclusions
+        }
+    
+    def apply_tasks_delta(self, calendar_data: Dict[str, Any], created_tasks: List[Dict[str, Any]],
+                          workorder_id: Optional[int] = None) -> int:
+        """
+        Aplica tarefas recém-criadas (verificadas pela automação) aos dados do
+        calendário em cache, sem consultar o SQL
+        
+        Recalcula os dias afetados, as semanas e o resumo in place.
+        
+        Args:
+            calendar_data: Dados do calendário (estrutura de get_calendar_data)
+            created_tasks: Tarefas no formato de SeleniumService._verify_created_tasks
+            workorder_id: Chamado das tarefas
+            
+        Returns:
+            Número de tarefas aplicadas (0 se nenhuma pertence ao período em cache)
+        """
+        daily_data = calendar_data.get('daily_data') or {}
+        today_str = date.today().isoformat()
+        touched = set()
+        
+        for task in created_tasks:
+            date_str = task.get('created_date') or today_str
+            day = daily_data.get(date_str)
+            if day is None:
+                continue
+            day_tasks = day.get('tasks') or []
+            if any(t.get('TASKID') == task['task_id'] for t in day_tasks):
+                continue  # já presente (ex.: cache renovado depois da execução)
+            day_tasks.append({
+                'TASKID': task['task_id'],
+                'TaskTitle': task.get('title'),
+                'WORKORDERID': workorder_id,
+                'WorkOrderTitle': self.workorder_title,
+                'TempoEstimado': task.get('time_estimated'),
+                'TempoGasto': task.get('time_spent'),
+                'DataCriacao': date_str,
+                'DataFechamento': date_str,
+                'OWNERID': self.owner_id
+            })
+            day['tasks'] = day_tasks
+            touched.add(date_str)
+        
+        if not touched:
+            return 0
+        
+        applied = 0
+        for date_str in touched:
+            day = daily_data[date_str]
+            daily_data[date_str] = self._build_day_entry(
+                date.fromisoformat(date_str), day['tasks'], day.get('exclusions') or []
+            )
+            applied += daily_data[date_str]['tasks_count'] - day['tasks_count']
+        
+        start_date = date.fromisoformat(calendar_data['period_start'])
+        end_date = date.fromisoformat(calendar_data['period_end'])
+        calendar_data['weeks_data'] = self._organize_weeks(start_date, end_date, daily_data)
+        calendar_data['summary'] = self._calculate_summary(daily_data)
+        return applied
+    
     def _get_calendar_color(self, date_obj: date, hours_worked: float, hours_excluded: float, exclusion_type: Optional[str]) -> str:
         """
         Determina a cor do calendário baseada nas regras de produtividade.
@@ -329,10 +638,25 @@ class CalendarService:
         
         return weeks
     
-    def _calculate_summary(self, daily_data: Dict) -> Dict[str, Any]:
+    def _calculate_summary(self, daily_data: Dict, columns: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Calcula resumo estatístico do período.
+        Com as colunas de _aggregate_day_columns, usa reduções vetorizadas.
         """
+        if columns is not None:
+            business_days = int(np.count_nonzero(~columns['is_weekend']))
+            total_hours_worked = float(columns['hours_worked'].sum())
+            return {
+                'total_days': int(columns['weekday'].size),
+                'business_days': business_days,
+                'total_hours_worked': total_hours_worked,
+                'total_hours_excluded': float(columns['hours_excluded'].sum()),
+                'total_tasks': int(columns['tasks_count'].sum()),
+                'days_with_tasks': int(np.count_nonzero(columns['tasks_count'])),
+                'days_with_exclusions': int(np.count_nonzero(columns['hours_excluded'])),
+                'average_hours_per_business_day': total_hours_worked / business_days if business_days > 0 else 0
+            }
+        
         total_days = len(daily_data)
         business_days = sum(1 for day in daily_data.values() if not day['is_weekend'])
         
@@ -359,8 +683,28 @@ class CalendarService:
         Retorna detalhes completos de um dia específico.
         """
         try:
-            # Buscar dados apenas para esse dia
-            tasks_data = self._get_tasks_data(target_date, target_date)
+            # Importar aqui para evitar problemas de circular import
+            from app.services.calendar_cache_service import calendar_cache_service
+            
+            # Servir do período em cache (sem SQL) quando disponível
+            day_data = calendar_cache_service.get_cached_day(target_date)
+            
+            # Dia do período vigente sem índice válido: recarregar o período inteiro uma vez
+            period_start, period_end = get_current_26_25_period()
+            if day_data is None and period_start <= target_date <= period_end:
+                calendar_cache_service.get_calendar_data(force_refresh=True)
+                day_data = calendar_cache_service.get_cached_day(target_date)
+            
+            if day_data is not None:
+                return {
+                    'date': target_date.isoformat(),
+                    'day_data': day_data,
+                    'success': True,
+                    'cached': True
+                }
+            
+            # Miss: buscar dados apenas para esse dia
+            tasks_data = self._get_tasks_data(target_date, target_date) or []
             exclusions_data = self._get_exclusions_data(target_date, target_date)
             
             daily_data = self._process_daily_data(target_date, target_date, tasks_data, exclusions_data)
@@ -369,7 +713,8 @@ class CalendarService:
             return {
                 'date': target_date.isoformat(),
                 'day_data': day_data,
-                'success': True
+                'success': True,
+                'cached': False
             }
             
         except Exception as e:
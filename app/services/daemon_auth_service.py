@@ -0,0 +1,65 @@
+"""
+Daemon Auth Service
+Chave de autenticação do IPC entre o app e o daemon da automação (--daemon).
+
+Não há chave padrão: vale AUTOMATION_DAEMON_KEY ou, sem ela, uma chave aleatória
+por instalação em data/daemon.key (permissão 0600), criada por quem usar primeiro
+(app ou daemon) e lida pelo outro.
+"""
+
+import logging
+import os
+import secrets
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DAEMON_KEY_FILE = os.path.join(BASE_DIR, "data", "daemon.key")
+
+
+def _create_key_file(key_file: str):
+    """Grava uma chave nova sem sobrescrever a de outro processo (link atômico)"""
+    tmp_path = f"{key_file}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(secrets.token_hex(32))
+        os.link(tmp_path, key_file)
+        logger.info(f"Chave do daemon da automação gerada em {key_file}")
+    except FileExistsError:
+        pass  # outro processo criou primeiro: vale a chave dele
+    finally:
+        os.remove(tmp_path)
+
+
+def load_daemon_authkey(key_file: str = DAEMON_KEY_FILE) -> bytes:
+    """
+    Obtém a chave do IPC do daemon (AUTOMATION_DAEMON_KEY ou data/daemon.key)
+
+    Args:
+        key_file: Arquivo da chave por instalação
+
+    Returns:
+        Chave em bytes
+
+    Raises:
+        RuntimeError: Se não há chave utilizável (o daemon não deve subir sem ela)
+    """
+    env_key = os.getenv("AUTOMATION_DAEMON_KEY", "").strip()
+    if env_key:
+        return env_key.encode()
+
+    try:
+        os.makedirs(os.path.dirname(key_file), exist_ok=True)
+        if not os.path.exists(key_file):
+            _create_key_file(key_file)
+        if os.name == "posix" and os.stat(key_file).st_mode & 0o077:
+            raise RuntimeError(f"Chave do daemon {key_file} acessível por outros usuários; use chmod 600")
+        with open(key_file, encoding="utf-8") as f:
+            key = f.read().strip()
+    except OSError as e:
+        raise RuntimeError(f"Chave do daemon indisponível ({key_file}): {e}") from e
+
+    if not key:
+        raise RuntimeError(f"Chave do daemon vazia em {key_file}; defina AUTOMATION_DAEMON_KEY")
+    return key.encode()
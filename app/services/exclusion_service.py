@@ -8,6 +8,7 @@ import uuid
 from datetime import date, datetime
 from typing import List, Dict, Any, Optional
 from app.services.period_service import get_current_26_25_period
+from app.services.cache_event_service import cache_event_service, EXCLUSION_CHANGED
 
 class ExclusionService:
     def __init__(self):
@@ -86,6 +87,7 @@ class ExclusionService:
         
         data["exclusions"].append(new_exclusion)
         self._save_data(data)
+        cache_event_service.publish(EXCLUSION_CHANGED, dates=[exclusion_date])
         
         return new_exclusion
     
@@ -132,6 +134,29 @@ class ExclusionService:
         
         return date_exclusions
     
+    def get_exclusions_for_range(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+        """
+        Retorna todas as exclusões do intervalo inclusivo [start_date, end_date]
+        com uma única leitura do arquivo.
+        
+        Args:
+            start_date: Data inicial
+            end_date: Data final
+            
+        Returns:
+            Lista de exclusões ordenada por data
+        """
+        data = self._load_data()
+        start_str = start_date.isoformat()
+        end_str = end_date.isoformat()
+        
+        range_exclusions = [
+            exclusion for exclusion in data["exclusions"]
+            if start_str <= exclusion["date"] <= end_str
+        ]
+        range_exclusions.sort(key=lambda x: x["date"])
+        return range_exclusions
+    
     def update_exclusion(self, exclusion_id: str, exclusion_date: date, 
                         reason: str, hours: float) -> Dict[str, Any]:
         """
@@ -171,12 +196,14 @@ class ExclusionService:
         
         # Atualiza a exclusão
         exclusion = data["exclusions"][exclusion_index]
+        previous_date = exclusion["date"]
         exclusion["date"] = exclusion_date.isoformat()
         exclusion["reason"] = reason
         exclusion["hours"] = hours
         exclusion["updated_at"] = datetime.now().isoformat()
         
         self._save_data(data)
+        cache_event_service.publish(EXCLUSION_CHANGED, dates=[previous_date, exclusion_date])
         return exclusion
     
     def delete_exclusion(self, exclusion_id: str) -> bool:
@@ -194,13 +221,14 @@ class ExclusionService:
         """
         data = self._load_data()
         
-        original_count = len(data["exclusions"])
+        removed_dates = [e["date"] for e in data["exclusions"] if e["id"] == exclusion_id]
         data["exclusions"] = [e for e in data["exclusions"] if e["id"] != exclusion_id]
         
-        if len(data["exclusions"]) == original_count:
+        if not removed_dates:
             raise ValueError("Exclusão não encontrada")
         
         self._save_data(data)
+        cache_event_service.publish(EXCLUSION_CHANGED, dates=removed_dates)
         return True
     
     def get_exclusion_summary(self, reference_date: Optional[date] = None) -> Dict[str, Any]:
@@ -0,0 +1,199 @@
+"""
+Execution Store Service
+Registro durável das execuções da automação (SQLite local).
+
+Sobrevive a reinícios e ao reloader do Flask, é compartilhado entre workers e
+expira execuções antigas. Leituras de status são consultas por chave primária.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EXECUTIONS_DB = os.path.join(BASE_DIR, "data", "executions.db")
+
+# Execuções finalizadas há mais que isso são removidas
+EXECUTION_TTL_DAYS = 7
+
+# Execução "running" sem atualização por mais que isso foi interrompida (ex.: restart do app)
+STALE_RUNNING_SECONDS = 600
+
+# Intervalo do heartbeat do worker enquanto a execução está em andamento (bem abaixo do limite acima)
+HEARTBEAT_SECONDS = 60
+
+# Colunas próprias; os demais campos vão em "payload" (JSON)
+_COLUMNS = ("execution_id", "workorder_id", "exec_tag", "status", "hours_target", "started_at", "finished_at")
+_DATETIME_FIELDS = ("started_at", "finished_at")
+
+
+class ExecutionStoreService:
+    """Registro persistente de execuções indexado por execution_id e workorder"""
+
+    def __init__(self, db_path: str = EXECUTIONS_DB, ttl_days: int = EXECUTION_TTL_DAYS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """Conexão por operação (segura entre threads e processos), com commit e fechamento"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS executions (
+                    execution_id TEXT PRIMARY KEY,
+                    workorder_id INTEGER,
+                    exec_tag TEXT,
+                    status TEXT NOT NULL,
+                    hours_target REAL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    updated_at REAL NOT NULL,
+                    payload TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_executions_workorder "
+                         "ON executions (workorder_id, started_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_executions_updated ON executions (updated_at)")
+
+    @staticmethod
+    def _serialize(value: Any) -> Any:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def _to_row(self, execution: Dict[str, Any]) -> Dict[str, Any]:
+        row = {column: self._serialize(execution.get(column)) for column in _COLUMNS}
+        payload = {k: v for k, v in execution.items() if k not in _COLUMNS}
+        row["payload"] = json.dumps(payload, ensure_ascii=False, default=str)
+        row["updated_at"] = time.time()
+        return row
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        execution = json.loads(row["payload"] or "{}")
+        for column in _COLUMNS:
+            execution[column] = row[column]
+        for field in _DATETIME_FIELDS:
+            if execution.get(field):
+                execution[field] = datetime.fromisoformat(execution[field])
+        return execution
+
+    def save(self, execution: Dict[str, Any]) -> bool:
+        """
+        Grava a execução completa (insert ou replace)
+
+        Args:
+            execution: Dados da execução (precisa de execution_id e status)
+        """
+        try:
+            row = self._to_row(execution)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO executions "
+                    "(execution_id, workorder_id, exec_tag, status, hours_target, started_at, finished_at, updated_at, payload) "
+                    "VALUES (:execution_id, :workorder_id, :exec_tag, :status, :hours_target, :started_at, :finished_at, :updated_at, :payload)",
+                    row
+                )
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao gravar execução {execution.get('execution_id')}: {str(e)}")
+            return False
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Obtém execução por ID (None se não existe ou expirou)"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT * FROM executions WHERE execution_id = ?", (execution_id,)).fetchone()
+            if not row:
+                return None
+            execution = self._from_row(row)
+            if execution["status"] in ("started", "running") and time.time() - row["updated_at"] > STALE_RUNNING_SECONDS:
+                execution["status"] = "error"
+                execution["error"] = execution.get("error") or "Execução interrompida (aplicação reiniciada durante a execução)"
+            return execution
+        except Exception as e:
+            logger.error(f"Erro ao ler execução {execution_id}: {str(e)}")
+            return None
+
+    def touch(self, execution_id: str) -> bool:
+        """
+        Heartbeat: renova updated_at de uma execução em andamento
+
+        Returns:
+            True se a execução ainda estava em andamento
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "UPDATE executions SET updated_at = ? "
+                    "WHERE execution_id = ? AND status IN ('started', 'running')",
+                    (time.time(), execution_id)
+                )
+            return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Erro no heartbeat da execução {execution_id}: {str(e)}")
+            return False
+
+    def list_by_workorder(self, workorder_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """Execuções de um chamado, mais recentes primeiro"""
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT * FROM executions WHERE workorder_id = ? ORDER BY started_at DESC LIMIT ?",
+                    (workorder_id, limit)
+                ).fetchall()
+            return [self._from_row(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Erro ao listar execuções do chamado {workorder_id}: {str(e)}")
+            return []
+
+    def evict_expired(self) -> int:
+        """Remove execuções sem atualização dentro do TTL; retorna quantas"""
+        try:
+            cutoff = time.time() - self.ttl_seconds
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "DELETE FROM executions WHERE updated_at < ?",
+                    (cutoff,)
+                )
+            if cursor.rowcount:
+                logger.info(f"{cursor.rowcount} execuções expiradas removidas")
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Erro ao expirar execuções: {str(e)}")
+            return 0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retorna contagem de execuções por status"""
+        try:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT status, COUNT(*) AS total FROM executions GROUP BY status").fetchall()
+            return {
+                "db_path": self.db_path,
+                "ttl_days": self.ttl_seconds // 86400,
+                "by_status": {row["status"]: row["total"] for row in rows}
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter status do registro de execuções: {str(e)}")
+            return {"error": str(e)}
+
+
+# Instância global do serviço
+execution_store_service = ExecutionStoreService()
@@ -0,0 +1,97 @@
+"""
+HTTP Cache Service
+Suporte a GET condicional (ETag / If-None-Match e Last-Modified / If-Modified-Since)
+para as APIs consultadas pelo auto-refresh do dashboard
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCacheService:
+    """Serviço de GET condicional para blueprints JSON"""
+
+    @staticmethod
+    def set_last_modified(last_modified: Optional[datetime]):
+        """
+        Informa a data de atualização dos dados servidos pela requisição atual
+        (ex.: last_updated do cache), enviada como Last-Modified
+
+        Args:
+            last_modified: Data da última atualização dos dados
+        """
+        if last_modified is not None:
+            g.http_last_modified = last_modified
+
+    @staticmethod
+    def check_version(*version, last_modified: Optional[datetime] = None):
+        """
+        Define o ETag a partir da versão dos dados (ex.: last_updated do cache) antes
+        de montar a resposta. O ETag também cobre a URL com a query string, já que
+        parâmetros como format/fields mudam o corpo.
+
+        Args:
+            *version: Partes que identificam a versão dos dados servidos
+            last_modified: Data da última atualização (enviada como Last-Modified)
+
+        Returns:
+            Resposta 304 pronta se o cliente já tem essa versão; None para seguir
+            montando a resposta normalmente
+        """
+        key = "|".join(str(part) for part in (request.full_path, *version))
+        etag = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+        g.http_etag = etag
+        if last_modified is not None:
+            g.http_last_modified = last_modified
+
+        if request.method != 'GET' or not request.if_none_match.contains_weak(etag):
+            return None
+
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
+
+    @staticmethod
+    def apply_conditional_get(response):
+        """
+        Hook after_request: adiciona ETag e Last-Modified às respostas JSON de GET e
+        responde 304 quando o cliente já tem a versão atual
+
+        O ETag vem de check_version quando a rota informou a versão dos dados;
+        senão, do hash do corpo (a resposta já foi montada, economiza só banda).
+        """
+        try:
+            if (request.method != 'GET'
+                    or response.status_code != 200
+                    or response.mimetype != 'application/json'
+                    or response.direct_passthrough):
+                return response
+
+            digest = g.get('http_etag') or hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+            # ETag fraco: o corpo pode ser comprimido depois (Content-Encoding)
+            response.set_etag(digest, weak=True)
+
+            last_modified = g.get('http_last_modified')
+            if last_modified is not None:
+                response.last_modified = last_modified
+
+            # Força revalidação a cada poll; dados iguais voltam como 304 sem corpo
+            response.cache_control.no_cache = True
+            response.make_conditional(request)
+
+        except Exception as e:
+            logger.warning(f"Erro ao aplicar GET condicional: {str(e)}")
+
+        return response
+
+
+# Instância global do serviço
+http_cache_service = HttpCacheService()
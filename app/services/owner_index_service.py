@@ -0,0 +1,206 @@
+"""
+Owner Index Service
+Índice local (materializado) de chamado -> responsável atual.
+
+Substitui o ROW_NUMBER() sobre toda a dbo.WorkOrderStates nas consultas quentes:
+o índice é montado uma vez e depois atualizado apenas com os estados cujo
+ASSIGNEDTIME é maior ou igual à marca d'água da última atualização.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from app.models.cache import PersistentCache
+from app.models.database import db
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre consultas incrementais ao SQL
+REFRESH_INTERVAL_SECONDS = 30
+
+# Acima disso as consultas voltam ao CTE original (limite de 2100 parâmetros do SQL Server)
+MAX_WORKORDERS_PER_QUERY = 1000
+
+
+class OwnerIndexService:
+    """Índice incremental de responsável atual por chamado (escopo: título do chamado)"""
+
+    def __init__(self, refresh_interval_seconds: int = REFRESH_INTERVAL_SECONDS):
+        self.cache = PersistentCache("owner_index")
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._lock = threading.Lock()
+        # título -> {"entries": {workorder_id: [owner_id, assigned_ms, created_ms]}, "watermark": int, "checked_at": float}
+        self._indexes: Dict[str, Dict[str, Any]] = {}
+
+    def _load(self, title: str) -> Dict[str, Any]:
+        """Carrega o índice do título (memória -> disco -> vazio)"""
+        index = self._indexes.get(title)
+        if index is not None:
+            return index
+
+        index = {"entries": {}, "watermark": None, "checked_at": 0.0}
+        stored = self.cache.get_persistent(title)
+        if stored and stored.get("data"):
+            data = stored["data"]
+            index["entries"] = {int(wo_id): entry for wo_id, entry in data.get("entries", {}).items()}
+            index["watermark"] = data.get("watermark")
+            logger.info(f"Índice de responsáveis carregado do disco: {len(index['entries'])} chamados")
+
+        self._indexes[title] = index
+        return index
+
+    def _apply_states(self, index: Dict[str, Any], rows: List[Dict[str, Any]]) -> int:
+        """Aplica estados (ordenados por ASSIGNEDTIME) ao índice; retorna quantos mudaram"""
+        entries = index["entries"]
+        changed = 0
+        for row in rows:
+            workorder_id = int(row["WORKORDERID"])
+            assigned_ms = int(row["ASSIGNEDTIME"]) if row.get("ASSIGNEDTIME") is not None else -1
+            current = entries.get(workorder_id)
+            # Mesmo critério do ROW_NUMBER: vence o ASSIGNEDTIME mais recente
+            if current is None or assigned_ms >= current[1]:
+                entry = [row["OWNERID"], assigned_ms, row.get("CREATEDTIME")]
+                if entry != current:
+                    entries[workorder_id] = entry
+                    changed += 1
+            if assigned_ms > (index["watermark"] or -1):
+                index["watermark"] = assigned_ms
+        return changed
+
+    def refresh(self, title: str, force: bool = False) -> bool:
+        """
+        Atualiza o índice com os estados novos desde a marca d'água
+
+        Args:
+            title: Título dos chamados indexados
+            force: Ignorar o intervalo mínimo entre consultas
+
+        Returns:
+            True se o índice está utilizável
+        """
+        with self._lock:
+            index = self._load(title)
+            if not force and time.monotonic() - index["checked_at"] < self.refresh_interval_seconds:
+                return index["watermark"] is not None
+
+            full_build = index["watermark"] is None
+            query = """
+            SELECT
+              ws.WORKORDERID,
+              ws.OWNERID,
+              ws.ASSIGNEDTIME,
+              w.CREATEDTIME
+            FROM dbo.WorkOrderStates AS ws
+            JOIN dbo.WorkOrder AS w ON w.WORKORDERID = ws.WORKORDERID
+            WHERE w.TITLE = ?
+            """
+            params: tuple = (title,)
+            if not full_build:
+                # >= para não perder estados gravados no mesmo milissegundo da marca d'água
+                query += "  AND ws.ASSIGNEDTIME >= ?\n"
+                params = (title, index["watermark"])
+            query += "ORDER BY ws.ASSIGNEDTIME;"
+
+            rows = db.execute_query(query, params)
+            if rows is None:
+                logger.warning("Falha ao atualizar índice de responsáveis; mantendo versão atual")
+                return index["watermark"] is not None
+
+            changed = self._apply_states(index, rows)
+            if full_build and index["watermark"] is None:
+                # Nenhum estado para o título: índice vazio, mas válido
+                index["watermark"] = -1
+            index["checked_at"] = time.monotonic()
+
+            if changed or full_build:
+                self.cache.set_persistent(title, {
+                    "entries": {str(wo_id): entry for wo_id, entry in index["entries"].items()},
+                    "watermark": index["watermark"]
+                })
+                logger.info(f"Índice de responsáveis {'montado' if full_build else 'atualizado'}: "
+                            f"{len(rows)} estados lidos, {changed} chamados alterados")
+            return True
+
+    def get_workorders_for_owners(self, title: str, owner_ids: List[int],
+                                  created_before_ms: Optional[int] = None) -> Optional[Dict[int, int]]:
+        """
+        Retorna os chamados cujo responsável atual está em owner_ids
+
+        Args:
+            title: Título dos chamados
+            owner_ids: OWNERIDs dos técnicos
+            created_before_ms: Ignorar chamados criados depois deste timestamp (ms)
+
+        Returns:
+            Dict workorder_id -> owner_id, ou None se o índice não está disponível
+        """
+        if not self.refresh(title):
+            return None
+
+        wanted = set(owner_ids)
+        with self._lock:
+            entries = self._indexes[title]["entries"]
+            return {
+                wo_id: entry[0]
+                for wo_id, entry in entries.items()
+                if entry[0] in wanted
+                and (created_before_ms is None or entry[2] is None or entry[2] <= created_before_ms)
+            }
+
+    def get_latest_workorder(self, title: str, owner_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o chamado mais recente do técnico no formato das linhas SQL
+        (WORKORDERID, TITLE, CREATEDTIME, OWNERID)
+
+        Returns:
+            Dict da linha, {} se o técnico não tem chamado, ou None se o índice não está disponível
+        """
+        if not self.refresh(title):
+            return None
+
+        with self._lock:
+            entries = self._indexes[title]["entries"]
+            candidates = [(entry[2] or 0, wo_id) for wo_id, entry in entries.items() if entry[0] == owner_id]
+            if not candidates:
+                return {}
+            created_ms, workorder_id = max(candidates)
+            return {
+                "WORKORDERID": workorder_id,
+                "TITLE": title,
+                "CREATEDTIME": created_ms,
+                "OWNERID": owner_id
+            }
+
+    def invalidate(self, title: Optional[str] = None):
+        """Força nova consulta incremental na próxima leitura"""
+        with self._lock:
+            for key, index in self._indexes.items():
+                if title is None or key == title:
+                    index["checked_at"] = 0.0
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retorna status dos índices carregados"""
+        try:
+            with self._lock:
+                return {
+                    "indexes": {
+                        title: {
+                            "workorders": len(index["entries"]),
+                            "watermark": index["watermark"],
+                            "seconds_since_check": round(time.monotonic() - index["checked_at"], 1)
+                            if index["checked_at"] else None
+                        }
+                        for title, index in self._indexes.items()
+                    },
+                    "refresh_interval_seconds": self.refresh_interval_seconds,
+                    "checked_at": datetime.now().isoformat()
+                }
+        except Exception as e:
+            logger.error(f"Erro ao obter status do índice de responsáveis: {str(e)}")
+            return {"error": str(e)}
+
+
+# Instância global do serviço
+owner_index_service = OwnerIndexService()
@@ -0,0 +1,324 @@
+"""
+Period Plan Service
+Planejamento das tarefas de todos os dias úteis restantes do período 26->25.
+
+O plano é montado em uma única passada sobre o período: cada dia recebe uma
+combinação exata (programação dinâmica em passos de 0,1h) que soma a meta do
+dia, priorizando títulos menos usados no plano e respeitando um intervalo
+mínimo (cooldown) entre usos do mesmo título. Títulos quase iguais (MinHash,
+mesmo limiar da desduplicação) formam um grupo: no máximo um por dia e cooldown
+compartilhado. O plano fica em cache e a execução diária apenas consome a fatia do dia.
+"""
+
+import logging
+import random
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable, Set
+from app.models.cache import PersistentCache
+from app.services.period_service import get_current_26_25_period, HOURS_PER_WORKDAY
+from app.services.cache_event_service import cache_event_service, EXCLUSION_CHANGED, normalize_dates
+from app.services.task_bank_service import task_bank_service, TaskBankService, exact_selection, HOURS_RESOLUTION
+from app.services.task_similarity_service import task_similarity_service, TaskSimilarityService
+
+logger = logging.getLogger(__name__)
+
+# Dias úteis que um título fica bloqueado depois de usado
+DEFAULT_TITLE_COOLDOWN_DAYS = 3
+
+
+def _business_day_number(day: date) -> int:
+    """Número sequencial do dia útil (sábado e domingo contam como a sexta anterior)"""
+    weeks, weekday = divmod(day.toordinal() - 1, 7)  # ordinal 1 = segunda-feira
+    return weeks * 5 + min(weekday, 4)
+
+
+class PeriodPlanService:
+    """Planejador do período com cache do plano e consumo diário por fatia"""
+
+    def __init__(self, bank: TaskBankService = task_bank_service, cooldown_days: int = DEFAULT_TITLE_COOLDOWN_DAYS,
+                 similarity: TaskSimilarityService = task_similarity_service):
+        self.bank = bank
+        self.similarity = similarity
+        self.cooldown_days = cooldown_days
+        self.cache = PersistentCache("period_plan")
+        self._lock = threading.Lock()
+
+    def _load_bank(self) -> List[Dict[str, Any]]:
+        """Tarefas do banco com horas (tempo_gasto) em unidades de HOURS_RESOLUTION"""
+        # Horas fora da resolução não entram em soma exata
+        return [
+            {**record.to_row(), "_units": record.units}
+            for record in self.bank.get_records()
+            if record.title and record.units
+        ]
+
+    def _bank_mtime(self) -> Optional[float]:
+        return self.bank.mtime
+
+    def _remaining_days(self, reference: date) -> List[Dict[str, Any]]:
+        """Dias úteis de reference até o fim do período, com a meta líquida de exclusões"""
+        period_start, period_end = get_current_26_25_period(reference)
+        excluded: Dict[str, float] = {}
+        try:
+            from app.services.exclusion_service import ExclusionService
+            for exclusion in ExclusionService().get_exclusions_for_period(reference):
+                excluded[exclusion["date"]] = excluded.get(exclusion["date"], 0.0) + float(exclusion["hours"])
+        except Exception as e:
+            logger.warning(f"Erro ao carregar exclusões para o plano: {str(e)}")
+
+        days = []
+        current = max(reference, period_start)
+        while current <= period_end:
+            if current.weekday() < 5:
+                target = round(HOURS_PER_WORKDAY - excluded.get(current.isoformat(), 0.0), 2)
+                if target > 0:
+                    days.append({"date": current.isoformat(), "target_hours": target})
+            current += timedelta(days=1)
+        return days
+
+    def _recent_titles(self) -> Dict[str, date]:
+        """Títulos criados recentemente -> data da última criação (hoje, se desconhecida)"""
+        try:
+            from app.services.task_deduplication_service import task_deduplication_service
+            titles = task_deduplication_service.get_recent_task_titles()
+            cooldowns = task_deduplication_service.history.get_cooldowns()
+            today = date.today()
+            return {
+                title: datetime.fromisoformat(cooldowns[title]["last_created"]).date()
+                if title in cooldowns else today
+                for title in sorted(titles)
+            }
+        except Exception as e:
+            logger.warning(f"Erro ao obter títulos recentes para o plano: {str(e)}")
+            return {}
+
+    def _title_clusters(self) -> Dict[str, int]:
+        """Título do banco -> grupo de quase duplicatas ({} se indisponível)"""
+        try:
+            return {title: cluster for (title, _), cluster in self.similarity.get_bank_index().clusters().items()}
+        except Exception as e:
+            logger.warning(f"Erro ao agrupar títulos quase iguais para o plano: {str(e)}")
+            return {}
+
+    def _with_near_duplicates(self, titles: Iterable[str], recent_titles: Dict[str, date]) -> Dict[str, date]:
+        """Acrescenta aos recentes os títulos quase iguais a algum deles (com a mesma data)"""
+        try:
+            matches = self.similarity.match_recent(titles, recent_titles)
+        except Exception as e:
+            logger.warning(f"Erro ao comparar o plano com os títulos recentes: {str(e)}")
+            return recent_titles
+        expanded = dict(recent_titles)
+        for title, (recent_title, _) in matches.items():
+            expanded.setdefault(title, recent_titles[recent_title])
+        return expanded
+
+    def _slice_conflicts(self, tasks: List[Dict[str, Any]], recent_titles: Dict[str, date]) -> Set[str]:
+        """Títulos da fatia iguais ou quase iguais a um título recente"""
+        titles = [task["titulo"] for task in tasks]
+        blocked = self._with_near_duplicates(titles, recent_titles)
+        return {title for title in titles if title in blocked}
+
+    def _plan_days(self, days: List[Dict[str, Any]], bank: List[Dict[str, Any]],
+                   recent_titles: Dict[str, date], rng: random.Random,
+                   clusters: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Aloca todos os dias em uma passada, mantendo uso e último dia de cada título
+
+        Plano e histórico são comparados em dias úteis (_business_day_number), a
+        unidade do cooldown. Títulos do mesmo grupo em clusters (quase iguais)
+        compartilham o cooldown e não entram juntos no mesmo dia.
+        """
+        clusters = clusters or {}
+        by_title: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        for task in bank:
+            by_title.setdefault(task["titulo"], {}).setdefault(task["_units"], []).append(task)
+
+        def group_of(title):
+            return clusters.get(title, title)
+
+        def selection_groups(titles):
+            """Um grupo por cluster; em cada faixa de horas vale o título mais preferido"""
+            groups: Dict[Any, Dict[int, List[Dict[str, Any]]]] = {}
+            for title in titles:
+                options = groups.setdefault(group_of(title), {})
+                for units, tasks in by_title[title].items():
+                    options.setdefault(units, tasks)
+            return list(groups.items())
+
+        use_count = {title: 0 for title in by_title}
+        last_used: Dict[Any, int] = {}
+        for title, used_on in recent_titles.items():
+            if title in by_title:
+                group, used_number = group_of(title), _business_day_number(used_on)
+                last_used[group] = max(last_used.get(group, used_number), used_number)
+
+        for day in days:
+            day_number = _business_day_number(date.fromisoformat(day["date"]))
+            target_units = round(day["target_hours"] / HOURS_RESOLUTION)
+            tie_break = {title: rng.random() for title in by_title}
+
+            def cooling(title):
+                group = group_of(title)
+                return group in last_used and day_number - last_used[group] <= self.cooldown_days
+
+            # Preferência: fora do cooldown, menos usados; depois, os de uso mais antigo
+            eligible = sorted((t for t in by_title if not cooling(t)), key=lambda t: (use_count[t], tie_break[t]))
+            cooling_titles = sorted((t for t in by_title if cooling(t)),
+                                    key=lambda t: (last_used[group_of(t)], tie_break[t]))
+
+            selected = exact_selection(selection_groups(eligible), target_units, rng)
+            relaxed = False
+            if selected is None and cooling_titles:
+                selected = exact_selection(selection_groups(eligible + cooling_titles), target_units, rng)
+                relaxed = selected is not None
+
+            day["feasible"] = selected is not None
+            day["cooldown_relaxed"] = relaxed
+            day["status"] = "pending"
+            day["tasks"] = [
+                {k: v for k, v in task.items() if not k.startswith("_")}
+                for task in (selected or [])
+            ]
+            for task in selected or []:
+                use_count[task["titulo"]] += 1
+                last_used[group_of(task["titulo"])] = day_number
+
+        return days
+
+    def build_plan(self, reference_date: Optional[date] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Monta (e grava) o plano dos dias úteis restantes do período
+
+        Args:
+            reference_date: Primeiro dia do plano (padrão: hoje)
+            seed: Semente para reproduzir o plano
+        """
+        reference = reference_date or date.today()
+        period_start, period_end = get_current_26_25_period(reference)
+        try:
+            bank = self._load_bank()
+            if not bank:
+                return {"error": "Nenhuma tarefa válida no Banco_Tarefas.csv"}
+
+            recent_titles = self._with_near_duplicates({task["titulo"] for task in bank}, self._recent_titles())
+            days = self._plan_days(self._remaining_days(reference), bank, recent_titles,
+                                   random.Random(seed), self._title_clusters())
+            plan = {
+                "period_start": period_start.isoformat(),
+                "period_end": period_end.isoformat(),
+                "reference_date": reference.isoformat(),
+                "generated_at": datetime.now().isoformat(),
+                "cooldown_days": self.cooldown_days,
+                "bank_mtime": self._bank_mtime(),
+                "bank_titles": len({task["titulo"] for task in bank}),
+                "distinct_titles_used": len({t["titulo"] for day in days for t in day["tasks"]}),
+                "infeasible_days": [day["date"] for day in days if not day["feasible"]],
+                "days": {day["date"]: day for day in days}
+            }
+            with self._lock:
+                self.cache.set_persistent(period_start.isoformat(), plan)
+            logger.info(f"Plano do período {period_start} montado: {len(days)} dias, "
+                        f"{plan['distinct_titles_used']} títulos distintos, "
+                        f"{len(plan['infeasible_days'])} dias sem combinação exata")
+            return plan
+        except Exception as e:
+            logger.error(f"Erro ao montar plano do período: {str(e)}", exc_info=True)
+            return {"error": str(e)}
+
+    def get_plan(self, reference_date: Optional[date] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """Plano em cache do período (remontado se o banco mudou ou se force_refresh)"""
+        reference = reference_date or date.today()
+        period_start, _ = get_current_26_25_period(reference)
+        if not force_refresh:
+            stored = self.cache.get_persistent(period_start.isoformat())
+            if stored and stored.get("data") and stored["data"].get("bank_mtime") == self._bank_mtime():
+                return stored["data"]
+        return self.build_plan(reference)
+
+    def _replan_day(self, entry: Dict[str, Any], recent_titles: Dict[str, date]) -> Dict[str, Any]:
+        """Remonta a fatia de um dia com os títulos recentes (e os quase iguais a eles) em cooldown"""
+        day = {"date": entry["date"], "target_hours": entry["target_hours"]}
+        bank = self._load_bank()
+        recent_titles = self._with_near_duplicates({task["titulo"] for task in bank}, recent_titles)
+        self._plan_days([day], bank, recent_titles, random.Random(), self._title_clusters())
+        day["replanned_at"] = datetime.now().isoformat()
+        return day
+
+    def get_day_tasks(self, day: date, hours_target: float, execution_id: Optional[str] = None,
+                      exclude_titles: Optional[Iterable[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fatia do plano para o dia, se existe um plano válido com a mesma meta
+
+        A fatia é conferida com os títulos criados recentemente (criações depois da
+        montagem do plano), por igualdade ou similaridade, e com exclude_titles;
+        havendo conflito, o dia é replanejado.
+
+        Args:
+            day: Dia da execução
+            hours_target: Meta de horas da execução
+            execution_id: Reserva a fatia para a execução (status "started"), para que
+                uma falha no meio não faça outra execução repetir as mesmas tarefas
+            exclude_titles: Títulos bloqueados pela desduplicação da execução
+
+        Returns:
+            Tarefas planejadas ou None (a execução seleciona as tarefas sozinha)
+        """
+        recent_titles = self._recent_titles()
+        for title in exclude_titles or []:
+            recent_titles.setdefault(title, date.today())
+        period_start, _ = get_current_26_25_period(day)
+        with self._lock:
+            stored = self.cache.get_persistent(period_start.isoformat())
+            if not stored or not stored.get("data"):
+                return None
+            plan = stored["data"]
+            if plan.get("bank_mtime") != self._bank_mtime():
+                return None
+            entry = plan["days"].get(day.isoformat())
+            if (not entry or not entry.get("feasible") or entry.get("status") != "pending"
+                    or abs(entry["target_hours"] - hours_target) > 1e-6):
+                return None
+
+            changed = False
+            conflicts = self._slice_conflicts(entry["tasks"], recent_titles)
+            if conflicts:
+                entry = self._replan_day(entry, recent_titles)
+                plan["days"][day.isoformat()] = entry
+                changed = True
+                logger.info(f"Fatia do plano de {day} replanejada: {sorted(conflicts)} recentes ou quase iguais")
+            usable = entry["feasible"] and not self._slice_conflicts(entry["tasks"], recent_titles)
+
+            if usable and execution_id:
+                entry.update({"status": "started", "execution_id": execution_id,
+                              "started_at": datetime.now().isoformat()})
+                changed = True
+            if changed:
+                self.cache.set_persistent(period_start.isoformat(), plan)
+            return entry["tasks"] if usable else None
+
+    def mark_day_executed(self, day: date, execution_id: str):
+        """Marca a fatia do dia (reservada por get_day_tasks) como executada"""
+        period_start, _ = get_current_26_25_period(day)
+        with self._lock:
+            stored = self.cache.get_persistent(period_start.isoformat())
+            if not stored or not stored.get("data") or day.isoformat() not in stored["data"]["days"]:
+                return
+            plan = stored["data"]
+            plan["days"][day.isoformat()].update({"status": "executed", "execution_id": execution_id})
+            self.cache.set_persistent(period_start.isoformat(), plan)
+
+    def on_exclusion_changed(self, dates=None, **_):
+        """Handler do evento exclusion_changed: metas dos dias mudaram, descarta o plano"""
+        stale = {get_current_26_25_period(day)[0].isoformat(): None for day in normalize_dates(dates)}
+        if stale:
+            with self._lock:
+                self.cache.set_persistent_many(stale)
+            logger.info(f"Planos descartados por mudança de exclusão: {sorted(stale)}")
+
+
+# Instância global do serviço
+period_plan_service = PeriodPlanService()
+
+# Invalidação por eventos
+cache_event_service.subscribe(EXCLUSION_CHANGED, period_plan_service.on_exclusion_changed)
@@ -3,7 +3,7 @@ Serviço simples para cálculo do período vigente 26->25 e capacidade técnica.
 Não usa histórico, apenas datas atuais e dias úteis (seg-sex), 8h/dia.
 """
 from datetime import date, timedelta
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List
 
 HOURS_PER_WORKDAY = 8
 
@@ -41,6 +41,21 @@ def get_current_26_25_period(today: date | None = None) -> Tuple[date, date]:
     return start, end
 
 
+def iter_26_25_periods(start: date, end: date) -> List[Tuple[date, date]]:
+    """
+    Lista, em ordem, os períodos 26->25 que cobrem o intervalo inclusivo [start, end].
+    Ex.: 2025-01-10 a 2025-03-01 -> (26/12-25/01), (26/01-25/02), (26/02-25/03)
+    """
+    if end < start:
+        return []
+    periods = []
+    period_start, period_end = get_current_26_25_period(start)
+    while period_start <= end:
+        periods.append((period_start, period_end))
+        period_start, period_end = get_current_26_25_period(period_end + timedelta(days=1))
+    return periods
+
+
 def count_business_days(start: date, end: date) -> int:
     """
     Conta dias úteis (segunda a sexta) no intervalo inclusivo [start, end].
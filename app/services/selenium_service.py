@@ -5,16 +5,28 @@ e desduplicação de tarefas
 """
 
 import os
+import socket
 import subprocess
-import threading
 import logging
+import threading
 import uuid
-import csv
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+import json
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, List, Set
 from pathlib import Path
+from multiprocessing.connection import Client
 from app.models.database import db
 from app.services.task_deduplication_service import task_deduplication_service
+from app.services.cache_event_service import cache_event_service, TASKS_CREATED
+from app.services.execution_store_service import execution_store_service, EXECUTION_TTL_DAYS, HEARTBEAT_SECONDS
+from app.services.period_plan_service import period_plan_service
+from app.services.task_bank_service import task_bank_service, BANCO_TAREFAS_CSV
+from app.services.daemon_auth_service import load_daemon_authkey
+from app.services.automation_queue_service import (
+    AutomationQueueService, QueueFullError, PRIORITY_NORMAL, DEFAULT_MAX_QUEUE
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +40,33 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 # Caminhos de arquivos
 SCRIPT_PATH = os.path.join(BASE_DIR, "1 - Criador de tarefas final 3.0.py")
 AUTOMATION_LOG_PATH = os.path.join(LOGS_DIR, "automation.log")
-LAST_REQUEST_FILE = os.path.join(BASE_DIR, "last_request.txt")
-LAST_HOURS_FILE = os.path.join(BASE_DIR, "last_hours.txt")
-BANCO_TAREFAS_CSV = os.path.join(BASE_DIR, "Banco_Tarefas.csv")
+RUN_RECEIPTS_DIR = os.path.join(BASE_DIR, "data", "runs")  # recibos gravados pelo script a cada tarefa salva
+
+# Verificação pós-execução: polling com backoff até as tarefas aparecerem no SQL
+VERIFY_TIMEOUT_SECONDS = 30
+VERIFY_INITIAL_DELAY_SECONDS = 0.5
+VERIFY_MAX_DELAY_SECONDS = 4.0
+
+# Daemon do script (--daemon): navegador aquecido atendendo jobs por IPC local
+DAEMON_PORT = int(os.getenv("AUTOMATION_DAEMON_PORT", "6001"))
+SCRIPT_TIMEOUT_SECONDS = 300
+# O daemon para de iniciar tarefas antes de o app desistir de esperar pela resposta
+DAEMON_DEADLINE_MARGIN_SECONDS = 30
+
+# Fila em memória: cada processo identifica as execuções que enfileirou
+QUEUE_OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Execução "queued" desconhecida pela fila local é dada como perdida só depois disso:
+# a do próprio processo, passada a janela entre gravar e enfileirar; a de outro
+# processo (outro worker ou antes de um restart), passado o maior tempo de espera possível
+QUEUE_SUBMIT_GRACE_SECONDS = 10
+QUEUED_LOST_SECONDS = int(os.getenv(
+    "AUTOMATION_QUEUED_LOST_SECONDS",
+    str((DEFAULT_MAX_QUEUE + 1) * (SCRIPT_TIMEOUT_SECONDS + VERIFY_TIMEOUT_SECONDS))
+))
+
+# Linha impressa pelo script a cada tarefa criada (seguida de "[<exec_tag>]")
+TASK_CREATED_MARKER = "==>> Tarefa criada!"
 
 class SeleniumService:
     """Serviço para execução do Selenium com verificação real de TASKIDs"""
@@ -38,49 +74,28 @@ class SeleniumService:
     def __init__(self):
         self.script_path = Path(SCRIPT_PATH)
         self.log_file = Path(AUTOMATION_LOG_PATH)
-        self.executions = {}  # execution_id -> execution_data
+        self.store = execution_store_service  # registro durável: execution_id -> execution_data
+        self.queue = AutomationQueueService(handler=self._run_selenium_with_verification)
     
     def _generate_exec_tag(self) -> str:
         """Gera EXEC_TAG único para execução"""
         now = datetime.now()
-        return f"AUTO_{now.strftime('%Y%m%d_%H%M%S')}"
+        # Sufixo aleatório: execuções enfileiradas no mesmo segundo não compartilham a tag
+        return f"AUTO_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:4]}"
     
     def _load_available_tasks(self) -> List[Dict[str, Any]]:
         """
-        Carrega tarefas disponíveis do banco_tarefas.csv
+        Carrega tarefas disponíveis do banco de tarefas (relido só quando o CSV muda)
         
         Returns:
             Lista de tarefas disponíveis
         """
-        tasks = []
         try:
-            csv_path = Path(BANCO_TAREFAS_CSV)
-            if not csv_path.exists():
-                logger.error(f"Arquivo banco_tarefas.csv não encontrado: {csv_path}")
-                return []
-            
-            with open(csv_path, 'r', encoding='utf-8-sig') as file:  # utf-8-sig remove BOM
-                reader = csv.DictReader(file, delimiter=';')
-                for row in reader:
-                    try:
-                        # Estrutura: titulo;descricao;tempo_estimado;tempo_gasto;complexidade
-                        tempo_estimado_str = str(row.get('tempo_estimado', '0')).replace(',', '.').strip()
-                        tempo_estimado = float(tempo_estimado_str) if tempo_estimado_str else 0.0
-                        
-                        task = {
-                            'title': row.get('titulo', '').strip(),
-                            'description': row.get('descricao', '').strip(),
-                            'hours': tempo_estimado,
-                            'complexity': row.get('complexidade', 'normal').strip()
-                        }
-                        
-                        if task['title'] and task['hours'] > 0:
-                            tasks.append(task)
-                            
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Erro ao processar linha do CSV: {row} - Erro: {e}")
-                        continue
-            
+            tasks = [
+                record.to_task()
+                for record in task_bank_service.get_records()
+                if record.title and record.estimated_hours > 0
+            ]
             logger.info(f"Carregadas {len(tasks)} tarefas do banco_tarefas.csv")
             return tasks
             
@@ -165,16 +180,19 @@ class SeleniumService:
                 }
             }
     
-    def start_automation(self, workorder_id: int, hours_target: float = 8.0) -> Dict[str, Any]:
+    def start_automation(self, workorder_id: int, hours_target: float = 8.0,
+                         priority: int = PRIORITY_NORMAL) -> Dict[str, Any]:
         """
-        Inicia automação Selenium em background com verificação SQL e validação de duplicação
+        Enfileira automação Selenium com verificação SQL e validação de duplicação
         
         Args:
             workorder_id: ID do chamado
             hours_target: Horas alvo para geração
+            priority: Prioridade na fila (0 = alta, 1 = normal, 2 = baixa)
             
         Returns:
-            Dict com execution_id e status inicial ou análise de abort
+            Dict com execution_id e status inicial, análise de abort ou
+            status "rejected" quando a fila está cheia
         """
         try:
             # Validar disponibilidade de tarefas (com filtro de duplicação)
@@ -207,35 +225,53 @@ class SeleniumService:
                 "workorder_id": workorder_id,
                 "hours_target": hours_target,
                 "exec_tag": exec_tag,
-                "status": "started",
+                "status": "queued",
+                "priority": priority,
+                "queue_owner": QUEUE_OWNER_ID,
                 "started_at": started_at,
                 "finished_at": None,
                 "created_task_ids": [],
                 "error": None,
+                # Títulos bloqueados (recentes ou quase iguais a recentes) ficam fora da seleção do script
+                "exclude_titles": sorted({
+                    blocked["title"]
+                    for blocked in validation_result.get("deduplication_analysis", {}).get("blocked_tasks", [])
+                }),
                 "validation_analysis": validation_result  # Salvar análise para debug
             }
             
-            self.executions[execution_id] = execution_data
-            
-            # Salvar configuração para o script
-            self._save_automation_config(workorder_id, hours_target, exec_tag)
-            
-            # Iniciar thread de execução
-            thread = threading.Thread(
-                target=self._run_selenium_with_verification,
-                args=(execution_id,)
-            )
-            thread.daemon = True
-            thread.start()
+            self.store.evict_expired()
+            self._evict_run_files()
+            self.store.save(execution_data)
+            
+            # Enfileirar (o worker grava a configuração do script e executa)
+            try:
+                queue_position = self.queue.submit(execution_id, workorder_id, priority)
+            except QueueFullError as e:
+                execution_data["status"] = "rejected"
+                execution_data["error"] = str(e)
+                execution_data["finished_at"] = datetime.now()
+                self.store.save(execution_data)
+                logger.warning(f"Automação recusada - {e}")
+                return {
+                    "execution_id": execution_id,
+                    "status": "rejected",
+                    "error": str(e),
+                    "retry_after": e.retry_after_seconds,
+                    "queue": self.queue.get_metrics()
+                }
             
-            logger.info(f"Automação iniciada - execution_id: {execution_id}, exec_tag: {exec_tag}, workorder_id: {workorder_id}")
+            logger.info(f"Automação enfileirada - execution_id: {execution_id}, exec_tag: {exec_tag}, "
+                       f"workorder_id: {workorder_id}, posição: {queue_position}")
             
             return {
                 "execution_id": execution_id,
                 "workorder_id": workorder_id,
                 "hours_target": hours_target,
                 "exec_tag": exec_tag,
-                "status": "started",
+                "status": "queued",
+                "priority": priority,
+                "queue_position": queue_position,
                 "started_at": started_at.isoformat(),
                 "validation_passed": True
             }
@@ -258,16 +294,50 @@ class SeleniumService:
         Returns:
             Dict com status e resultados da execução
         """
-        if execution_id not in self.executions:
+        execution = self.store.get(execution_id)
+        if execution is None:
             return {
                 "error": "Execution ID não encontrado",
                 "status": "not_found"
             }
         
-        execution = self.executions[execution_id]
+        if execution["status"] == "queued" and self._is_lost_from_queue(execution):
+            # Fila é em memória: a execução se perdeu num reinício antes de começar
+            execution["status"] = "error"
+            execution["error"] = "Execução perdida da fila (aplicação reiniciada antes do início)"
+            execution["finished_at"] = datetime.now()
+            self.store.save(execution)
+        
+        return self._format_execution(execution)
+    
+    def _is_lost_from_queue(self, execution: Dict[str, Any]) -> bool:
+        """
+        Indica se uma execução "queued" não está mais em nenhuma fila
         
+        A fila local só conhece o que este processo enfileirou; execuções de outro
+        worker (ou de antes de um restart) só são dadas como perdidas pela idade.
+        """
+        if self.queue.is_known(execution["execution_id"]):
+            return False
+        age_seconds = (datetime.now() - execution["started_at"]).total_seconds()
+        if execution.get("queue_owner") == QUEUE_OWNER_ID:
+            return age_seconds > QUEUE_SUBMIT_GRACE_SECONDS
+        return age_seconds > QUEUED_LOST_SECONDS
+    
+    def list_executions(self, workorder_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Lista as execuções de um chamado (mais recentes primeiro)
+        
+        Args:
+            workorder_id: ID do chamado
+            limit: Máximo de execuções retornadas
+        """
+        return [self._format_execution(e) for e in self.store.list_by_workorder(workorder_id, limit)]
+    
+    def _format_execution(self, execution: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte a execução armazenada no formato de resposta da API"""
         return {
-            "execution_id": execution_id,
+            "execution_id": execution["execution_id"],
             "workorder_id": execution["workorder_id"],
             "hours_target": execution["hours_target"],
             "exec_tag": execution["exec_tag"],
@@ -275,39 +345,87 @@ class SeleniumService:
             "started_at": execution["started_at"].isoformat(),
             "finished_at": execution["finished_at"].isoformat() if execution["finished_at"] else None,
             "created_task_ids": execution["created_task_ids"],
-            "error": execution["error"]
+            "error": execution["error"],
+            "queue_position": self.queue.get_position(execution["execution_id"]) if execution["status"] == "queued" else None,
+            "timings": execution.get("timings")
         }
     
+    @contextmanager
+    def _heartbeat(self, execution_id: str):
+        """Renova updated_at da execução a cada HEARTBEAT_SECONDS enquanto o bloco roda"""
+        stop = threading.Event()
+        
+        def beat():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                if not self.store.touch(execution_id):
+                    return
+        
+        thread = threading.Thread(target=beat, name=f"heartbeat-{execution_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+    
     def _run_selenium_with_verification(self, execution_id: str):
         """
-        Executa Selenium e verifica criação de tarefas no SQL
+        Executa Selenium e verifica criação de tarefas no SQL (com heartbeat: uma
+        execução longa não é dada como interrompida por STALE_RUNNING_SECONDS)
+        
+        Returns:
+            True se as tarefas foram criadas e confirmadas (métrica da fila)
         """
-        execution = self.executions[execution_id]
+        with self._heartbeat(execution_id):
+            return self._run_execution(execution_id)
+    
+    def _run_execution(self, execution_id: str) -> bool:
+        """Corpo da execução: script, verificação no SQL e registro do resultado"""
+        execution = self.store.get(execution_id)
         
         try:
             # Atualizar status
             execution["status"] = "running"
+            execution["run_started_at"] = datetime.now().isoformat()
+            self.store.save(execution)
             
             logger.info(f"Iniciando Selenium - execution_id: {execution_id}, exec_tag: {execution['exec_tag']}")
             
+            # Posição atual do log: o trecho desta execução informa quantas tarefas o script criou
+            log_offset = self.log_file.stat().st_size if self.log_file.exists() else 0
+            
+            # Fatia do plano do período para hoje (se houver plano com a mesma meta)
+            planned_tasks = period_plan_service.get_day_tasks(
+                date.today(), execution["hours_target"], execution_id,
+                exclude_titles=execution.get("exclude_titles")
+            )
+            if planned_tasks:
+                execution["planned_tasks"] = len(planned_tasks)
+                logger.info(f"Usando {len(planned_tasks)} tarefas do plano do período")
+            
+            # Manifesto da execução: tarefas planejadas e títulos bloqueados pela desduplicação
+            manifest = {"tasks": planned_tasks, "exclude_titles": execution.get("exclude_titles", [])}
+            
             # Executar script Selenium
-            selenium_success = self._execute_selenium_script(execution["exec_tag"])
+            selenium_success = self._execute_selenium_script(
+                execution["workorder_id"], execution["hours_target"], execution["exec_tag"], manifest
+            )
+            execution["timings"] = self._load_run_timings(execution["exec_tag"])
             
             if not selenium_success:
                 execution["status"] = "error"
                 execution["error"] = "Falha na execução do script Selenium"
                 execution["finished_at"] = datetime.now()
-                return
-            
-            # Aguardar um pouco antes de verificar SQL
-            import time
-            time.sleep(5)
+                self.store.save(execution)
+                return False
             
-            # Verificar criação de tarefas no SQL
-            created_tasks = self._verify_created_tasks(
+            # Verificar criação de tarefas no SQL (polling até o total esperado aparecer)
+            expected_count = self._count_reported_tasks(execution["exec_tag"], log_offset)
+            created_tasks = self._wait_for_created_tasks(
                 execution["workorder_id"],
                 execution["exec_tag"],
-                execution["started_at"]
+                execution["started_at"],
+                expected_count
             )
             
             execution["finished_at"] = datetime.now()
@@ -315,40 +433,64 @@ class SeleniumService:
             if created_tasks:
                 execution["status"] = "success"
                 execution["created_task_ids"] = created_tasks  # Agora é lista de dicts
+                self.store.save(execution)
                 
                 # Log resumido para facilitar leitura
                 task_summary = ", ".join([f"#{task['task_id']} ({task['time_spent']}h)" for task in created_tasks])
                 logger.info(f"Automação concluída com sucesso - execution_id: {execution_id}, "
                            f"{len(created_tasks)} tarefas criadas: {task_summary}")
                 
+                if planned_tasks:
+                    period_plan_service.mark_day_executed(date.today(), execution_id)
+                
                 # Invalidar cache apenas em caso de sucesso
-                self._invalidate_cache()
+                self._invalidate_cache(execution["workorder_id"], created_tasks)
                 
             else:
                 execution["status"] = "no_tasks_detected"
+                self.store.save(execution)
                 logger.warning(f"Automação executada mas nenhuma tarefa detectada - execution_id: {execution_id}")
             
         except Exception as e:
             execution["status"] = "error"
             execution["error"] = str(e)
             execution["finished_at"] = datetime.now()
+            self.store.save(execution)
             logger.error(f"Erro na automação - execution_id: {execution_id}: {str(e)}", exc_info=True)
+        
+        return execution["status"] == "success"
     
-    def _execute_selenium_script(self, exec_tag: str) -> bool:
+    def _execute_selenium_script(self, workorder_id: int, hours_target: float, exec_tag: str,
+                                 manifest: Optional[Dict[str, Any]] = None) -> bool:
         """
-        Executa o script Selenium com EXEC_TAG
+        Executa o script Selenium com os parâmetros da execução na linha de comando
         
         Args:
+            workorder_id: ID do chamado
+            hours_target: Horas alvo
             exec_tag: Tag de execução para incluir nas tarefas
+            manifest: Opções da execução ("tasks" já escolhidas pelo plano do período,
+                "exclude_titles" a evitar na seleção)
             
         Returns:
             True se executado com sucesso
         """
+        daemon_result = self._execute_via_daemon(workorder_id, hours_target, exec_tag, manifest)
+        if daemon_result is not None:
+            return daemon_result
+        
         try:
             logger.info("Iniciando execução do script Selenium...")
             
-            # Comando para executar o script com exec_tag
-            cmd = ["python", str(SCRIPT_PATH), "--exec-tag", exec_tag]
+            # Parâmetros por execução (sem arquivos compartilhados entre execuções paralelas)
+            cmd = [
+                "python", str(SCRIPT_PATH),
+                "--workorder", str(workorder_id),
+                "--hours", str(hours_target),
+                "--exec-tag", exec_tag
+            ]
+            if manifest and any(manifest.values()):
+                cmd += ["--manifest", self._write_run_manifest(exec_tag, manifest)]
             
             # Configurar ambiente sem prompt interativo
             env = os.environ.copy()
@@ -364,7 +506,7 @@ class SeleniumService:
                     cmd,
                     stdout=log_f,
                     stderr=subprocess.STDOUT,
-                    timeout=300,  # 5 minutos timeout
+                    timeout=SCRIPT_TIMEOUT_SECONDS,
                     cwd=str(self.script_path.parent),
                     env=env
                 )
@@ -384,79 +526,379 @@ class SeleniumService:
             logger.error(f"Erro ao executar script Selenium: {str(e)}", exc_info=True)
             return False
     
-    def _verify_created_tasks(self, workorder_id: int, exec_tag: str, started_at: datetime) -> List[Dict[str, Any]]:
+    def _daemon_request(self, message: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Envia mensagem ao daemon; None se o daemon não está rodando (ou sem chave)"""
+        try:
+            authkey = load_daemon_authkey()
+        except RuntimeError as e:
+            logger.warning(f"Daemon da automação desabilitado: {e}")
+            return None
+        try:
+            conn = Client(("127.0.0.1", DAEMON_PORT), authkey=authkey)
+        except (ConnectionRefusedError, OSError):
+            return None
+        with conn:
+            conn.send(message)
+            if not conn.poll(timeout):
+                raise TimeoutError(f"Daemon não respondeu em {timeout:.0f}s")
+            return conn.recv()
+    
+    def _write_run_manifest(self, exec_tag: str, manifest: Dict[str, Any]) -> str:
+        """Grava o manifesto da execução em data/runs/<exec_tag>.manifest.json"""
+        os.makedirs(RUN_RECEIPTS_DIR, exist_ok=True)
+        manifest_path = os.path.join(RUN_RECEIPTS_DIR, f"{exec_tag}.manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        return manifest_path
+    
+    def _execute_via_daemon(self, workorder_id: int, hours_target: float, exec_tag: str,
+                            manifest: Optional[Dict[str, Any]] = None) -> Optional[bool]:
         """
-        Verifica no SQL se tarefas foram criadas com o EXEC_TAG
+        Executa o job no daemon (navegador já aberto), gravando a saída no log da automação
+        
+        Returns:
+            True/False conforme o resultado, ou None se o daemon não está disponível
+        """
+        # Prazo (epoch): o daemon não começa tarefas depois que o app já desistiu do job
+        deadline = time.time() + SCRIPT_TIMEOUT_SECONDS - DAEMON_DEADLINE_MARGIN_SECONDS
+        job = {"cmd": "run", "workorder": workorder_id, "hours": hours_target, "exec_tag": exec_tag,
+               "deadline": deadline, **(manifest or {})}
+        try:
+            reply = self._daemon_request(job, SCRIPT_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.error(f"Erro na execução via daemon: {str(e)}")
+            return False
+        if reply is None:
+            logger.debug("Daemon da automação indisponível; executando script em novo processo")
+            return None
+        
+        with open(self.log_file, "a", encoding="utf-8") as log_f:
+            log_f.write(f"\n=== Automação iniciada (daemon): {datetime.now().isoformat()} ===\n")
+            log_f.write(f"EXEC_TAG: {exec_tag}\n\n")
+            log_f.write(reply.get("output", ""))
+            log_f.write(f"=== Automação finalizada (daemon): {datetime.now().isoformat()} ===\n")
+            if reply.get("error"):
+                log_f.write(f"Erro: {reply['error']}\n")
+            log_f.write("\n")
+        
+        logger.info(f"Job executado pelo daemon - sucesso: {reply.get('ok')}")
+        return bool(reply.get("ok"))
+    
+    def get_daemon_status(self) -> Dict[str, Any]:
+        """Status do daemon da automação (running, navegador ativo, jobs na sessão atual)"""
+        try:
+            reply = self._daemon_request({"cmd": "ping"}, 5)
+        except Exception as e:
+            return {"running": False, "error": str(e)}
+        if reply is None:
+            return {"running": False, "port": DAEMON_PORT}
+        return {"running": True, "port": DAEMON_PORT,
+                "driver_alive": reply.get("driver_alive"), "jobs": reply.get("jobs")}
+    
+    def _count_reported_tasks(self, exec_tag: str, log_offset: int) -> Optional[int]:
+        """
+        Conta as tarefas que o script informou ter criado: pelo recibo da execução
+        ou, sem recibo, pelas linhas desta execução no trecho do log (com vários
+        workers o trecho também tem linhas de outras execuções)
+        
+        Args:
+            exec_tag: Tag de execução
+            log_offset: Tamanho do log antes da execução
+            
+        Returns:
+            Número de tarefas criadas ou None se não foi possível determinar
+        """
+        receipt = self._load_run_receipt(exec_tag)
+        if receipt is not None:
+            return len(receipt)
+        try:
+            with open(self.log_file, "r", encoding="utf-8", errors="replace") as log_f:
+                log_f.seek(log_offset)
+                return sum(
+                    1 for line in log_f
+                    if TASK_CREATED_MARKER in line and f"[{exec_tag}]" in line
+                )
+        except Exception as e:
+            logger.warning(f"Não foi possível ler o log da execução: {str(e)}")
+            return None
+    
+    def _wait_for_created_tasks(self, workorder_id: int, exec_tag: str, started_at: datetime,
+                                expected_count: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Consulta o SQL com backoff até encontrar as tarefas esperadas ou esgotar o prazo
         
         Args:
             workorder_id: ID do workorder
             exec_tag: Tag de execução
             started_at: Momento que a execução iniciou
+            expected_count: Tarefas informadas pelo script (None = aceita o primeiro resultado;
+                0 = nada a verificar)
             
         Returns:
-            Lista de dicionários com informações completas das tarefas criadas:
-            [{"task_id": int, "title": str, "time_spent": float}, ...]
+            Tarefas encontradas na última consulta
         """
+        if expected_count == 0:
+            logger.info("Verificação SQL dispensada: o script não informou tarefas criadas")
+            return []
+        
+        deadline = time.monotonic() + VERIFY_TIMEOUT_SECONDS
+        delay = VERIFY_INITIAL_DELAY_SECONDS
+        attempts = 0
+        created_tasks: List[Dict[str, Any]] = []
+        
+        while True:
+            attempts += 1
+            created_tasks = self._verify_created_tasks(workorder_id, exec_tag, started_at)
+            if created_tasks and (expected_count is None or len(created_tasks) >= expected_count):
+                break
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, VERIFY_MAX_DELAY_SECONDS)
+        
+        logger.info(f"Verificação SQL: {len(created_tasks)}/{expected_count if expected_count else '?'} "
+                    f"tarefas após {attempts} consulta(s)")
+        return created_tasks
+    
+    def _load_run_receipt(self, exec_tag: str) -> Optional[List[Dict[str, Any]]]:
+        """Lê o recibo da execução gravado pelo script (None se não existe)"""
+        receipt_path = Path(RUN_RECEIPTS_DIR) / f"{exec_tag}.json"
+        if not receipt_path.exists():
+            return None
         try:
-            # Janela de busca: 2 minutos antes do início até agora
-            search_start = started_at - timedelta(seconds=120)
-            search_end = datetime.now()
-            
-            # Query corrigida baseada na estrutura real do ServiceDesk
-            query = """
-            SELECT DISTINCT
+            with open(receipt_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("tasks", [])
+        except Exception as e:
+            logger.warning(f"Recibo da execução {exec_tag} ilegível: {str(e)}")
+            return None
+    
+    def _load_run_timings(self, exec_tag: str) -> Optional[Dict[str, Any]]:
+        """
+        Agrega os tempos por etapa gravados pelo script (data/runs/<exec_tag>.timings.jsonl)
+        
+        Returns:
+            Dict com total e estatísticas por etapa (select2 separado por campo),
+            ou None se o script não gravou tempos
+        """
+        timings_path = Path(RUN_RECEIPTS_DIR) / f"{exec_tag}.timings.jsonl"
+        if not timings_path.exists():
+            return None
+        steps: Dict[str, Dict[str, Any]] = {}
+        total_ms = 0.0
+        tasks = set()
+        try:
+            with open(timings_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    key = f"{record['step']}:{record['field']}" if record.get("field") else record["step"]
+                    ms = float(record.get("ms", 0.0))
+                    stats = steps.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "failures": 0})
+                    stats["count"] += 1
+                    stats["total_ms"] += ms
+                    stats["max_ms"] = max(stats["max_ms"], ms)
+                    stats["failures"] += 0 if record.get("ok", True) else 1
+                    total_ms += ms
+                    if record.get("task") is not None:
+                        tasks.add(record["task"])
+        except Exception as e:
+            logger.warning(f"Tempos da execução {exec_tag} ilegíveis: {str(e)}")
+            return None
+        
+        for stats in steps.values():
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 1)
+            stats["total_ms"] = round(stats["total_ms"], 1)
+        slowest = sorted(steps, key=lambda k: steps[k]["total_ms"], reverse=True)[:5]
+        return {
+            "total_ms": round(total_ms, 1),
+            "tasks": len(tasks),
+            "steps": steps,
+            "slowest_steps": slowest
+        }
+    
+    def _evict_run_files(self) -> int:
+        """
+        Remove recibos, manifestos e tempos (data/runs) mais antigos que o TTL das execuções
+        
+        Returns:
+            Quantidade de arquivos removidos
+        """
+        runs_dir = Path(RUN_RECEIPTS_DIR)
+        if not runs_dir.exists():
+            return 0
+        cutoff = time.time() - EXECUTION_TTL_DAYS * 86400
+        removed = 0
+        for pattern in ("*.json", "*.timings.jsonl"):  # *.json inclui *.manifest.json
+            for path in runs_dir.glob(pattern):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        removed += 1
+                except OSError as e:
+                    logger.warning(f"Erro ao remover arquivo de execução {path.name}: {str(e)}")
+        if removed:
+            logger.info(f"{removed} arquivos de execuções expiradas removidos de {RUN_RECEIPTS_DIR}")
+        return removed
+    
+    def _claimed_task_ids(self, exec_tag: str, since: datetime) -> Set[int]:
+        """TASKIDs já atribuídos por recibos de outras execuções gravados desde 'since'"""
+        claimed = set()
+        runs_dir = Path(RUN_RECEIPTS_DIR)
+        if not runs_dir.exists():
+            return claimed
+        since_ts = since.timestamp()
+        for path in runs_dir.glob("*.json"):
+            if path.name.endswith(".manifest.json") or path.name == f"{exec_tag}.json":
+                continue
+            try:
+                if path.stat().st_mtime < since_ts:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    tasks = json.load(f).get("tasks", [])
+            except Exception:
+                continue
+            claimed.update(entry["task_id"] for entry in tasks if entry.get("task_id"))
+        return claimed
+    
+    def _save_run_receipt(self, exec_tag: str, receipt: List[Dict[str, Any]]):
+        """Regrava o recibo com os TASKIDs reconciliados"""
+        receipt_path = Path(RUN_RECEIPTS_DIR) / f"{exec_tag}.json"
+        tmp_path = receipt_path.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"exec_tag": exec_tag, "tasks": receipt}, f, ensure_ascii=False)
+            os.replace(tmp_path, receipt_path)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar recibo da execução {exec_tag}: {str(e)}")
+    
+    def _reconcile_receipt(self, workorder_id: int, exec_tag: str, receipt: List[Dict[str, Any]],
+                           started_at: datetime) -> Optional[List[Dict[str, Any]]]:
+        """
+        Localiza no SQL as tarefas do recibo sem varrer TaskDescription
+        
+        Recibo já reconciliado: busca direta por TASKID (chave primária).
+        Caso contrário: tarefas do chamado na janela da execução (WORKORDERID + CREATEDDATE),
+        casadas por título exato e horário de gravação mais próximo. A janela começa antes
+        do início (margem de relógio), então TASKIDs já atribuídos a recibos de execuções
+        anteriores ficam de fora: uma tarefa de mesmo título da execução anterior não é
+        tomada por esta.
+        
+        Returns:
+            Linhas SQL das tarefas encontradas ou None em caso de erro
+        """
+        select = """
+            SELECT
                 td.TASKID,
                 td.TITLE AS TaskTitle,
                 TRY_CONVERT(decimal(10,2), REPLACE(tf.UDF_CHAR2, ',', '.')) AS TempoGasto,
                 TRY_CONVERT(decimal(10,2), REPLACE(tf.UDF_CHAR1, ',', '.')) AS TempoEstimado,
-                td.CREATEDDATE,
-                tdesc.DESCRIPTION
-            FROM dbo.TaskDetails td
-            JOIN dbo.WorkOrderToTaskDetails wttd ON wttd.TASKID = td.TASKID
+                td.CREATEDDATE
+            FROM dbo.WorkOrderToTaskDetails wttd
+            JOIN dbo.TaskDetails td ON td.TASKID = wttd.TASKID
             LEFT JOIN dbo.Task_Fields tf ON tf.TASKID = td.TASKID
-            LEFT JOIN dbo.TaskDescription tdesc ON tdesc.TASKID = td.TASKID
             WHERE wttd.WORKORDERID = ?
-              AND td.CREATEDDATE >= ?
-              AND td.CREATEDDATE <= ?
-              AND tdesc.DESCRIPTION LIKE ?
             """
+        
+        task_ids = [entry.get("task_id") for entry in receipt]
+        if receipt and all(task_ids):
+            query = select + f"  AND td.TASKID IN ({', '.join('?' for _ in task_ids)})"
+            return db.execute_query(query, (workorder_id, *task_ids))
+        
+        search_start = started_at - timedelta(seconds=120)
+        query = select + "  AND td.CREATEDDATE >= ?\n              AND td.CREATEDDATE <= ?"
+        rows = db.execute_query(query, (
+            workorder_id,
+            int(search_start.timestamp() * 1000),
+            int(datetime.now().timestamp() * 1000)
+        ))
+        if rows is None:
+            return None
+        
+        # Casamento exato por título; empates resolvidos pelo horário de gravação
+        claimed = self._claimed_task_ids(exec_tag, search_start)
+        unmatched = [row for row in rows if row["TASKID"] not in claimed]
+        matched = []
+        for entry in receipt:
+            title = (entry.get("titulo") or "").strip()
+            candidates = [row for row in unmatched if (row["TaskTitle"] or "").strip() == title]
+            if not candidates:
+                continue
+            saved_at = entry.get("saved_at_ms") or 0
+            row = min(candidates, key=lambda r: abs((r["CREATEDDATE"] or 0) - saved_at))
+            unmatched.remove(row)
+            entry["task_id"] = row["TASKID"]
+            matched.append(row)
+        
+        if matched:
+            # Grava também reconciliações parciais: os TASKIDs ficam reservados para esta execução
+            self._save_run_receipt(exec_tag, receipt)
+        return matched
+    
+    def _query_tasks_by_exec_tag(self, workorder_id: int, exec_tag: str, started_at: datetime) -> Optional[List[Dict[str, Any]]]:
+        """Busca legada pelo EXEC_TAG discreto na descrição (execuções sem recibo)"""
+        # Janela de busca: 2 minutos antes do início até agora
+        search_start = started_at - timedelta(seconds=120)
+        search_end = datetime.now()
+        
+        # Query corrigida baseada na estrutura real do ServiceDesk
+        query = """
+        SELECT DISTINCT
+            td.TASKID,
+            td.TITLE AS TaskTitle,
+            TRY_CONVERT(decimal(10,2), REPLACE(tf.UDF_CHAR2, ',', '.')) AS TempoGasto,
+            TRY_CONVERT(decimal(10,2), REPLACE(tf.UDF_CHAR1, ',', '.')) AS TempoEstimado,
+            td.CREATEDDATE,
+            tdesc.DESCRIPTION
+        FROM dbo.TaskDetails td
+        JOIN dbo.WorkOrderToTaskDetails wttd ON wttd.TASKID = td.TASKID
+        LEFT JOIN dbo.Task_Fields tf ON tf.TASKID = td.TASKID
+        LEFT JOIN dbo.TaskDescription tdesc ON tdesc.TASKID = td.TASKID
+        WHERE wttd.WORKORDERID = ?
+          AND td.CREATEDDATE >= ?
+          AND td.CREATEDDATE <= ?
+          AND (tdesc.DESCRIPTION LIKE ? OR tdesc.DESCRIPTION LIKE ?)
+        """
+        
+        # Parâmetros da query - timestamps em milissegundos (formato ServiceDesk)
+        exec_tag_discreto = exec_tag[-4:] + " -->"
+        exec_tag_html_encoded = exec_tag[-4:] + " --&gt;"  # Versão HTML encoded
+        
+        # Uma única consulta para os dois padrões (HTML encoded é o mais comum no ServiceDesk)
+        params = (
+            workorder_id,
+            int(search_start.timestamp() * 1000),
+            int(search_end.timestamp() * 1000),
+            f"%{exec_tag_html_encoded}%",
+            f"%{exec_tag_discreto}%"
+        )
+        
+        logger.debug(f"Busca por tasks com EXEC_TAG {exec_tag[-4:]}: "
+                    f"workorder_id={workorder_id}, período={search_start} até {search_end}")
+        return db.execute_query(query, params)
+    
+    def _verify_created_tasks(self, workorder_id: int, exec_tag: str, started_at: datetime) -> List[Dict[str, Any]]:
+        """
+        Verifica no SQL se tarefas foram criadas pela execução
+        
+        Usa o recibo gravado pelo script (busca por chave/índice); sem recibo,
+        recorre à busca pelo EXEC_TAG na descrição.
+        
+        Args:
+            workorder_id: ID do workorder
+            exec_tag: Tag de execução
+            started_at: Momento que a execução iniciou
             
-            # Parâmetros da query - timestamps em milissegundos (formato ServiceDesk)
-            exec_tag_discreto = exec_tag[-4:] + " -->"
-            exec_tag_html_encoded = exec_tag[-4:] + " --&gt;"  # Versão HTML encoded
-            
-            # Buscar ambos os padrões: normal e HTML encoded
-            search_pattern_normal = f"%{exec_tag_discreto}%"
-            search_pattern_encoded = f"%{exec_tag_html_encoded}%"
-            
-            timestamp_inicio = int(search_start.timestamp() * 1000)
-            timestamp_fim = int(search_end.timestamp() * 1000)
-            
-            # Tentar primeiro com padrão HTML encoded (mais comum no ServiceDesk)
-            params_encoded = (
-                workorder_id,
-                timestamp_inicio,
-                timestamp_fim,
-                search_pattern_encoded
-            )
-            
-            results = db.execute_query(query, params_encoded)
-            
-            # Se não encontrar, tentar com padrão normal
-            if not results:
-                params_normal = (
-                    workorder_id,
-                    timestamp_inicio,
-                    timestamp_fim,
-                    search_pattern_normal
-                )
-                results = db.execute_query(query, params_normal)
-                used_pattern = exec_tag_discreto
+        Returns:
+            Lista de dicionários com informações completas das tarefas criadas:
+            [{"task_id": int, "title": str, "time_spent": float}, ...]
+        """
+        try:
+            receipt = self._load_run_receipt(exec_tag)
+            if receipt is not None:
+                results = self._reconcile_receipt(workorder_id, exec_tag, receipt, started_at)
             else:
-                used_pattern = exec_tag_html_encoded
-            
-            logger.info(f"Busca por tasks com EXEC_TAG {used_pattern}: "
-                       f"workorder_id={workorder_id}, período={search_start} até {search_end}")
+                results = self._query_tasks_by_exec_tag(workorder_id, exec_tag, started_at)
             
             if results:
                 # Construir lista de tarefas com informações completas
@@ -472,6 +914,7 @@ class SeleniumService:
                     
                     # Log detalhado
                     created_dt = datetime.fromtimestamp(row["CREATEDDATE"] / 1000)
+                    task_info["created_date"] = created_dt.date().isoformat()
                     logger.info(f"Task {task_info['task_id']}: '{task_info['title']}' "
                                f"({task_info['time_spent']}h gasto/{task_info['time_estimated']}h estimado) - criada: {created_dt}")
                 
@@ -479,73 +922,28 @@ class SeleniumService:
                 return created_tasks
                 
             else:
-                logger.warning(f"Nenhuma tarefa encontrada com EXEC_TAG {exec_tag} no período")
-                logger.warning(f"Testados padrões: '{exec_tag_discreto}' e '{exec_tag_html_encoded}'")
-                
-                # Debug: verificar se existem tasks criadas no período (sem o padrão)
-                debug_query = """
-                SELECT COUNT(*), MIN(td.CREATEDDATE), MAX(td.CREATEDDATE)
-                FROM dbo.TaskDetails td
-                JOIN dbo.WorkOrderToTaskDetails wttd ON wttd.TASKID = td.TASKID
-                WHERE wttd.WORKORDERID = ?
-                  AND td.CREATEDDATE >= ?
-                  AND td.CREATEDDATE <= ?
-                """
-                
-                debug_results = db.execute_query(debug_query, (workorder_id, timestamp_inicio, timestamp_fim))
-                if debug_results and debug_results[0][0] > 0:
-                    count = debug_results[0][0]
-                    min_date = datetime.fromtimestamp(debug_results[0][1] / 1000)
-                    max_date = datetime.fromtimestamp(debug_results[0][2] / 1000)
-                    logger.warning(f"AVISO: Existem {count} tasks no período ({min_date} até {max_date}) "
-                                 f"mas nenhuma com os padrões testados. "
-                                 f"Verificar se o Selenium está inserindo o padrão corretamente.")
-                else:
-                    logger.warning(f"Nenhuma task encontrada no WorkOrder {workorder_id} no período especificado")
-                
+                # Chamado a cada tentativa do polling: o aviso final fica em _run_selenium_with_verification
+                logger.debug(f"Nenhuma tarefa encontrada ainda para EXEC_TAG {exec_tag} "
+                            f"({'recibo' if receipt is not None else 'busca na descrição'})")
                 return []
                 
         except Exception as e:
             logger.error(f"Erro ao verificar tarefas criadas: {str(e)}", exc_info=True)
             return []
     
-    def _invalidate_cache(self):
-        """Invalida apenas caches relacionados a tarefas após criação bem-sucedida"""
+    def _invalidate_cache(self, workorder_id: int, created_tasks: List[Dict[str, Any]]):
+        """Publica tasks_created para os caches afetados (tarefas, calendário, rollups)"""
         try:
-            # Invalidar apenas caches de tarefas, não o calendário
-            from app.services.user_tasks_cache_service import user_tasks_cache_service
-            from app.services.execution_cache_service import execution_cache_service
-            
-            user_tasks_cache_service.invalidate_tasks_cache()
-            execution_cache_service.clear_execution_cache()
-            
-            logger.info("Cache de tarefas invalidado após criação de tarefas")
+            dates = {task["created_date"] for task in created_tasks if task.get("created_date")}
+            cache_event_service.publish(
+                TASKS_CREATED,
+                workorder_id=workorder_id,
+                dates=sorted(dates) or [datetime.now().date()],
+                owner_id=None,  # chamado do usuário da aplicação
+                tasks=created_tasks
+            )
         except Exception as e:
             logger.warning(f"Erro ao invalidar cache: {str(e)}")
-    
-    def _save_automation_config(self, workorder_id: int, hours_target: float, exec_tag: str):
-        """
-        Salva configuração para o script de automação
-        
-        Args:
-            workorder_id: ID do chamado
-            hours_target: Horas alvo
-            exec_tag: Tag de execução
-        """
-        try:
-            # Salvar workorder_id e exec_tag
-            with open(LAST_REQUEST_FILE, "w", encoding="utf-8") as f:
-                f.write(f"{workorder_id}|{exec_tag}")
-            
-            # Salvar horas alvo
-            with open(LAST_HOURS_FILE, "w", encoding="utf-8") as f:
-                f.write(str(hours_target))
-                
-            logger.debug(f"Configuração salva - workorder_id: {workorder_id}, exec_tag: {exec_tag}, hours: {hours_target}")
-            
-        except Exception as e:
-            logger.error(f"Erro ao salvar configuração: {str(e)}")
-            raise
 
 # Instância global do serviço
 selenium_service = SeleniumService()
@@ -0,0 +1,309 @@
+"""
+Task Bank Service
+Banco de tarefas (Banco_Tarefas.csv) carregado uma vez e indexado.
+
+O arquivo só é relido quando muda (mtime/tamanho). Os registros são tipados
+(__slots__) e indexados por título, complexidade e faixa de horas (0,1h).
+Usa apenas a biblioteca padrão: é importado tanto pelo app web quanto pelo
+script de automação.
+"""
+
+import csv
+import logging
+import os
+import random
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BANCO_TAREFAS_CSV = os.path.join(BASE_DIR, "Banco_Tarefas.csv")
+
+# Colunas do CSV, na ordem do arquivo
+FIELDNAMES = ["titulo", "descricao", "tempo_estimado", "tempo_gasto", "complexidade"]
+
+# Resolução das horas nas faixas do índice e na combinação exata
+HOURS_RESOLUTION = 0.1
+
+
+def parse_hours(val: Any) -> float:
+    """Converte '1,5', '1.5' ou '1:30' em horas (0.0 se inválido)"""
+    if val is None:
+        return 0.0
+    s = str(val).strip()
+    if not s:
+        return 0.0
+    if ":" in s:
+        hh, mm = s.split(":", 1)
+        try:
+            return int(hh) + (int(mm) / 60.0)
+        except ValueError:
+            pass
+    try:
+        return float(s.replace(",", "."))
+    except ValueError:
+        return 0.0
+
+
+def hours_to_units(hours: float) -> Optional[int]:
+    """Horas em unidades de HOURS_RESOLUTION (None se fora da resolução)"""
+    units = round(hours / HOURS_RESOLUTION)
+    return units if abs(units * HOURS_RESOLUTION - hours) < 1e-6 else None
+
+
+class TaskRecord:
+    """Linha do banco de tarefas com as horas já convertidas"""
+
+    __slots__ = ("title", "description", "estimated", "spent", "complexity",
+                 "estimated_hours", "spent_hours", "units")
+
+    def __init__(self, row: Dict[str, str]):
+        self.title = (row.get("titulo") or "").strip()
+        self.description = (row.get("descricao") or "").strip()
+        self.estimated = (row.get("tempo_estimado") or "").strip()
+        self.spent = (row.get("tempo_gasto") or "").strip()
+        self.complexity = (row.get("complexidade") or "").strip()
+        self.estimated_hours = parse_hours(self.estimated)
+        self.spent_hours = parse_hours(self.spent)
+        self.units = hours_to_units(self.spent_hours)
+
+    def to_row(self) -> Dict[str, Any]:
+        """Formato do script de automação (colunas do CSV + horas convertidas)"""
+        return {
+            "titulo": self.title,
+            "descricao": self.description,
+            "tempo_estimado": self.estimated,
+            "tempo_gasto": self.spent,
+            "complexidade": self.complexity,
+            "_tempo_gasto_h": self.spent_hours,
+            "_tempo_estimado_h": self.estimated_hours
+        }
+
+    def to_csv_row(self) -> Dict[str, str]:
+        """Colunas do CSV (para regravação do banco)"""
+        return {
+            "titulo": self.title,
+            "descricao": self.description,
+            "tempo_estimado": self.estimated,
+            "tempo_gasto": self.spent,
+            "complexidade": self.complexity
+        }
+
+    def to_task(self) -> Dict[str, Any]:
+        """Formato do app web (validação e desduplicação)"""
+        return {
+            "title": self.title,
+            "description": self.description,
+            "hours": self.estimated_hours,
+            "complexity": self.complexity or "normal"
+        }
+
+
+def exact_selection(groups: List[Tuple[str, Dict[int, List[Any]]]], target_units: int,
+                    rng: random.Random) -> Optional[List[Any]]:
+    """
+    Combinação exata (subset-sum) com no máximo uma tarefa por título
+
+    Args:
+        groups: (título, unidades -> tarefas) na ordem de preferência
+        target_units: Meta em unidades de HOURS_RESOLUTION
+        rng: Gerador usado para escolher a tarefa dentro de cada título
+
+    Returns:
+        Tarefas escolhidas ou None se nenhuma combinação soma a meta
+    """
+    if target_units <= 0:
+        return None
+    reached = bytearray(target_units + 1)
+    reached[0] = 1
+    origin: List[Optional[Tuple[int, int, int]]] = [None] * (target_units + 1)
+    for index, (_, options) in enumerate(groups):
+        new_sums = []
+        for units in options:
+            for total in range(units, target_units + 1):
+                # reached ainda não inclui este título: no máximo uma tarefa por título
+                if reached[total - units] and not reached[total] and origin[total] is None:
+                    origin[total] = (index, units, total - units)
+                    new_sums.append(total)
+        for total in new_sums:
+            reached[total] = 1
+        if reached[target_units]:
+            break
+
+    if not reached[target_units]:
+        return None
+
+    selected = []
+    total = target_units
+    while total:
+        index, units, total = origin[total]
+        selected.append(rng.choice(groups[index][1][units]))
+    return selected
+
+
+class TaskBankService:
+    """Banco de tarefas em memória com recarga por mtime"""
+
+    def __init__(self, csv_path: str = BANCO_TAREFAS_CSV):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._records: Tuple[TaskRecord, ...] = ()
+        self._by_title: Dict[str, List[TaskRecord]] = {}
+        self._by_complexity: Dict[str, List[TaskRecord]] = {}
+        self._by_units: Dict[int, List[TaskRecord]] = {}
+        self.loads = 0
+
+    def _current_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.csv_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _ensure_loaded(self):
+        """Relê o CSV apenas se o arquivo mudou desde a última carga"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            records: List[TaskRecord] = []
+            if signature is not None:
+                with open(self.csv_path, encoding="utf-8-sig") as f:
+                    records = [TaskRecord(row) for row in csv.DictReader(f, delimiter=";")]
+            else:
+                logger.error(f"Banco de tarefas não encontrado: {self.csv_path}")
+
+            by_title: Dict[str, List[TaskRecord]] = {}
+            by_complexity: Dict[str, List[TaskRecord]] = {}
+            by_units: Dict[int, List[TaskRecord]] = {}
+            for record in records:
+                by_title.setdefault(record.title, []).append(record)
+                by_complexity.setdefault(record.complexity, []).append(record)
+                if record.units:
+                    by_units.setdefault(record.units, []).append(record)
+
+            self._records = tuple(records)
+            self._by_title, self._by_complexity, self._by_units = by_title, by_complexity, by_units
+            self._signature = signature
+            self.loads += 1
+            logger.info(f"Banco de tarefas carregado: {len(records)} tarefas, {len(by_title)} títulos")
+
+    @property
+    def mtime(self) -> Optional[float]:
+        """mtime do CSV na última carga (identifica a versão do banco)"""
+        self._ensure_loaded()
+        return self._signature[0] / 1e9 if self._signature else None
+
+    def get_records(self) -> Tuple[TaskRecord, ...]:
+        self._ensure_loaded()
+        return self._records
+
+    def by_title(self, title: str) -> List[TaskRecord]:
+        self._ensure_loaded()
+        return list(self._by_title.get(title, []))
+
+    def by_complexity(self, complexity: str) -> List[TaskRecord]:
+        self._ensure_loaded()
+        return list(self._by_complexity.get(complexity, []))
+
+    def by_hours(self, hours: float) -> List[TaskRecord]:
+        """Tarefas cujo tempo_gasto cai na faixa de 0,1h de hours"""
+        self._ensure_loaded()
+        units = hours_to_units(hours)
+        return list(self._by_units.get(units, [])) if units else []
+
+    def titles(self) -> List[str]:
+        self._ensure_loaded()
+        return [title for title in self._by_title if title]
+
+    def write_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Regrava o banco inteiro de forma atômica (arquivo temporário + os.replace)
+
+        Leitores (app e script) veem o arquivo antigo ou o novo, nunca um parcial.
+
+        Returns:
+            Número de linhas gravadas
+        """
+        directory = os.path.dirname(os.path.abspath(self.csv_path))
+        with self._write_lock:
+            fd, tmp_path = tempfile.mkstemp(prefix=".banco_", suffix=".csv", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=FIELDNAMES, delimiter=";", extrasaction="ignore")
+                    writer.writeheader()
+                    for row in rows:
+                        writer.writerow(row)
+                if os.path.exists(self.csv_path):
+                    # mkstemp cria 0600: mantém as permissões do arquivo atual
+                    os.chmod(tmp_path, os.stat(self.csv_path).st_mode & 0o777)
+                os.replace(tmp_path, self.csv_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        logger.info(f"Banco de tarefas regravado: {len(rows)} linhas")
+        return len(rows)
+
+    def update_tasks(self, title: str, **fields) -> int:
+        """
+        Altera colunas de todas as linhas com o título informado
+
+        Args:
+            title: Título das tarefas
+            **fields: Colunas a alterar (ex.: tempo_gasto="1,5")
+
+        Returns:
+            Número de linhas alteradas
+
+        Raises:
+            ValueError: Se alguma coluna não existe no banco
+        """
+        unknown = set(fields) - set(FIELDNAMES)
+        if unknown:
+            raise ValueError(f"Colunas inexistentes no banco de tarefas: {sorted(unknown)}")
+
+        with self._write_lock:
+            rows = [record.to_csv_row() for record in self.get_records()]
+            changed = 0
+            for row in rows:
+                if row["titulo"] == title:
+                    row.update({key: str(value) for key, value in fields.items()})
+                    changed += 1
+            if changed:
+                self.write_rows(rows)
+        return changed
+
+    def add_tasks(self, new_rows: List[Dict[str, Any]]) -> int:
+        """Acrescenta tarefas ao banco (regravação atômica); retorna o total de linhas"""
+        with self._write_lock:
+            rows = [record.to_csv_row() for record in self.get_records()]
+            return self.write_rows(rows + list(new_rows))
+
+    def get_status(self) -> Dict[str, Any]:
+        """Tamanho, índices e versão do banco carregado"""
+        try:
+            self._ensure_loaded()
+            return {
+                "csv_path": self.csv_path,
+                "csv_exists": self._signature is not None,
+                "tasks": len(self._records),
+                "titles": len(self._by_title),
+                "complexities": {k: len(v) for k, v in self._by_complexity.items()},
+                "hour_buckets": len(self._by_units),
+                "mtime": self._signature[0] / 1e9 if self._signature else None,
+                "loads": self.loads
+            }
+        except Exception as e:
+            logger.error(f"Erro ao obter status do banco de tarefas: {str(e)}")
+            return {"error": str(e)}
+
+
+# Instância global do serviço
+task_bank_service = TaskBankService()
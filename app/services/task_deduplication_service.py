@@ -3,12 +3,17 @@ Task Deduplication Service
 Serviço para evitar criação de tarefas duplicadas baseado nas últimas tarefas criadas
 """
 
+import atexit
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Set
 from pathlib import Path
 from app.services.user_tasks_cache_service import user_tasks_cache_service
+from app.services.task_similarity_service import task_similarity_service
+from app.services.task_history_service import task_history_service
 
 logger = logging.getLogger(__name__)
 
@@ -16,44 +21,65 @@ logger = logging.getLogger(__name__)
 BASE_DIR = Path(__file__).parent.parent.parent
 CACHE_FILE = BASE_DIR / "data" / "cache" / "recent_tasks_dedup.json"
 
+# Intervalo mínimo entre gravações do estado em disco (apenas quando mudou)
+PERSIST_INTERVAL_SECONDS = 300
+
 class TaskDeduplicationService:
     """Serviço para evitar tarefas duplicadas"""
     
     def __init__(self):
         self.cache_file = CACHE_FILE
-        self.max_recent_tasks = 7  # Últimas 7 tarefas
+        self.history = task_history_service
+        self.max_recent_tasks = 7  # Fallback sem histórico: últimas 7 tarefas
+        self.persist_interval_seconds = PERSIST_INTERVAL_SECONDS
+        
+        # Estado da última consulta fica em memória; o arquivo é só um espelho para depuração
+        # (best-effort: gravado a cada PERSIST_INTERVAL_SECONDS e na saída do processo)
+        self._lock = threading.Lock()
+        self._state: Dict[str, Any] = {}
+        self._dirty = False
+        self._persisted_at = 0.0
         
         # Garantir que o diretório existe
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Grava o último estado pendente no encerramento normal (não cobre kill -9/queda)
+        atexit.register(self.flush)
     
     def get_recent_task_titles(self) -> Set[str]:
         """
-        Obtém títulos das últimas 7 tarefas criadas
+        Obtém títulos das tarefas criadas na janela de desduplicação
+        
+        Usa o histórico incremental (DEDUP_WINDOW_DAYS); se ele não está
+        disponível, recorre às últimas 7 tarefas do cache do usuário.
         
         Returns:
             Set com títulos das tarefas recentes
         """
         try:
-            # Buscar tarefas do cache service existente
-            tasks_data = user_tasks_cache_service.get_user_tasks()
-            
-            if not tasks_data or not tasks_data.get('user_tasks'):
-                logger.warning("Nenhuma tarefa encontrada no cache")
-                return set()
+            titles = self.history.get_recent_titles()
+            source = 'history'
             
-            # Extrair títulos das últimas 7 tarefas
-            recent_tasks = tasks_data['user_tasks'][:self.max_recent_tasks]
-            titles = {task['title'] for task in recent_tasks if task.get('title')}
-            
-            logger.info(f"Encontrados {len(titles)} títulos únicos nas últimas {self.max_recent_tasks} tarefas")
+            if titles is not None:
+                logger.info(f"Encontrados {len(titles)} títulos nos últimos {self.history.window_days:g} dias")
+                task_count = len(titles)
+            else:
+                # Buscar tarefas do cache service existente
+                tasks_data = user_tasks_cache_service.get_user_tasks()
+                source = 'user_tasks_cache'
+                
+                if not tasks_data or not tasks_data.get('user_tasks'):
+                    logger.warning("Nenhuma tarefa encontrada no cache")
+                    return set()
+                
+                # Extrair títulos das últimas 7 tarefas
+                recent_tasks = tasks_data['user_tasks'][:self.max_recent_tasks]
+                titles = {task['title'] for task in recent_tasks if task.get('title')}
+                task_count = len(recent_tasks)
+                
+                logger.info(f"Encontrados {len(titles)} títulos únicos nas últimas {self.max_recent_tasks} tarefas")
             
-            # Salvar no cache local para análise
-            self._save_cache({
-                'last_updated': datetime.now().isoformat(),
-                'recent_titles': list(titles),
-                'task_count': len(recent_tasks),
-                'total_titles': len(titles)
-            })
+            self._update_state(titles, task_count, source)
             
             return titles
             
@@ -64,6 +90,7 @@ class TaskDeduplicationService:
     def filter_available_tasks(self, available_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Filtra tarefas disponíveis removendo as que foram criadas recentemente
+        e as quase iguais a elas (similaridade MinHash acima do limiar)
         
         Args:
             available_tasks: Lista de tarefas disponíveis do banco_tarefas.csv
@@ -75,6 +102,11 @@ class TaskDeduplicationService:
             # Obter títulos recentes
             recent_titles = self.get_recent_task_titles()
             
+            # Títulos quase iguais aos recentes (ex.: mesma tarefa com pequena variação no texto)
+            near_duplicates = task_similarity_service.match_recent(
+                (task.get('title', '').strip() for task in available_tasks), recent_titles
+            )
+            
             # Filtrar tarefas
             filtered_tasks = []
             blocked_tasks = []
@@ -86,6 +118,13 @@ class TaskDeduplicationService:
                         'title': task_title,
                         'reason': 'Tarefa criada recentemente'
                     })
+                elif task_title in near_duplicates:
+                    similar_title, similarity = near_duplicates[task_title]
+                    blocked_tasks.append({
+                        'title': task_title,
+                        'reason': f"Similar a tarefa recente '{similar_title}'",
+                        'similarity': round(similarity, 2)
+                    })
                 else:
                     filtered_tasks.append(task)
             
@@ -97,6 +136,8 @@ class TaskDeduplicationService:
                 'recent_titles_count': len(recent_titles),
                 'recent_titles': list(recent_titles),
                 'blocked_tasks': blocked_tasks,
+                'near_duplicate_count': sum(1 for t in blocked_tasks if 'similarity' in t),
+                'similarity_threshold': task_similarity_service.threshold,
                 'filter_timestamp': datetime.now().isoformat(),
                 'can_proceed': len(filtered_tasks) > 0
             }
@@ -152,37 +193,66 @@ class TaskDeduplicationService:
         
         return validation
     
-    def _save_cache(self, data: Dict[str, Any]):
-        """Salva dados no cache local para análise"""
+    def _update_state(self, titles: Set[str], task_count: int, source: str):
+        """Atualiza o estado em memória; grava em disco só se mudou e o intervalo passou"""
+        with self._lock:
+            changed = set(self._state.get('recent_titles', [])) != titles or self._state.get('source') != source
+            self._state = {
+                'last_updated': datetime.now().isoformat(),
+                'recent_titles': sorted(titles),
+                'task_count': task_count,
+                'total_titles': len(titles),
+                'source': source
+            }
+            self._dirty = self._dirty or changed
+            due = self._dirty and time.monotonic() - self._persisted_at >= self.persist_interval_seconds
+        if due:
+            self.persist()
+    
+    def flush(self) -> bool:
+        """Grava o estado em disco se houver alteração ainda não persistida"""
+        with self._lock:
+            dirty = self._dirty
+        return self.persist() if dirty else False
+    
+    def persist(self) -> bool:
+        """Grava o estado atual no cache local (recent_tasks_dedup.json)"""
+        with self._lock:
+            data = dict(self._state)
+            self._dirty = False
+            self._persisted_at = time.monotonic()
+        if not data:
+            return False
         try:
             with open(self.cache_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            return True
         except Exception as e:
             logger.warning(f"Erro ao salvar cache: {str(e)}")
+            return False
     
     def get_analysis_report(self) -> Dict[str, Any]:
         """
-        Gera relatório de análise para debug
+        Gera relatório de análise para debug (sem leitura do arquivo de cache)
         
         Returns:
             Dict com relatório completo
         """
         try:
-            if self.cache_file.exists():
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            else:
-                cache_data = {}
-            
             recent_titles = self.get_recent_task_titles()
+            with self._lock:
+                cache_data = dict(self._state)
+                pending_write = self._dirty
             
             return {
                 'service_status': 'active',
                 'cache_file': str(self.cache_file),
-                'cache_exists': self.cache_file.exists(),
-                'recent_titles': list(recent_titles),
+                'pending_write': pending_write,
+                'recent_titles': sorted(recent_titles),
                 'title_count': len(recent_titles),
                 'max_recent_tasks': self.max_recent_tasks,
+                'history': self.history.get_status(),
+                'cooldowns': self.history.get_cooldowns(),
                 'cache_data': cache_data,
                 'report_timestamp': datetime.now().isoformat()
             }
@@ -0,0 +1,259 @@
+"""
+Task History Service
+Histórico local dos títulos de tarefas criadas nos últimos N dias (base da desduplicação).
+
+Substitui o TOP 10 do cache de tarefas do usuário: o histórico é montado uma vez
+com as tarefas da janela e depois atualizado apenas com as tarefas cujo
+CREATEDDATE é maior ou igual à marca d'água, além das tarefas confirmadas pelas
+execuções (evento tasks_created). Cada título guarda só a criação mais recente,
+então a consulta de pertinência é um acesso a dicionário. O horário registrado
+pela aplicação é provisório: o CREATEDDATE do SQL o substitui no próximo delta.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Set
+from flask import current_app, has_app_context
+from app.models.cache import PersistentCache
+from app.models.database import db
+from app.services.cache_event_service import cache_event_service, TASKS_CREATED
+
+logger = logging.getLogger(__name__)
+
+# Dias que um título criado fica bloqueado para nova criação
+DEDUP_WINDOW_DAYS = float(os.getenv("DEDUP_WINDOW_DAYS", "3"))
+
+# Intervalo mínimo entre consultas incrementais ao SQL
+REFRESH_INTERVAL_SECONDS = 30
+
+_MS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class TaskHistoryService:
+    """Histórico incremental título -> última criação, com cooldown por idade"""
+
+    def __init__(self, window_days: float = DEDUP_WINDOW_DAYS,
+                 refresh_interval_seconds: int = REFRESH_INTERVAL_SECONDS):
+        self.window_days = window_days
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.cache = PersistentCache("task_history")
+        self._lock = threading.Lock()
+        self._loaded = False
+        # título -> CREATEDDATE (ms) da criação mais recente
+        self._last_created: Dict[str, int] = {}
+        # Títulos cujo horário veio da aplicação (substituído pelo CREATEDDATE do SQL)
+        self._app_recorded: Set[str] = set()
+        self._watermark: Optional[int] = None
+        self._checked_at = 0.0
+        # REQUESTERID das consultas (OWNER_ID do app) e dono do histórico gravado
+        self._owner_id: Optional[int] = None
+        self._history_owner: Optional[int] = None
+
+    def _load(self):
+        """Carrega o histórico gravado (memória -> disco -> vazio)"""
+        if self._loaded:
+            return
+        stored = self.cache.get_persistent("history")
+        if stored and stored.get("data"):
+            data = stored["data"]
+            self._last_created = {title: int(ms) for title, ms in data.get("titles", {}).items()}
+            self._app_recorded = set(data.get("app_recorded", [])) & self._last_created.keys()
+            self._watermark = data.get("watermark")
+            self._history_owner = data.get("owner_id")
+            logger.info(f"Histórico de tarefas carregado do disco: {len(self._last_created)} títulos")
+        self._loaded = True
+
+    def _save(self):
+        self.cache.set_persistent("history", {
+            "titles": self._last_created,
+            "app_recorded": sorted(self._app_recorded),
+            "watermark": self._watermark,
+            "owner_id": self._history_owner,
+            "window_days": self.window_days
+        })
+
+    def _current_owner_id(self) -> int:
+        """
+        OWNER_ID configurado no app (mesmo requerente da consulta TOP 10 do cache de
+        tarefas); fora do contexto do app (worker da automação), o último lido ou o
+        dono do histórico gravado
+        """
+        if has_app_context():
+            self._owner_id = current_app.config['OWNER_ID']
+        if self._owner_id is None:
+            self._owner_id = self._history_owner
+        if self._owner_id is None:
+            from app.services.calendar_service import DEFAULT_OWNER_ID
+            self._owner_id = DEFAULT_OWNER_ID
+        return self._owner_id
+
+    def _record(self, title: Optional[str], created_ms: int, from_app: bool = False) -> bool:
+        """
+        Registra uma criação; retorna True se o histórico mudou
+
+        Args:
+            title: Título da tarefa
+            created_ms: CREATEDDATE (SQL) ou horário da confirmação (aplicação)
+            from_app: Horário provisório registrado pela aplicação
+        """
+        title = (title or "").strip()
+        if not title:
+            return False
+        if not from_app and title in self._app_recorded:
+            # CREATEDDATE real substitui o horário provisório, mesmo se anterior a ele
+            self._app_recorded.discard(title)
+            self._last_created[title] = created_ms
+            return True
+        if created_ms <= self._last_created.get(title, -1):
+            return False
+        self._last_created[title] = created_ms
+        if from_app:
+            self._app_recorded.add(title)
+        return True
+
+    def _prune(self, now_ms: int) -> int:
+        """Remove títulos fora da janela"""
+        cutoff = now_ms - int(self.window_days * _MS_PER_DAY)
+        expired = [title for title, ms in self._last_created.items() if ms < cutoff]
+        for title in expired:
+            del self._last_created[title]
+            self._app_recorded.discard(title)
+        return len(expired)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Aplica as tarefas criadas desde a marca d'água
+
+        Args:
+            force: Ignorar o intervalo mínimo entre consultas
+
+        Returns:
+            True se o histórico está utilizável
+        """
+        with self._lock:
+            self._load()
+            if not force and time.monotonic() - self._checked_at < self.refresh_interval_seconds:
+                return self._watermark is not None
+
+            owner_id = self._current_owner_id()
+            if self._history_owner is not None and self._history_owner != owner_id:
+                # Outro requerente configurado: o histórico gravado não vale mais
+                logger.info(f"OWNER_ID mudou ({self._history_owner} -> {owner_id}); remontando histórico")
+                self._last_created, self._app_recorded, self._watermark = {}, set(), None
+            self._history_owner = owner_id
+            now_ms = _now_ms()
+            full_build = self._watermark is None
+            # Primeira carga: apenas a janela; depois, só o delta (>= para não perder o mesmo milissegundo)
+            since_ms = now_ms - int(self.window_days * _MS_PER_DAY) if full_build else self._watermark
+            query = """
+            SELECT
+              td.TITLE,
+              td.CREATEDDATE
+            FROM dbo.TaskDetails td
+            JOIN dbo.WorkOrderToTaskDetails wttd ON wttd.TASKID = td.TASKID
+            JOIN dbo.WorkOrder wo ON wo.WORKORDERID = wttd.WORKORDERID
+            WHERE wo.REQUESTERID = ?
+              AND td.CREATEDDATE >= ?
+            ORDER BY td.CREATEDDATE;
+            """
+            rows = db.execute_query(query, (owner_id, since_ms))
+            if rows is None:
+                logger.warning("Falha ao atualizar histórico de tarefas; mantendo versão atual")
+                return self._watermark is not None
+
+            changed = 0
+            for row in rows:
+                created_ms = int(row["CREATEDDATE"] or 0)
+                changed += self._record(row.get("TITLE"), created_ms)
+                self._watermark = max(self._watermark or since_ms, created_ms)
+            if self._watermark is None:
+                # Nenhuma tarefa na janela: histórico vazio, mas válido
+                self._watermark = since_ms
+            pruned = self._prune(now_ms)
+            self._checked_at = time.monotonic()
+
+            if changed or pruned or full_build:
+                self._save()
+                logger.info(f"Histórico de tarefas {'montado' if full_build else 'atualizado'}: "
+                            f"{len(rows)} tarefas lidas, {changed} títulos alterados, {pruned} expirados")
+            return True
+
+    def get_recent_titles(self) -> Optional[Set[str]]:
+        """
+        Títulos criados dentro da janela
+
+        Returns:
+            Set de títulos, ou None se o histórico não está disponível
+        """
+        if not self.refresh():
+            return None
+        cutoff = _now_ms() - int(self.window_days * _MS_PER_DAY)
+        with self._lock:
+            return {title for title, ms in self._last_created.items() if ms >= cutoff}
+
+    def get_cooldowns(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Cooldown restante de cada título da janela
+
+        Returns:
+            Dict título -> {"last_created", "age_days", "remaining_days"}
+        """
+        now_ms = _now_ms()
+        with self._lock:
+            items = list(self._last_created.items())
+        cooldowns = {}
+        for title, created_ms in items:
+            age_days = (now_ms - created_ms) / _MS_PER_DAY
+            if age_days >= self.window_days:
+                continue
+            cooldowns[title] = {
+                "last_created": datetime.fromtimestamp(created_ms / 1000).isoformat(),
+                "age_days": round(age_days, 2),
+                "remaining_days": round(self.window_days - age_days, 2)
+            }
+        return cooldowns
+
+    def on_tasks_created(self, tasks=None, **_):
+        """Handler do evento tasks_created: registra as tarefas confirmadas da execução"""
+        now_ms = _now_ms()
+        with self._lock:
+            self._load()
+            # A marca d'água não avança: o próximo delta do SQL traz as datas exatas e as substitui
+            changed = sum(self._record(task.get("title"), now_ms, from_app=True) for task in tasks or [])
+            if changed:
+                self._save()
+        if changed:
+            logger.info(f"Histórico de tarefas: {changed} títulos registrados pela execução")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retorna status do histórico"""
+        try:
+            with self._lock:
+                return {
+                    "window_days": self.window_days,
+                    "titles": len(self._last_created),
+                    "app_recorded": len(self._app_recorded),
+                    "watermark": self._watermark,
+                    "owner_id": self._history_owner,
+                    "seconds_since_check": round(time.monotonic() - self._checked_at, 1)
+                    if self._checked_at else None,
+                    "refresh_interval_seconds": self.refresh_interval_seconds,
+                    "checked_at": datetime.now().isoformat()
+                }
+        except Exception as e:
+            logger.error(f"Erro ao obter status do histórico de tarefas: {str(e)}")
+            return {"error": str(e)}
+
+
+# Instância global do serviço
+task_history_service = TaskHistoryService()
+
+# Atualização por eventos
+cache_event_service.subscribe(TASKS_CREATED, task_history_service.on_tasks_created)
@@ -0,0 +1,189 @@
+"""
+Task Similarity Service
+Detecção de tarefas quase duplicadas (MinHash + LSH sobre n-gramas de caracteres).
+
+Textos são normalizados (minúsculas, sem acentos, números e IDs de host
+trocados por '#') e quebrados em n-gramas. A assinatura MinHash estima a
+similaridade de Jaccard e o LSH por bandas devolve apenas candidatos
+prováveis, sem comparar com todo o banco.
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+try:
+    import numpy as np  # Opcional: assinaturas vetorizadas
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from app.services.task_bank_service import task_bank_service, TaskBankService
+
+logger = logging.getLogger(__name__)
+
+# Similaridade mínima (Jaccard estimado) para considerar duas tarefas quase iguais
+SIMILARITY_THRESHOLD = float(os.getenv("DEDUP_SIMILARITY_THRESHOLD", "0.7"))
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bandas x 4 linhas: candidatos a partir de ~0,5 de similaridade
+SHINGLE_SIZE = 4
+_PRIME = (1 << 31) - 1
+
+_rng = random.Random(20240826)  # permutações fixas: assinaturas comparáveis entre execuções
+_PERM_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERMUTATIONS)]
+_PERM_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERMUTATIONS)]
+if HAS_NUMPY:
+    _NP_A = np.array(_PERM_A, dtype=np.uint64)[:, None]
+    _NP_B = np.array(_PERM_B, dtype=np.uint64)[:, None]
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos e pontuação; tokens com dígitos viram '#'"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    tokens = re.findall(r"[a-z0-9.]+", text)
+    return " ".join("#" if any(ch.isdigit() for ch in token) else token.strip(".") for token in tokens)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[int]:
+    """Hashes dos n-gramas de caracteres do texto normalizado"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return [zlib.crc32(normalized.encode())] if normalized else []
+    return list({zlib.crc32(normalized[i:i + size].encode()) for i in range(len(normalized) - size + 1)})
+
+
+def minhash(hashes: List[int]) -> Tuple[int, ...]:
+    """Assinatura MinHash dos n-gramas"""
+    if not hashes:
+        return tuple([_PRIME] * NUM_PERMUTATIONS)
+    if HAS_NUMPY:
+        values = np.array(hashes, dtype=np.uint64)[None, :]
+        return tuple(int(v) for v in ((_NP_A * values + _NP_B) % _PRIME).min(axis=1))
+    return tuple(min((a * x + b) % _PRIME for x in hashes) for a, b in zip(_PERM_A, _PERM_B))
+
+
+def estimate_similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERMUTATIONS
+
+
+class MinHashIndex:
+    """Índice LSH de assinaturas MinHash"""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.rows_per_band = NUM_PERMUTATIONS // LSH_BANDS
+        self._signatures: Dict[Any, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[Any]] = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _bands(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        r = self.rows_per_band
+        for band in range(LSH_BANDS):
+            yield band, signature[band * r:(band + 1) * r]
+
+    def add(self, key: Any, text: str):
+        if key in self._signatures:
+            return
+        signature = minhash(shingles(text))
+        self._signatures[key] = signature
+        for band_key in self._bands(signature):
+            self._buckets.setdefault(band_key, []).append(key)
+
+    def query(self, text: str, threshold: Optional[float] = None) -> List[Tuple[Any, float]]:
+        """Chaves com similaridade >= threshold, mais parecidas primeiro"""
+        return self._query_signature(minhash(shingles(text)), threshold)
+
+    def _query_signature(self, signature: Tuple[int, ...], threshold: Optional[float] = None,
+                         exclude: Any = None) -> List[Tuple[Any, float]]:
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for band_key in self._bands(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        candidates.discard(exclude)
+        matches = [(key, estimate_similarity(signature, self._signatures[key])) for key in candidates]
+        return sorted((m for m in matches if m[1] >= threshold), key=lambda m: -m[1])
+
+    def clusters(self, threshold: Optional[float] = None) -> Dict[Any, int]:
+        """Agrupa chaves quase iguais (união dos pares acima do limiar): chave -> id do grupo"""
+        parent = {key: key for key in self._signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for key, signature in self._signatures.items():
+            for other, _ in self._query_signature(signature, threshold, exclude=key):
+                root_a, root_b = find(key), find(other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        ids: Dict[Any, int] = {}
+        return {key: ids.setdefault(find(key), len(ids)) for key in self._signatures}
+
+
+class TaskSimilarityService:
+    """Quase duplicatas entre banco de tarefas e histórico recente"""
+
+    def __init__(self, bank: TaskBankService = task_bank_service, threshold: float = SIMILARITY_THRESHOLD):
+        self.bank = bank
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._bank_index: Optional[MinHashIndex] = None
+        self._bank_mtime: Optional[float] = None
+
+    def get_bank_index(self) -> MinHashIndex:
+        """Índice de título + descrição das tarefas do banco (refeito quando o CSV muda)"""
+        mtime = self.bank.mtime
+        with self._lock:
+            if self._bank_index is None or mtime != self._bank_mtime:
+                index = MinHashIndex(self.threshold)
+                for record in self.bank.get_records():
+                    index.add((record.title, record.description), f"{record.title} {record.description}")
+                self._bank_index, self._bank_mtime = index, mtime
+                logger.info(f"Índice de similaridade do banco montado: {len(index)} tarefas")
+            return self._bank_index
+
+    def match_recent(self, titles: Iterable[str], recent_titles: Iterable[str]) -> Dict[str, Tuple[str, float]]:
+        """
+        Títulos quase iguais a algum título recente
+
+        Returns:
+            Dict título -> (título recente mais parecido, similaridade)
+        """
+        index = MinHashIndex(self.threshold)
+        for title in recent_titles:
+            index.add(title, title)
+        if not len(index):
+            return {}
+        matches = {}
+        for title in set(titles):
+            found = index.query(title)
+            if found:
+                matches[title] = found[0]
+        return matches
+
+    def get_bank_clusters(self) -> Dict[str, Any]:
+        """Grupos de quase duplicatas no banco (apenas grupos com mais de um título)"""
+        groups: Dict[int, set] = {}
+        for (title, _), cluster_id in self.get_bank_index().clusters().items():
+            groups.setdefault(cluster_id, set()).add(title)
+        multi = [sorted(titles) for titles in groups.values() if len(titles) > 1]
+        return {
+            "threshold": self.threshold,
+            "clusters": sorted(multi, key=len, reverse=True),
+            "numpy": HAS_NUMPY
+        }
+
+
+# Instância global do serviço
+task_similarity_service = TaskSimilarityService()
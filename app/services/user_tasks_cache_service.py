@@ -9,6 +9,7 @@ from typing import Dict, List, Any, Optional
 from flask import current_app
 from app.models.cache import AutoRefreshCache
 from app.models.database import db
+from app.services.cache_event_service import cache_event_service, TASKS_CREATED
 
 logger = logging.getLogger(__name__)
 
@@ -182,8 +183,14 @@ class UserTasksCacheService:
     def invalidate_tasks_cache(self):
         """Invalida cache das tarefas do usuário"""
         self.cache.invalidate("user_tasks")
+        # Sem isso o get_with_auto_refresh serviria a cópia persistente anterior por até 2 min
+        self.cache.expire_persistent("user_tasks")
         logger.info(f"Cache de tarefas do usuário {self.username} invalidado")
     
+    def on_tasks_created(self, **_):
+        """Handler do evento tasks_created (também renova a base da desduplicação)"""
+        self.invalidate_tasks_cache()
+    
     def get_cache_status(self) -> Dict[str, Any]:
         """Retorna status do cache de tarefas do usuário"""
         try:
@@ -210,3 +217,6 @@ class UserTasksCacheService:
 
 # Instância global do serviço
 user_tasks_cache_service = UserTasksCacheService()
+
+# Invalidação por eventos
+cache_event_service.subscribe(TASKS_CREATED, user_tasks_cache_service.on_tasks_created)
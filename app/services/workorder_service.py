@@ -10,6 +10,7 @@ from flask import current_app
 
 from app.models.database import db
 from app.models.workorder import WorkOrder
+from app.services.owner_index_service import owner_index_service
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,17 @@ class WorkOrderService:
             owner_id = current_app.config['OWNER_ID']
             workorder_title = current_app.config['WORKORDER_TITLE']
             
+            # Caminho rápido: índice local de responsáveis (sem ROW_NUMBER no SQL)
+            indexed_row = owner_index_service.get_latest_workorder(workorder_title, owner_id)
+            if indexed_row is not None:
+                if not indexed_row:
+                    logger.warning("Nenhum WorkOrder vigente encontrado")
+                    return None
+                workorder = WorkOrder.from_sql_result(indexed_row)
+                logger.info(f"WorkOrder encontrado (índice): {workorder.workorder_id}")
+                return workorder
+            
+            # Fallback: índice indisponível, consulta original
             query = """
             ;WITH CurrentState AS (
               SELECT
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark da agregação diária do calendário: implementação com dicts (Python puro)
+versus agregação colunar com NumPy (CalendarService._aggregate_day_columns).
+
+Gera tarefas e exclusões sintéticas para N períodos 26->25 e M técnicos,
+confere que as duas implementações produzem os mesmos dias e mede o tempo.
+
+Exemplo de uso:
+    python bench_calendar_aggregation.py
+    python bench_calendar_aggregation.py 12 10      # 12 períodos, 10 técnicos
+"""
+import sys
+import random
+import timeit
+from datetime import date, timedelta
+
+sys.path.append('.')  # Adiciona o diretório atual ao path
+
+from app.services.calendar_service import CalendarService, np
+from app.services.period_service import iter_26_25_periods
+
+
+def gerar_dados(start: date, end: date, technicians: int, seed: int = 42):
+    """Gera tarefas (estrutura de _get_tasks_data) e exclusões sintéticas"""
+    rng = random.Random(seed)
+    tasks, exclusions = [], []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            for _ in range(technicians * rng.randint(4, 9)):
+                tasks.append({
+                    'TASKID': len(tasks) + 1,
+                    'TaskTitle': 'Tarefa sintética',
+                    'TempoGasto': round(rng.uniform(0.5, 2.5), 1),
+                    'DataCriacao': current.isoformat()
+                })
+            if rng.random() < 0.05:
+                exclusions.append({
+                    'date': current.isoformat(),
+                    'hours': rng.choice([2.0, 4.0, 8.0]),
+                    'reason': 'folga',
+                    'type': 'partial'
+                })
+        current += timedelta(days=1)
+    return tasks, exclusions
+
+
+def main():
+    periods_count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    technicians = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    if np is None:
+        print("NumPy não instalado: apenas a implementação Python está disponível.")
+        sys.exit(1)
+
+    today = date.today()
+    periods = iter_26_25_periods(today - timedelta(days=31 * (periods_count - 1)), today)
+    start, end = periods[0][0], periods[-1][1]
+    tasks, exclusions = gerar_dados(start, end, technicians)
+
+    service = CalendarService()
+    print(f"Intervalo: {start} a {end} ({len(periods)} períodos, {technicians} técnicos)")
+    print(f"Tarefas: {len(tasks)} | Exclusões: {len(exclusions)}")
+
+    # Conferência de equivalência
+    python_days = service._process_daily_data_python(start, end, tasks, exclusions)
+    columns = service._aggregate_day_columns(start, end, tasks, exclusions)
+    numpy_days = service._process_daily_data(start, end, tasks, exclusions, columns)
+    for key, expected in python_days.items():
+        got = numpy_days[key]
+        for field in ('tasks_count', 'exclusion_type', 'calendar_color', 'is_weekend', 'day_of_week'):
+            assert got[field] == expected[field], (key, field, got[field], expected[field])
+        for field in ('hours_worked', 'hours_excluded'):
+            assert abs(got[field] - expected[field]) < 1e-6, (key, field, got[field], expected[field])
+    print("Resultados equivalentes ✅")
+
+    def run_python():
+        days = service._process_daily_data_python(start, end, tasks, exclusions)
+        service._calculate_summary(days)
+
+    def run_numpy():
+        cols = service._aggregate_day_columns(start, end, tasks, exclusions)
+        days = service._process_daily_data(start, end, tasks, exclusions, cols)
+        service._calculate_summary(days, cols)
+
+    repeat = 20
+    t_python = min(timeit.repeat(run_python, number=1, repeat=repeat))
+    t_numpy = min(timeit.repeat(run_numpy, number=1, repeat=repeat))
+
+    print(f"\nPython (dicts): {t_python * 1000:8.2f} ms")
+    print(f"NumPy (colunas): {t_numpy * 1000:8.2f} ms")
+    print(f"Speedup: {t_python / t_numpy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Testa que a invalidação do calendário faz a próxima leitura buscar dados novos
+(o cache persistente não pode continuar servindo a cópia anterior).
+Exemplo de uso:
+    python test_calendar_cache_invalidation.py
+"""
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from app.services.calendar_cache_service import CalendarCacheService
+
+
+def _calendar(tag: str) -> dict:
+    today = date.today().isoformat()
+    return {
+        "period_start": today,
+        "period_end": today,
+        "daily_data": {today: {"tasks": [], "exclusions": [], "tasks_count": 0, "tag": tag}},
+        "weeks_data": [],
+        "last_updated": datetime.now().isoformat(),
+        "tag": tag
+    }
+
+
+def _service(cache_dir: str) -> CalendarCacheService:
+    """Serviço com cache em diretório temporário e busca no SQL simulada"""
+    service = CalendarCacheService()
+    service.cache.cache_dir = Path(cache_dir)
+    service.cache.persistent_file = Path(cache_dir) / "calendar_persistent.json"
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return _calendar(f"fresh-{len(fetches)}")
+
+    service.cache.refresh_callback = fetch
+    return service
+
+
+def test_read_after_invalidation_returns_fresh_data():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _service(cache_dir)
+        service.set_calendar_data(_calendar("old"))
+        assert service.get_calendar_data()["tag"] == "old"
+
+        service.invalidate_dates([date.today()])
+
+        assert service.get_calendar_data()["tag"] == "fresh-1"
+        assert service.get_cached_day(date.today())["tag"] == "fresh-1"
+
+
+def test_invalidation_keeps_old_data_as_fallback_when_fetch_fails():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _service(cache_dir)
+        service.cache.refresh_callback = lambda: None
+        service.set_calendar_data(_calendar("old"))
+
+        service.invalidate_calendar_cache()
+
+        assert service.get_calendar_data()["tag"] == "old"
+
+
+def test_created_tasks_patch_the_served_entry_after_ttl_expires():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = _service(cache_dir)
+        service.set_calendar_data(_calendar("old"))
+        service.cache.invalidate("calendar_data")  # TTL de 5 min expirou durante a execução
+
+        applied = service.apply_created_tasks([{
+            "task_id": 987654, "title": "Tarefa criada", "time_spent": 1.5, "time_estimated": 1.5,
+            "created_date": date.today().isoformat()
+        }], workorder_id=1)
+
+        day = service.get_calendar_data()["daily_data"][date.today().isoformat()]
+        assert applied
+        assert [task["TASKID"] for task in day["tasks"]] == [987654]
+
+
+if __name__ == "__main__":
+    test_read_after_invalidation_returns_fresh_data()
+    test_invalidation_keeps_old_data_as_fallback_when_fetch_fails()
+    test_created_tasks_patch_the_served_entry_after_ttl_expires()
+    print("OK: leitura após invalidação busca dados novos")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Testa a combinação exata (subset-sum) usada na seleção de tarefas do banco
+e do plano do período.
+Exemplo de uso:
+    python test_exact_selection.py
+"""
+import random
+from app.services.task_bank_service import exact_selection
+
+
+def _groups(bank: dict) -> list:
+    """{título: [unidades, ...]} -> (título, unidades -> tarefas) na ordem do dict"""
+    groups = []
+    for title, units_list in bank.items():
+        options = {}
+        for i, units in enumerate(units_list):
+            options.setdefault(units, []).append(f"{title}#{i}")
+        groups.append((title, options))
+    return groups
+
+
+def test_reaches_exact_target():
+    rng = random.Random(1)
+    selected = exact_selection(_groups({"a": [30], "b": [20], "c": [50], "d": [15]}), 80, rng)
+    assert selected is not None
+    units = {"a": 30, "b": 20, "c": 50, "d": 15}
+    assert sum(units[task.split("#")[0]] for task in selected) == 80
+
+
+def test_at_most_one_task_per_title():
+    rng = random.Random(1)
+    assert exact_selection([('a', {3: ['a'], 2: ['a2']})], 5, rng) is None
+    assert exact_selection([('a', {3: ['a']}), ('b', {2: ['b']})], 5, rng) in (['b', 'a'], ['a', 'b'])
+
+
+def test_infeasible_target_returns_none():
+    rng = random.Random(1)
+    assert exact_selection(_groups({"a": [20], "b": [40]}), 50, rng) is None
+    assert exact_selection([], 10, rng) is None
+
+
+def test_non_positive_target_returns_none():
+    rng = random.Random(1)
+    groups = _groups({"a": [10]})
+    assert exact_selection(groups, 0, rng) is None
+    assert exact_selection(groups, -5, rng) is None
+
+
+def test_same_seed_same_choice_within_title():
+    groups = [("a", {10: ["a1", "a2", "a3"]}), ("b", {10: ["b1", "b2"]})]
+    first = exact_selection(groups, 20, random.Random(7))
+    assert first == exact_selection(groups, 20, random.Random(7))
+    assert sorted(task[0] for task in first) == ["a", "b"]
+
+
+if __name__ == "__main__":
+    test_reaches_exact_target()
+    test_at_most_one_task_per_title()
+    test_infeasible_target_returns_none()
+    test_non_positive_target_returns_none()
+    test_same_seed_same_choice_within_title()
+    print("OK: combinação exata")
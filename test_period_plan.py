@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Testa o plano do período: cooldown entre usos do mesmo título, relaxamento do
+cooldown, dias sem combinação exata, reserva da fatia do dia e replanejamento.
+Usa um banco em memória e random.Random com semente fixa.
+Exemplo de uso:
+    python test_period_plan.py
+"""
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from app.services.period_plan_service import PeriodPlanService
+from app.services.period_service import get_current_26_25_period
+
+MONDAY = date(2026, 10, 5)
+
+
+class _FakeSimilarity:
+    """Similaridade simulada: pares quase iguais informados no teste"""
+
+    def __init__(self, near=None):
+        self.near = near or {}
+
+    def match_recent(self, titles, recent_titles):
+        recent = set(recent_titles)
+        return {t: (self.near[t], 0.9) for t in set(titles) if self.near.get(t) in recent}
+
+    def get_bank_index(self):
+        raise RuntimeError("sem índice no teste")
+
+
+def _bank(spec: dict) -> list:
+    """{título: horas} -> tarefas no formato de _load_bank"""
+    return [{"titulo": title, "tempo_gasto": str(hours), "_units": round(hours * 10)}
+            for title, hours in spec.items()]
+
+
+def _workdays(count: int, target_hours: float = 8.0) -> list:
+    days, current = [], MONDAY
+    while len(days) < count:
+        if current.weekday() < 5:
+            days.append({"date": current.isoformat(), "target_hours": target_hours})
+        current += timedelta(days=1)
+    return days
+
+
+def _service(cache_dir: str, bank: list, recent=None, near=None) -> PeriodPlanService:
+    service = PeriodPlanService(similarity=_FakeSimilarity(near))
+    service.cache.cache_dir = Path(cache_dir)
+    service.cache.persistent_file = Path(cache_dir) / "period_plan_persistent.json"
+    service._load_bank = lambda: bank
+    service._bank_mtime = lambda: 1.0
+    service._recent_titles = lambda: dict(recent or {})
+    return service
+
+
+def _titles(day: dict) -> list:
+    return [task["titulo"] for task in day["tasks"]]
+
+
+def test_cooldown_keeps_titles_apart():
+    service = PeriodPlanService(similarity=_FakeSimilarity())
+    bank = _bank({t: 8 for t in "ABCDE"})
+    days = service._plan_days(_workdays(10), bank, {}, random.Random(3))
+
+    assert all(day["feasible"] and not day["cooldown_relaxed"] for day in days)
+    used = [_titles(day)[0] for day in days]
+    for i, title in enumerate(used):
+        # cooldown de 3 dias úteis: o título só volta no 4º dia útil seguinte
+        assert title not in used[i + 1:i + 4]
+
+
+def test_recent_titles_start_on_cooldown():
+    service = PeriodPlanService(similarity=_FakeSimilarity())
+    bank = _bank({t: 8 for t in "ABCDE"})
+    friday = MONDAY - timedelta(days=3)
+    days = service._plan_days(_workdays(3), bank, {"A": friday, "B": friday}, random.Random(3))
+
+    assert not {"A", "B"} & {t for day in days for t in _titles(day)}
+
+
+def test_cooldown_is_relaxed_when_no_other_combination():
+    service = PeriodPlanService(similarity=_FakeSimilarity())
+    days = service._plan_days(_workdays(3), _bank({"A": 8, "B": 8}), {}, random.Random(3))
+
+    assert [day["feasible"] for day in days] == [True, True, True]
+    assert [day["cooldown_relaxed"] for day in days] == [False, False, True]
+
+
+def test_infeasible_day_has_no_tasks():
+    service = PeriodPlanService(similarity=_FakeSimilarity())
+    days = service._plan_days(_workdays(1, target_hours=5.0), _bank({"A": 8, "B": 3}), {}, random.Random(3))
+
+    assert days[0]["feasible"] is False
+    assert days[0]["tasks"] == []
+
+
+def test_same_cluster_not_planned_on_the_same_day():
+    service = PeriodPlanService(similarity=_FakeSimilarity())
+    bank = _bank({"A - Low": 4, "A - Normal": 4, "B": 4, "C": 4})
+    clusters = {"A - Low": 0, "A - Normal": 0}
+    for seed in range(20):
+        day = service._plan_days(_workdays(1), bank, {}, random.Random(seed), clusters)[0]
+        assert not {"A - Low", "A - Normal"} <= set(_titles(day))
+
+
+def _store_plan(service: PeriodPlanService, bank: list, seed: int = 3) -> dict:
+    days = service._plan_days(_workdays(5), bank, {}, random.Random(seed))
+    plan = {"bank_mtime": 1.0, "days": {day["date"]: day for day in days}}
+    service.cache.set_persistent(get_current_26_25_period(MONDAY)[0].isoformat(), plan)
+    return plan
+
+
+def test_slice_is_reserved_for_the_first_execution():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bank = _bank({t: 8 for t in "ABCDE"})
+        service = _service(cache_dir, bank)
+        plan = _store_plan(service, bank)
+
+        tasks = service.get_day_tasks(MONDAY, 8.0, "exec-1")
+
+        assert _titles({"tasks": tasks}) == _titles(plan["days"][MONDAY.isoformat()])
+        assert service.get_day_tasks(MONDAY, 8.0, "exec-2") is None
+        stored = service.get_plan(MONDAY)["days"][MONDAY.isoformat()]
+        assert stored["status"] == "started" and stored["execution_id"] == "exec-1"
+
+
+def test_slice_with_other_target_is_not_used():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bank = _bank({t: 8 for t in "ABCDE"})
+        service = _service(cache_dir, bank)
+        _store_plan(service, bank)
+
+        assert service.get_day_tasks(MONDAY, 6.0, "exec-1") is None
+        assert service.get_plan(MONDAY)["days"][MONDAY.isoformat()]["status"] == "pending"
+
+
+def test_slice_conflicting_with_recent_title_is_replanned():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bank = _bank({t: 8 for t in "ABCDE"})
+        service = _service(cache_dir, bank)
+        planned = _titles(_store_plan(service, bank)["days"][MONDAY.isoformat()])
+        service._recent_titles = lambda: {planned[0]: MONDAY}
+
+        tasks = service.get_day_tasks(MONDAY, 8.0, "exec-1")
+
+        assert tasks and planned[0] not in _titles({"tasks": tasks})
+        stored = service.get_plan(MONDAY)["days"][MONDAY.isoformat()]
+        assert stored.get("replanned_at") and stored["status"] == "started"
+
+
+def test_excluded_and_near_duplicate_titles_force_a_replan():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bank = _bank({t: 8 for t in "ABCDE"})
+        service = _service(cache_dir, bank)
+        planned = _titles(_store_plan(service, bank)["days"][MONDAY.isoformat()])[0]
+        service.similarity = _FakeSimilarity({planned: "Título recente quase igual"})
+        service._recent_titles = lambda: {"Título recente quase igual": MONDAY}
+
+        tasks = service.get_day_tasks(MONDAY, 8.0, exclude_titles=["Outro bloqueado"])
+
+        assert tasks and planned not in _titles({"tasks": tasks})
+
+
+def test_slice_returns_none_when_replan_cannot_avoid_conflict():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bank = _bank({"A": 8})
+        service = _service(cache_dir, bank)
+        _store_plan(service, bank)
+
+        assert service.get_day_tasks(MONDAY, 8.0, "exec-1", exclude_titles=["A"]) is None
+        assert service.get_plan(MONDAY)["days"][MONDAY.isoformat()]["status"] == "pending"
+
+
+if __name__ == "__main__":
+    test_cooldown_keeps_titles_apart()
+    test_recent_titles_start_on_cooldown()
+    test_cooldown_is_relaxed_when_no_other_combination()
+    test_infeasible_day_has_no_tasks()
+    test_same_cluster_not_planned_on_the_same_day()
+    test_slice_is_reserved_for_the_first_execution()
+    test_slice_with_other_target_is_not_used()
+    test_slice_conflicting_with_recent_title_is_replanned()
+    test_excluded_and_near_duplicate_titles_force_a_replan()
+    test_slice_returns_none_when_replan_cannot_avoid_conflict()
+    print("OK: plano do período")